@@ -0,0 +1,231 @@
+"""Banc d'essai de la chaîne : coût de chaque indicateur selon la taille du corpus.
+
+Pour chaque corpus et chaque taille de l'échelle (nombre d'étudiants), le banc
+génère une entrée synthétique (``synthetic_corpus``), exécute tous les
+``MetricJob`` du registre avec ``run_metric_jobs`` et relève leur coût
+(``resource_usage`` : durée, CPU, pic mémoire). Les exécutions ont lieu dans
+un espace de travail séparé, copie des scripts du projet : les CSV de
+métriques du projet ne sont jamais écrasés.
+
+Deux fichiers sont produits dans ``work_dir`` :
+
+- ``benchmark_results.csv`` : une ligne par corpus, taille et job ;
+- ``benchmark_scaling.csv`` : pour chaque job, l'exposant de croissance de la
+  durée et de la mémoire entre les deux plus grandes tailles mesurées. Un
+  exposant proche de 1 indique un coût linéaire ; au-delà de
+  ``SUPERLINEAR_EXPONENT``, le job est signalé comme point chaud potentiel
+  (coût quadratique, par exemple).
+
+Un job qui dépasse ``time_budget_s`` à une taille n'est plus lancé aux tailles
+suivantes (statut ``skipped_budget``).
+
+Exemple : ``python benchmark.py --datasets Nowledgeable --sizes 1000 10000 --in-process``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import shutil
+import sys
+from typing import Iterable, Sequence
+
+import numpy as np
+import pandas as pd
+
+from metric_registry import DATASETS, get_dataset
+from pipeline_utils import detect_project_dir, run_metric_jobs
+import synthetic_corpus
+
+
+SIZE_LADDER = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_SIZES = (1_000, 10_000)
+SUPERLINEAR_EXPONENT = 1.3
+RESULTS_FILENAME = "benchmark_results.csv"
+SCALING_FILENAME = "benchmark_scaling.csv"
+
+
+def prepare_workspace(project_dir: Path, work_dir: Path) -> Path:
+    """Copie les modules et dossiers de scripts du projet dans ``work_dir/projet``.
+
+    La copie est refaite à chaque banc : c'est le code courant qui est mesuré.
+    """
+
+    workspace = work_dir / "projet"
+    if workspace.exists():
+        shutil.rmtree(workspace)
+    workspace.mkdir(parents=True)
+    for module in project_dir.glob("*.py"):
+        shutil.copy2(module, workspace / module.name)
+    for spec in DATASETS.values():
+        shutil.copytree(
+            spec.scripts_path(project_dir),
+            spec.scripts_path(workspace),
+            ignore=shutil.ignore_patterns("__pycache__", "*.pyc", "cache", "out"),
+            dirs_exist_ok=True,
+        )
+    return workspace
+
+
+def synthetic_input(
+    work_dir: Path,
+    dataset: str,
+    n_subjects: int,
+    events_per_subject: float | None = None,
+    seed: int = 0,
+) -> dict[str, object]:
+    """Entrée synthétique d'une taille donnée, réutilisée si elle existe déjà.
+
+    Le résumé de génération est conservé à côté de l'entrée ; une entrée
+    produite avec d'autres paramètres est régénérée.
+    """
+
+    spec = get_dataset(dataset)
+    stem = f"{dataset}_{n_subjects}"
+    output = work_dir / "entrees" / (stem if spec.input_is_directory else f"{stem}.csv")
+    summary_path = work_dir / "entrees" / f"{stem}.json"
+    wanted = {"events_per_subject": events_per_subject, "seed": seed}
+
+    if summary_path.exists() and synthetic_corpus.corpus_file(dataset, output).exists():
+        summary = json.loads(summary_path.read_text(encoding="utf-8"))
+        if summary.get("parameters") == wanted:
+            return summary
+
+    summary = synthetic_corpus.write_corpus(dataset, output, n_subjects, events_per_subject, seed)
+    summary.update(input=str(output), parameters=wanted)
+    summary_path.write_text(json.dumps(summary, indent=2), encoding="utf-8")
+    return summary
+
+
+def run_benchmark(
+    project_dir: Path,
+    work_dir: Path,
+    datasets: Iterable[str] = tuple(DATASETS),
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    *,
+    events_per_subject: float | None = None,
+    seed: int = 0,
+    mode: str = "subprocess",
+    max_workers: int = 1,
+    time_budget_s: float | None = None,
+) -> pd.DataFrame:
+    """Exécute tous les jobs de ``datasets`` sur l'échelle ``sizes``.
+
+    Retourne les résultats (aussi écrits dans ``benchmark_results.csv``) ; le
+    résumé des croissances est écrit dans ``benchmark_scaling.csv``.
+    """
+
+    work_dir = work_dir.resolve()
+    workspace = prepare_workspace(project_dir, work_dir)
+    results: list[pd.DataFrame] = []
+
+    for dataset in datasets:
+        spec = get_dataset(dataset)
+        remaining = [metric_job.script for metric_job in spec.jobs]
+        skipped: list[str] = []
+        for n_subjects in sorted(sizes):
+            corpus = synthetic_input(work_dir, dataset, n_subjects, events_per_subject, seed)
+            # Le cache de table filtrée de ProgSnap2 ne doit pas fausser la
+            # mesure d'un banc à l'autre.
+            shutil.rmtree(workspace / "cache", ignore_errors=True)
+
+            report = run_metric_jobs(
+                workspace,
+                dataset,
+                input_override=Path(str(corpus["input"])),
+                max_workers=max_workers,
+                mode=mode,
+                use_cache=False,
+                scripts=remaining,
+            ) if remaining else pd.DataFrame()
+            skipped_rows = pd.DataFrame({"script": skipped, "status": "skipped_budget"})
+            report = pd.concat([report, skipped_rows], ignore_index=True)
+            report.insert(0, "dataset", dataset)
+            report.insert(1, "subjects", n_subjects)
+            report.insert(2, "events", corpus["events"])
+            report.insert(3, "corpus_bytes", corpus["input_bytes"])
+            results.append(report)
+
+            if time_budget_s is not None and "wall_s" in report:
+                too_slow = report.loc[report["wall_s"] > time_budget_s, "script"].tolist()
+                remaining = [script for script in remaining if script not in too_slow]
+                skipped.extend(too_slow)
+
+    results_df = pd.concat(results, ignore_index=True)
+    results_df.to_csv(work_dir / RESULTS_FILENAME, index=False)
+    scaling_summary(results_df).to_csv(work_dir / SCALING_FILENAME, index=False)
+    return results_df
+
+
+def _exponent(events: pd.Series, values: pd.Series) -> float | None:
+    """Pente log-log entre les deux plus grandes tailles mesurées."""
+
+    points = pd.DataFrame({"events": events, "value": values}).dropna()
+    points = points[(points["events"] > 0) & (points["value"] > 0)].sort_values("events").tail(2)
+    if len(points) < 2 or points["events"].nunique() < 2:
+        return None
+    x, y = np.log(points["events"].to_numpy(float)), np.log(points["value"].to_numpy(float))
+    return round(float((y[1] - y[0]) / (x[1] - x[0])), 2)
+
+
+def scaling_summary(results: pd.DataFrame) -> pd.DataFrame:
+    """Croissance du coût de chaque job avec le nombre d'évènements."""
+
+    rows: list[dict[str, object]] = []
+    measured = results[results["status"] == "ok"]
+    for (dataset, script), runs in measured.groupby(["dataset", "script"], sort=False):
+        largest = runs.sort_values("events").iloc[-1]
+        wall_exponent = _exponent(runs["events"], runs["wall_s"])
+        rows.append({
+            "dataset": dataset,
+            "script": script,
+            "sizes": len(runs),
+            "max_events": int(largest["events"]),
+            "wall_s": largest["wall_s"],
+            "peak_rss_mb": largest["peak_rss_mb"],
+            "wall_exponent": wall_exponent,
+            "rss_exponent": _exponent(runs["events"], runs["peak_rss_mb"]),
+            "superlinear": wall_exponent is not None and wall_exponent > SUPERLINEAR_EXPONENT,
+        })
+    return pd.DataFrame(rows)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Mesure le coût des indicateurs selon la taille du corpus.")
+    parser.add_argument("--datasets", nargs="+", default=list(DATASETS), choices=sorted(DATASETS))
+    parser.add_argument(
+        "--sizes", nargs="+", type=int, default=list(DEFAULT_SIZES),
+        help=f"Nombres d'étudiants (échelle complète : {' '.join(map(str, SIZE_LADDER))}).",
+    )
+    parser.add_argument("--work-dir", type=Path, default=None, help="Dossier de travail (défaut : bench/).")
+    parser.add_argument("--events-per-subject", type=float, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jobs", "-j", type=int, default=1)
+    parser.add_argument("--in-process", action="store_true")
+    parser.add_argument(
+        "--time-budget", type=float, default=None,
+        help="Durée (s) au-delà de laquelle un job n'est plus lancé aux tailles suivantes.",
+    )
+    args = parser.parse_args(argv)
+
+    project_dir = detect_project_dir(Path(__file__).resolve().parent)
+    work_dir = args.work_dir or project_dir / "bench"
+    results = run_benchmark(
+        project_dir,
+        work_dir,
+        args.datasets,
+        args.sizes,
+        events_per_subject=args.events_per_subject,
+        seed=args.seed,
+        mode="in_process" if args.in_process else "subprocess",
+        max_workers=args.jobs,
+        time_budget_s=args.time_budget,
+    )
+    print(scaling_summary(results).to_string(index=False))
+    print(f"Résultats : {work_dir / RESULTS_FILENAME}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""Copie colonnaire (Parquet) des fichiers d'entrée des corpus.
+
+L'analyse d'un CSV texte, en particulier celui de Mirabelle qui exige le moteur
+Python de pandas, domine le temps de chargement des scripts. L'étape
+d'ingestion (``pipeline_utils.ingest_dataset``) lit une fois le CSV avec le
+lecteur propre au corpus et écrit à côté un fichier ``.parquet``. Les chargeurs
+des scripts (``utils_Mirabelle.load_csv``, ``utils_Nowledgeable.load_csv``,
+``data_filter.load_main_table``) lisent ensuite cette copie, en ne décodant que
+les colonnes demandées.
+
+Les colonnes de texte peu variées (identifiants d'étudiants et d'exercices,
+types d'événements, verbes…) sont stockées en ``category``, c'est-à-dire
+encodées par dictionnaire dans le fichier. Leur type d'origine est noté dans
+les métadonnées du fichier et rétabli à la lecture : les scripts reçoivent les
+mêmes types que depuis le CSV, et leurs sorties restent identiques. Les
+horodatages restent sous leur forme textuelle d'origine, que chaque script
+interprète lui-même.
+
+La taille et l'empreinte SHA-256 du CSV source sont notées dans les
+métadonnées de la copie, qui n'est utilisée que si elles correspondent encore
+au CSV présent. Les dates de modification ne sont pas comparées : elles ne
+distinguent pas un CSV remplacé par un fichier plus ancien (``cp -p``,
+``tar -x``, ``rsync -t``, checkout). Modifier le CSV suffit donc à revenir à
+la lecture texte jusqu'à la prochaine ingestion. Sans ``pyarrow``, tout se
+replie silencieusement sur la lecture CSV.
+
+Ce module est importé depuis les dossiers de scripts ; il ne dépend donc que
+de pandas.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Sequence
+
+import pandas as pd
+
+out = logging.getLogger()
+
+COLUMNAR_SUFFIX = ".parquet"
+
+# Clé des métadonnées Parquet : types d'origine des colonnes stockées en category.
+DTYPES_METADATA_KEY = b"columnar_store.dtypes"
+# Clé des métadonnées Parquet : taille et empreinte du CSV dont la copie est issue.
+SOURCE_METADATA_KEY = b"columnar_store.source"
+
+# Une colonne de texte est stockée en category si elle a au plus cette
+# proportion de valeurs distinctes.
+CATEGORY_MAX_RATIO = 0.5
+
+# (chemin, taille, date, inode) -> empreinte, pour ne hacher un CSV qu'une fois par processus.
+_fingerprints: dict[tuple, str] = {}
+
+
+def columnar_path(csv_path: str | Path) -> Path:
+    """Chemin de la copie colonnaire d'un CSV d'entrée."""
+
+    return Path(csv_path).with_suffix(COLUMNAR_SUFFIX)
+
+
+def has_engine() -> bool:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def file_fingerprint(path: str | Path) -> str:
+    """SHA-256 du contenu de ``path``, calculé une fois par processus tant que le fichier ne change pas."""
+
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    if memo_key not in _fingerprints:
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                digest.update(block)
+        _fingerprints[memo_key] = digest.hexdigest()
+    return _fingerprints[memo_key]
+
+
+def source_signature(csv_path: str | Path) -> dict[str, object]:
+    """Taille et empreinte du CSV, notées dans la copie colonnaire."""
+
+    return {"size": os.path.getsize(csv_path), "sha256": file_fingerprint(csv_path)}
+
+
+def is_current(csv_path: str | Path) -> bool:
+    """Vrai si la copie colonnaire existe et provient du contenu actuel du CSV.
+
+    Sans CSV, la copie seule fait foi. Une copie sans signature de sa source
+    (écrite avant que celle-ci soit notée) n'est pas considérée à jour.
+    """
+
+    csv_path = Path(csv_path)
+    parquet_path = columnar_path(csv_path)
+    if not parquet_path.exists():
+        return False
+    if not csv_path.exists():
+        return True
+    if not has_engine():
+        return False
+
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_schema(parquet_path).metadata or {}
+    try:
+        source = json.loads(metadata[SOURCE_METADATA_KEY])
+    except (KeyError, ValueError):
+        return False
+    # La taille, déjà connue, écarte la plupart des CSV modifiés sans les relire.
+    if source.get("size") != csv_path.stat().st_size:
+        return False
+    return source.get("sha256") == file_fingerprint(csv_path)
+
+
+def columnar_columns(csv_path: str | Path) -> list[str]:
+    """Noms des colonnes de la copie colonnaire, sans lire les données."""
+
+    import pyarrow.parquet as pq
+
+    return list(pq.read_schema(columnar_path(csv_path)).names)
+
+
+def stored_dtypes(parquet_path: str | Path) -> dict[str, str]:
+    """Types d'origine des colonnes stockées en category dans ``parquet_path``."""
+
+    import pyarrow.parquet as pq
+
+    metadata = pq.read_schema(parquet_path).metadata or {}
+    return json.loads(metadata.get(DTYPES_METADATA_KEY, b"{}"))
+
+
+def restore_dtypes(df: pd.DataFrame, dtypes: dict[str, str]) -> pd.DataFrame:
+    """Rend aux colonnes stockées en category leur type d'origine."""
+
+    restored = {column: df[column].astype(dtype) for column, dtype in dtypes.items() if column in df.columns}
+    return df.assign(**restored) if restored else df
+
+
+def _category_columns(df: pd.DataFrame) -> dict[str, str]:
+    """Colonnes de texte à stocker en category, avec leur type d'origine.
+
+    Seules les colonnes dont le type se retrouve à l'identique après l'aller-retour
+    sont retenues.
+    """
+
+    dtypes = {}
+    for column in df.columns:
+        series = df[column]
+        if not (pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)):
+            continue
+        if pd.api.types.infer_dtype(series, skipna=True) != "string":
+            continue
+        if series.nunique() > CATEGORY_MAX_RATIO * len(series):
+            continue
+        dtype = str(series.dtype)
+        if series.astype("category").astype(dtype).equals(series):
+            dtypes[column] = dtype
+    return dtypes
+
+
+def read_input(
+    csv_path: str | Path,
+    read_csv: Callable[[str], pd.DataFrame],
+    columns: Sequence[str] | None = None,
+) -> pd.DataFrame:
+    """Lit une entrée depuis sa copie colonnaire si possible, sinon via ``read_csv``.
+
+    ``columns`` restreint la lecture aux colonnes utiles ; les colonnes absentes
+    du fichier sont ignorées, comme si elles n'avaient pas été demandées, pour
+    que chaque script garde sa propre vérification des colonnes obligatoires.
+    """
+
+    if is_current(csv_path) and has_engine():
+        parquet_path = columnar_path(csv_path)
+        if columns is None:
+            df = pd.read_parquet(parquet_path)
+        else:
+            wanted = set(columns)
+            projected = [column for column in columnar_columns(csv_path) if column in wanted]
+            df = pd.read_parquet(parquet_path, columns=projected)
+        return restore_dtypes(df, stored_dtypes(parquet_path))
+
+    df = read_csv(str(csv_path))
+    if columns is not None:
+        wanted = set(columns)
+        df = df[[column for column in df.columns if column in wanted]]
+    return df
+
+
+def write_columnar(df: pd.DataFrame, csv_path: str | Path) -> Path:
+    """Écrit la copie colonnaire d'une table lue depuis ``csv_path``.
+
+    Les colonnes de texte peu variées sont écrites en category (voir
+    ``_category_columns``), leur type d'origine dans les métadonnées du fichier,
+    avec la taille et l'empreinte de ``csv_path`` (voir ``is_current``).
+    """
+
+    if not has_engine():
+        raise ImportError("L'ingestion colonnaire nécessite pyarrow (pip install pyarrow).")
+
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    dtypes = _category_columns(df)
+    typed = df.astype({column: "category" for column in dtypes})
+    table = pa.Table.from_pandas(typed, preserve_index=False)
+    metadata = dict(table.schema.metadata or {})
+    metadata[DTYPES_METADATA_KEY] = json.dumps(dtypes).encode()
+    metadata[SOURCE_METADATA_KEY] = json.dumps(source_signature(csv_path)).encode()
+
+    parquet_path = columnar_path(csv_path)
+    tmp_path = parquet_path.with_name(parquet_path.name + ".tmp")
+    pq.write_table(table.replace_schema_metadata(metadata), tmp_path)
+    tmp_path.replace(parquet_path)
+    return parquet_path
@@ -0,0 +1,158 @@
+"""Résumé d'une entrée de corpus calculé en flux, mis en cache à côté du fichier.
+
+Pour afficher le nombre de lignes, de colonnes et d'étudiants d'une entrée, il
+n'est pas nécessaire de la garder entière en mémoire : le fichier est parcouru
+par blocs de ``CHUNK_ROWS`` lignes (lots de la copie colonnaire si elle est à
+jour, sinon CSV lu comme ``pipeline_utils.inspect_input``). Seuls les compteurs
+et l'ensemble des identifiants d'étudiants sont conservés d'un bloc à l'autre.
+
+Le résumé comprend aussi le nombre de valeurs manquantes de chaque colonne et
+la période couverte par la colonne d'horodatage du corpus. Il est enregistré
+dans ``<entrée>.summary.json``, avec la taille et la date de modification du
+fichier résumé : tant qu'elles n'ont pas changé, le résumé est relu sans
+parcourir l'entrée.
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+from pathlib import Path
+from typing import Iterator
+
+import pandas as pd
+
+import columnar_store
+
+out = logging.getLogger()
+
+SUMMARY_SUFFIX = ".summary.json"
+SUMMARY_VERSION = 1
+CHUNK_ROWS = 100_000
+ID_CANDIDATES = ("SubjectID", "actor", "studentId")
+TIME_CANDIDATES = ("ServerTimestamp", "ClientTimestamp", "timestamp.$date", "answeredAt")
+# Au-delà, un horodatage numérique est exprimé en millisecondes.
+MILLISECONDS_THRESHOLD = 100_000_000_000
+
+
+def sidecar_path(input_file: str | Path) -> Path:
+    """Chemin du résumé mis en cache d'un fichier d'entrée."""
+
+    input_file = Path(input_file)
+    return input_file.with_name(input_file.name + SUMMARY_SUFFIX)
+
+
+def _columns(input_file: Path, use_columnar: bool) -> list[str]:
+    if use_columnar:
+        return columnar_store.columnar_columns(input_file)
+    return list(pd.read_csv(input_file, nrows=0, engine="python").columns)
+
+
+def _iter_chunks(input_file: Path, id_col: str | None, use_columnar: bool, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Parcourt l'entrée par blocs, sans jamais la charger entièrement."""
+
+    if use_columnar:
+        import pyarrow.parquet as pq
+
+        parquet_path = columnar_store.columnar_path(input_file)
+        dtypes = columnar_store.stored_dtypes(parquet_path)
+        for batch in pq.ParquetFile(parquet_path).iter_batches(batch_size=chunk_rows):
+            yield columnar_store.restore_dtypes(batch.to_pandas(), dtypes)
+        return
+
+    # Les identifiants sont lus comme du texte : l'inférence de type se fait
+    # bloc par bloc, et un même étudiant ne doit pas être compté deux fois
+    # (123 dans un bloc, "123" dans un autre).
+    yield from pd.read_csv(
+        input_file,
+        on_bad_lines="skip",
+        engine="python",
+        dtype={id_col: "string"} if id_col else None,
+        chunksize=chunk_rows,
+    )
+
+
+def parse_times(series: pd.Series) -> pd.Series:
+    """Horodatages en UTC : secondes ou millisecondes epoch, ou texte ISO."""
+
+    numeric = pd.to_numeric(series, errors="coerce")
+    parsed = pd.Series(pd.NaT, index=series.index, dtype="datetime64[ns, UTC]")
+    is_number = numeric.notna()
+    milliseconds = is_number & (numeric.abs() >= MILLISECONDS_THRESHOLD)
+    seconds = is_number & ~milliseconds
+    if seconds.any():
+        parsed.loc[seconds] = pd.to_datetime(numeric[seconds], unit="s", errors="coerce", utc=True)
+    if milliseconds.any():
+        parsed.loc[milliseconds] = pd.to_datetime(numeric[milliseconds], unit="ms", errors="coerce", utc=True)
+    text = ~is_number & series.notna()
+    if text.any():
+        parsed.loc[text] = pd.to_datetime(series[text].astype(str), errors="coerce", utc=True)
+    return parsed
+
+
+def compute_summary(input_file: str | Path, chunk_rows: int = CHUNK_ROWS) -> dict[str, object]:
+    """Parcourt ``input_file`` une fois et retourne son résumé, sans le mettre en cache."""
+
+    input_file = Path(input_file)
+    use_columnar = columnar_store.is_current(input_file) and columnar_store.has_engine()
+    columns = _columns(input_file, use_columnar)
+    id_col = next((col for col in ID_CANDIDATES if col in columns), None)
+    time_col = next((col for col in TIME_CANDIDATES if col in columns), None)
+
+    rows = 0
+    null_counts = pd.Series(0, index=pd.Index(columns, dtype=object), dtype="int64")
+    subjects: set[object] = set()
+    time_min = time_max = None
+    for chunk in _iter_chunks(input_file, id_col, use_columnar, chunk_rows):
+        rows += len(chunk)
+        null_counts = null_counts.add(chunk.isna().sum(), fill_value=0).astype("int64")
+        if id_col is not None:
+            subjects.update(chunk[id_col].dropna().astype(str).unique())
+        if time_col is not None:
+            times = parse_times(chunk[time_col]).dropna()
+            if not times.empty:
+                time_min = times.min() if time_min is None else min(time_min, times.min())
+                time_max = times.max() if time_max is None else max(time_max, times.max())
+
+    return {
+        "rows": rows,
+        "columns": columns,
+        "null_counts": {str(col): int(null_counts.get(col, 0)) for col in columns},
+        "id_column": id_col,
+        "subjects": len(subjects) if id_col is not None else None,
+        "time_column": time_col,
+        "time_min": time_min.isoformat() if time_min is not None else None,
+        "time_max": time_max.isoformat() if time_max is not None else None,
+        "source": "parquet" if use_columnar else "csv",
+    }
+
+
+def load_summary(input_file: str | Path, *, refresh: bool = False, chunk_rows: int = CHUNK_ROWS) -> dict[str, object]:
+    """Résumé de ``input_file``, relu depuis son fichier de cache s'il est à jour.
+
+    Le cache est invalidé dès que la taille ou la date de modification de
+    l'entrée change, ou avec ``refresh=True``. Un dossier de données en lecture
+    seule n'empêche pas le calcul : le résumé n'est alors simplement pas conservé.
+    """
+
+    input_file = Path(input_file)
+    stat = input_file.stat()
+    key = {"version": SUMMARY_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+    path = sidecar_path(input_file)
+
+    if not refresh and path.exists():
+        try:
+            cached = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            cached = {}
+        if cached.get("key") == key:
+            return cached["summary"]
+
+    summary = compute_summary(input_file, chunk_rows)
+    try:
+        tmp_path = path.with_name(path.name + ".tmp")
+        tmp_path.write_text(json.dumps({"key": key, "summary": summary}, indent=2), encoding="utf-8")
+        tmp_path.replace(path)
+    except OSError as exc:
+        out.warning("Résumé non mis en cache (%s) : %s", path, exc)
+    return summary
@@ -0,0 +1,178 @@
+"""Cache incrémental des CSV de métriques, adressé par contenu.
+
+Chaque corpus possède un manifeste ``csv/<corpus>/cache_manifest.json``. Pour
+chaque job, il conserve une clé calculée à partir :
+
+- du contenu du fichier d'entrée du corpus ;
+- du source du script, de son point d'entrée en mémoire et du chargeur du
+  corpus, avec les modules locaux qu'ils importent (``utils_Mirabelle.py``,
+  ``data_filter.py``…) ;
+- des ``extra_args``, du nom de la métrique et des versions de Python et pandas ;
+- des variables d'environnement qui changent le calcul (``ENVIRONMENT_DEFAULTS``),
+  après application de leur valeur par défaut : passer de
+  ``PROGSNAP2_ENGINE=historique`` à ``faits`` recalcule donc les CSV au lieu de
+  réutiliser ceux de l'autre moteur. ``METRICS_WORKERS`` n'en fait pas partie :
+  le nombre de processus ne change pas les résultats (``partition.map_items``
+  les rend dans l'ordre des éléments), et le modifier ne doit pas vider le cache.
+
+Un job dont la clé n'a pas changé, et dont le CSV est resté tel qu'il a été
+produit, n'est pas relancé. Les empreintes des fichiers sont mémorisées avec
+leur taille et leur date de modification pour éviter de relire un gros corpus
+inchangé à chaque exécution.
+"""
+
+from __future__ import annotations
+
+import ast
+import hashlib
+import json
+import os
+from pathlib import Path
+import platform
+from typing import Iterable
+
+import pandas as pd
+
+from metric_registry import DatasetSpec, MetricJob
+
+
+MANIFEST_FILENAME = "cache_manifest.json"
+MANIFEST_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+# Variables d'environnement lues par les scripts qui changent les résultats,
+# avec la valeur retenue lorsqu'elles sont absentes.
+ENVIRONMENT_DEFAULTS = {
+    "PROGSNAP2_ENGINE": "historique",
+}
+
+
+def _module_name(reference: str) -> str:
+    """``"module:fonction"`` -> ``"module"`` (une chaîne vide reste vide)."""
+
+    return reference.partition(":")[0]
+
+
+def job_environment() -> dict[str, str]:
+    """Valeur effective de chaque variable de ``ENVIRONMENT_DEFAULTS``."""
+
+    return {
+        name: os.environ.get(name, default).strip() or default
+        for name, default in ENVIRONMENT_DEFAULTS.items()
+    }
+
+
+def local_dependencies(scripts_dir: Path, module_names: Iterable[str]) -> list[Path]:
+    """Fichiers Python du projet importés par des scripts, directement ou non.
+
+    Seuls les imports visibles statiquement (``import x``, ``from x import y``)
+    vers un fichier ``x.py`` du dossier de scripts, ou de la racine du projet
+    pour les modules communs aux corpus (``columnar_store.py``…), sont suivis.
+    """
+
+    search_dirs = (scripts_dir, scripts_dir.parent)
+    seen: set[Path] = set()
+    stack = [name for name in module_names if name]
+    while stack:
+        name = stack.pop()
+        path = next((d / f"{name}.py" for d in search_dirs if (d / f"{name}.py").exists()), None)
+        if path is None or path in seen:
+            continue
+        seen.add(path)
+        tree = ast.parse(path.read_text(encoding="utf-8"), filename=str(path))
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                stack.extend(alias.name.split(".")[0] for alias in node.names)
+            elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+                stack.append(node.module.split(".")[0])
+    return sorted(seen)
+
+
+class CacheManifest:
+    """Manifeste JSON d'un corpus : empreintes de fichiers et clés des jobs."""
+
+    def __init__(self, csv_dir: Path) -> None:
+        self.path = csv_dir / MANIFEST_FILENAME
+        self.files: dict[str, dict[str, object]] = {}
+        self.jobs: dict[str, dict[str, object]] = {}
+        if self.path.exists():
+            try:
+                content = json.loads(self.path.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                content = {}
+            if content.get("version") == MANIFEST_VERSION:
+                self.files = content.get("files", {})
+                self.jobs = content.get("jobs", {})
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        content = {"version": MANIFEST_VERSION, "files": self.files, "jobs": self.jobs}
+        tmp_path = self.path.with_suffix(".json.tmp")
+        tmp_path.write_text(json.dumps(content, indent=2, sort_keys=True), encoding="utf-8")
+        tmp_path.replace(self.path)
+
+    def file_digest(self, path: Path) -> str:
+        """SHA-256 d'un fichier, relu seulement si sa taille ou sa date a changé."""
+
+        path = path.resolve()
+        stat = path.stat()
+        entry = self.files.get(str(path))
+        if entry and entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns:
+            return str(entry["sha256"])
+
+        digest = hashlib.sha256()
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        self.files[str(path)] = {
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": digest.hexdigest(),
+        }
+        return digest.hexdigest()
+
+    def job_key(self, spec: DatasetSpec, scripts_dir: Path, input_file: Path, job: MetricJob) -> str:
+        """Clé de cache d'un job ; elle change dès qu'une de ses entrées change."""
+
+        modules = [Path(job.script).stem, _module_name(job.entry_point), _module_name(spec.loader)]
+        if job.runner:
+            modules.append(Path(job.runner).stem)
+        if job.kernel:
+            modules.append(Path(job.kernel).stem)
+        parts: dict[str, object] = {
+            "input": self.file_digest(input_file),
+            "sources": {
+                path.name: self.file_digest(path) for path in local_dependencies(scripts_dir, modules)
+            },
+            "script": job.script,
+            "metric": job.metric,
+            "entry_point": job.entry_point,
+            "extra_args": list(job.extra_args),
+            "runner": job.runner,
+            "kernel": job.kernel,
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "env": job_environment(),
+        }
+        encoded = json.dumps(parts, sort_keys=True).encode("utf-8")
+        return hashlib.sha256(encoded).hexdigest()
+
+    def is_fresh(self, job: MetricJob, key: str, output_path: Path) -> bool:
+        """Vrai si le CSV du job a été produit avec cette clé et n'a pas bougé."""
+
+        entry = self.jobs.get(job.output)
+        if not entry or entry.get("key") != key or not output_path.exists():
+            return False
+        stat = output_path.stat()
+        return entry.get("size") == stat.st_size and entry.get("mtime_ns") == stat.st_mtime_ns
+
+    def record(self, job: MetricJob, key: str, output_path: Path) -> None:
+        stat = output_path.stat()
+        self.jobs[job.output] = {
+            "key": key,
+            "script": job.script,
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+        }
+
+    def forget(self, job: MetricJob) -> None:
+        self.jobs.pop(job.output, None)
@@ -7,6 +7,11 @@ Execution des scripts :
 
     python <script.py> <entrée> <sortie.csv> [arguments supplémentaires]
 
+ou, en mode ``in_process`` du pipeline, ``<module>:<fonction>(table, [arguments
+supplémentaires])`` sur l'entrée chargée une seule fois par ``DatasetSpec.loader``.
+La fonction retourne le dictionnaire ``SubjectID -> valeur`` que le script
+aurait écrit, ou ``None`` lorsqu'il n'aurait rien produit.
+
 Toutes les sorties de métriques doivent contenir une colonne ``SubjectID`` et
 une ou plusieurs colonnes numériques de métriques.
 """
@@ -28,6 +33,30 @@ class MetricJob:
     description: str
     required_columns: tuple[str, ...] = ()
     extra_args: tuple[str, ...] = ()
+    entry_point: str = ""
+    # Limites d'un sous-processus : au-delà, il est tué (statut ``timeout``
+    # ou ``oom``). ``None`` : pas de limite.
+    timeout_s: float | None = None
+    max_rss_mb: float | None = None
+    # Script lancé en sous-processus à la place de ``script``, qui reçoit le nom
+    # de ``script`` en premier argument. Vide : ``script`` lui-même.
+    runner: str = ""
+    # Noyau qui calcule ce job avec les autres jobs du même noyau, en une seule
+    # lecture de l'entrée (voir pipeline_utils.run_metric_jobs). Vide : aucun.
+    kernel: str = ""
+
+
+@dataclass(frozen=True)
+class Prerequisite:
+    """Étape partagée par les jobs d'un corpus, exécutée une fois avant eux.
+
+    ``entry_point`` (``"module:fonction"``, dans le dossier de scripts) reçoit le
+    chemin d'entrée du corpus et produit un artefact que les scripts relisent.
+    """
+
+    name: str
+    entry_point: str
+    description: str
 
 
 @dataclass(frozen=True)
@@ -39,6 +68,14 @@ class DatasetSpec:
     input_path: str
     input_is_directory: bool
     jobs: tuple[MetricJob, ...] = field(default_factory=tuple)
+    loader: str = ""
+    # Lecture texte du fichier d'entrée, utilisée par l'ingestion colonnaire.
+    reader: str = ""
+    # Colonnes lues par les scripts lorsqu'elles existent, sans être requises
+    # (déduplication, segmentation) : elles s'ajoutent à la projection.
+    optional_columns: tuple[str, ...] = ()
+    # Étapes exécutées dans l'ordre avant les jobs (voir pipeline_utils.run_all_datasets).
+    prerequisites: tuple[Prerequisite, ...] = ()
 
     def scripts_path(self, project_dir: Path) -> Path:
         return project_dir / self.scripts_dir
@@ -63,6 +100,11 @@ def job(
     description: str,
     required_columns: Sequence[str] = (),
     extra_args: Sequence[str] = (),
+    entry_point: str | None = None,
+    timeout_s: float | None = None,
+    max_rss_mb: float | None = None,
+    runner: str = "",
+    kernel: str = "",
 ) -> MetricJob:
 
     return MetricJob(
@@ -72,12 +114,22 @@ def job(
         description=description,
         required_columns=tuple(required_columns),
         extra_args=tuple(str(arg) for arg in extra_args),
+        entry_point=entry_point or f"{Path(script).stem}:compute_metric_map",
+        timeout_s=timeout_s,
+        max_rss_mb=max_rss_mb,
+        runner=runner,
+        kernel=kernel,
     )
 
 
 # ---------------------------------------------------------------------------
 # Mirabelle
 # ---------------------------------------------------------------------------
+# EQ, EQ_FE, RED et RED_FE sont calculés ensemble par error_metrics_Mirabelle.py,
+# qui construit tentatives et segments une seule fois par étudiant ; chaque
+# script reste exécutable seul.
+ERROR_KERNEL = "error_metrics_Mirabelle.py"
+
 MIRABELLE_JOBS = (
     job(
         "session_count_Mirabelle.py",
@@ -128,6 +180,7 @@ MIRABELLE_JOBS = (
         "ErrorQuotient_FE",
         "Error Quotient, identité d'erreur au niveau du verdict.",
         ["actor", "verb", "tests", "timestamp.$date"],
+        kernel=ERROR_KERNEL,
     ),
     job(
         "eq_Mirabelle.py",
@@ -135,6 +188,7 @@ MIRABELLE_JOBS = (
         "ErrorQuotient",
         "Error Quotient, identité d'erreur au niveau du message détaillé.",
         ["actor", "verb", "tests", "timestamp.$date"],
+        kernel=ERROR_KERNEL,
     ),
     job(
         "red_FE_Mirabelle.py",
@@ -142,6 +196,7 @@ MIRABELLE_JOBS = (
         "RED_FE",
         "Repeated Error Density, identité d'erreur au niveau du verdict.",
         ["actor", "verb", "tests", "timestamp.$date"],
+        kernel=ERROR_KERNEL,
     ),
     job(
         "red_Mirabelle.py",
@@ -149,6 +204,7 @@ MIRABELLE_JOBS = (
         "RED",
         "Repeated Error Density, identité d'erreur au niveau du message détaillé.",
         ["actor", "verb", "tests", "timestamp.$date"],
+        kernel=ERROR_KERNEL,
     ),
     job(
         "attempts_to_first_success_Mirabelle.py",
@@ -312,24 +368,43 @@ NOWLEDGEABLE_JOBS = (
 # ProgSnap2
 # ---------------------------------------------------------------------------
 
+# Les scripts non protégés sont calculés ensemble par session_metrics.py, qui
+# écrit leurs CSV en une seule lecture de la table filtrée ; chaque script
+# reste exécutable seul.
+SESSION_KERNEL = "session_metrics.py"
+
 PROGSNAP2_JOBS = (
-    job("compile_count.py", "compile_count.csv", "CompileCount", "Nombre moyen de compilations par session filtrée."),
-    job("compile_span.py", "compile_span.csv", "CompileSpanMinutes", "Durée moyenne des épisodes de compilation par session filtrée."),
-    job("compil_ratio.py", "compile_success_rate.csv", "CompileSuccessRate", "Taux moyen de compilations réussies par session filtrée."),
-    job("first_compile_vs_global_first.py", "first_compile_vs_global_first.csv", "MinutesFromGlobalFirstCompile", "Décalage de la première compilation d'une session par rapport à la première compilation du corpus."),
-    job("last_compile_vs_global_last.py", "last_compile_vs_global_last.csv", "MinutesToGlobalLastCompile", "Décalage de la dernière compilation d'une session par rapport à la dernière compilation du corpus."),
-    job("frac_long.py", "fraction_long_gaps.csv", "FracLong", "Fraction moyenne des intervalles > 5 minutes entre compilations d'une session.", extra_args=["5.0"]),
-    job("session_count.py", "session_count.csv", "SessionCount", "Nombre moyen de sous-sessions de compilation par session ProgSnap2.", extra_args=["5.0"]),
-    job("mean_test_score.py", "mean_test_score.csv", "MeanTestScore", "Score moyen des événements de test/exécution par session."),
-    job("time_to_score1.py", "time_to_score1.csv", "MinutesToScore1", "Temps moyen d'une session jusqu'au premier score égal à 1, plafonné à 60 min si jamais atteint."),
-    job("eq.py", "error_quotient.csv", "ErrorQuotient", "Error Quotient original appliqué aux erreurs de compilation ProgSnap2."),
-    job("red.py", "red.csv", "RED", "Repeated Error Density originale appliquée aux erreurs de compilation ProgSnap2."),
+    job("compile_count.py", "compile_count.csv", "CompileCount", "Nombre moyen de compilations par session filtrée.", kernel=SESSION_KERNEL),
+    job("compile_span.py", "compile_span.csv", "CompileSpanMinutes", "Durée moyenne des épisodes de compilation par session filtrée.", kernel=SESSION_KERNEL),
+    job("compil_ratio.py", "compile_success_rate.csv", "CompileSuccessRate", "Taux moyen de compilations réussies par session filtrée.", kernel=SESSION_KERNEL),
+    job("first_compile_vs_global_first.py", "first_compile_vs_global_first.csv", "MinutesFromGlobalFirstCompile", "Décalage de la première compilation d'une session par rapport à la première compilation du corpus.", kernel=SESSION_KERNEL),
+    job("last_compile_vs_global_last.py", "last_compile_vs_global_last.csv", "MinutesToGlobalLastCompile", "Décalage de la dernière compilation d'une session par rapport à la dernière compilation du corpus.", kernel=SESSION_KERNEL),
+    job("frac_long.py", "fraction_long_gaps.csv", "FracLong", "Fraction moyenne des intervalles > 5 minutes entre compilations d'une session.", extra_args=["5.0"], kernel=SESSION_KERNEL),
+    job("session_count.py", "session_count.csv", "SessionCount", "Nombre moyen de sous-sessions de compilation par session ProgSnap2.", extra_args=["5.0"], kernel=SESSION_KERNEL),
+    job("mean_test_score.py", "mean_test_score.csv", "MeanTestScore", "Score moyen des événements de test/exécution par session.", kernel=SESSION_KERNEL),
+    job("time_to_score1.py", "time_to_score1.csv", "MinutesToScore1", "Temps moyen d'une session jusqu'au premier score égal à 1, plafonné à 60 min si jamais atteint.", kernel=SESSION_KERNEL),
+    # Scripts protégés : leur point d'entrée en mémoire vit dans protected_metrics.py,
+    # qui les exécute aussi en sous-processus (moteur choisi par PROGSNAP2_ENGINE).
+    job(
+        "eq.py", "error_quotient.csv", "ErrorQuotient",
+        "Error Quotient original appliqué aux erreurs de compilation ProgSnap2.",
+        entry_point="protected_metrics:eq_metric_map",
+        runner="protected_metrics.py",
+    ),
+    job(
+        "red.py", "red.csv", "RED",
+        "Repeated Error Density originale appliquée aux erreurs de compilation ProgSnap2.",
+        entry_point="protected_metrics:red_metric_map",
+        runner="protected_metrics.py",
+    ),
     job(
         "watwin.py",
         "watwin.csv",
         "WatWin",
         "Score WatWin fondé sur répétition d'erreurs et temps de correction.",
         ["SourceLocation"],
+        entry_point="protected_metrics:watwin_metric_map",
+        runner="protected_metrics.py",
     ),
 )
 
@@ -341,6 +416,16 @@ DATASETS: dict[str, DatasetSpec] = {
         input_path="data/donnees_2024-09-20_10h15-11h45.csv",
         input_is_directory=False,
         jobs=MIRABELLE_JOBS,
+        loader="utils_Mirabelle:load_csv",
+        reader="utils_Mirabelle:read_input_csv",
+        optional_columns=("_id.$oid", "filename_infere", "session.id", "P_codeState"),
+        prerequisites=(
+            Prerequisite(
+                "tests_analyses",
+                "utils_Mirabelle:build_tests_cache",
+                "Analyse de la colonne tests des Run.Test, mémorisée pour tous les scripts.",
+            ),
+        ),
     ),
     "Nowledgeable": DatasetSpec(
         name="Nowledgeable",
@@ -348,6 +433,9 @@ DATASETS: dict[str, DatasetSpec] = {
         input_path="data/session_13568_answers_corrige.csv",
         input_is_directory=False,
         jobs=NOWLEDGEABLE_JOBS,
+        loader="utils_Nowledgeable:load_csv",
+        reader="utils_Nowledgeable:read_input_csv",
+        optional_columns=("answerUuid",),
     ),
     "Progsnap2": DatasetSpec(
         name="Progsnap2",
@@ -355,6 +443,15 @@ DATASETS: dict[str, DatasetSpec] = {
         input_path="data",
         input_is_directory=True,
         jobs=PROGSNAP2_JOBS,
+        loader="data_filter:load_main_table",
+        reader="data_filter:read_main_table_csv",
+        prerequisites=(
+            Prerequisite(
+                "table_filtree",
+                "data_filter:build_cache",
+                "Sessions et filtrage de MainTable.csv, mis en cache pour tous les scripts.",
+            ),
+        ),
     ),
 }
 
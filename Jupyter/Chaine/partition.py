@@ -0,0 +1,160 @@
+"""Découpage d'une table par étudiant, commun aux scripts Mirabelle et Nowledgeable.
+
+Les scripts parcouraient leurs étudiants avec ``df[df[colonne] == étudiant]`` :
+un parcours complet de la table par étudiant, soit un coût en
+``étudiants × lignes``. Ici, la table est triée une seule fois par étudiant
+(tri stable : l'ordre des lignes d'un même étudiant est conservé) et chaque
+étudiant reçoit une tranche contiguë ``iloc[début:fin]`` de la table triée,
+sans nouvelle copie. La tranche contient les mêmes lignes, dans le même ordre
+et avec le même index, que l'ancien filtrage.
+
+``map_groups`` applique en plus une fonction à chaque tranche, par
+``map_items`` : le réservoir de processus commun aux trois corpus (il sert
+aussi à ``utils.calculate_metric_map`` côté ProgSnap2). Avec
+``max_workers > 1`` (par défaut ``workers()``, soit ``METRICS_WORKERS``, 1 par
+défaut), les éléments sont répartis par blocs entre des processus ``fork``,
+qui héritent de la table sans copie ; sans ``fork`` (Windows, macOS), le
+calcul reste séquentiel. Les résultats sont toujours rendus dans l'ordre des
+éléments, quel que soit l'ordre de fin des processus. La fonction doit rendre
+une valeur sérialisable ; ses lignes de journal sont écrites par le processus
+qui la calcule.
+
+Ce module est importé depuis les dossiers de scripts ; il ne dépend donc que
+de pandas et numpy.
+"""
+
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterator, Sequence
+
+import numpy as np
+import pandas as pd
+
+out = logging.getLogger()
+
+WORKERS_VARIABLE = "METRICS_WORKERS"
+
+
+def workers() -> int:
+    """Nombre de processus de ``map_items`` (``METRICS_WORKERS``, 1 par défaut)."""
+
+    return max(1, int(os.environ.get(WORKERS_VARIABLE, "1")))
+
+
+class Groups:
+    """Table triée une fois par ``column`` et bornes de chaque valeur.
+
+    Les lignes dont la clé est manquante sont écartées, comme avec
+    ``df[df[column] == clé]``.
+    """
+
+    def __init__(self, table: pd.DataFrame, column: str) -> None:
+        table = table[table[column].notna()]
+        self.table = table.sort_values(column, kind="stable")
+        values = self.table[column]
+        starts = np.flatnonzero(values.ne(values.shift()).to_numpy(dtype=bool, na_value=True))
+        ends = np.append(starts[1:], len(values))
+        self.bounds = dict(zip(values.iloc[starts].tolist(), zip(starts.tolist(), ends.tolist())))
+
+    def keys(self) -> list:
+        """Clés présentes, dans l'ordre de ``sorted``."""
+
+        return sorted(self.bounds)
+
+    def rows(self, key) -> pd.DataFrame:
+        """Lignes de ``key`` (table vide aux mêmes colonnes si ``key`` est absente)."""
+
+        start, end = self.bounds.get(key, (0, 0))
+        return self.table.iloc[start:end]
+
+
+def iter_groups(
+    table: pd.DataFrame, column: str, keys: Sequence | None = None
+) -> Iterator[tuple[Any, pd.DataFrame]]:
+    """Couples ``(clé, lignes)`` dans l'ordre de ``keys`` (par défaut : clés présentes triées).
+
+    Une clé de ``keys`` absente de la table reçoit une table vide.
+    """
+
+    groups = Groups(table, column)
+    for key in groups.keys() if keys is None else keys:
+        yield key, groups.rows(key)
+
+
+# État partagé avec les processus de calcul : hérité par ``fork``, il n'est
+# jamais sérialisé (la fonction appliquée peut être une lambda).
+_WORKER_STATE = None
+
+
+def _apply(fn, items: Sequence) -> list:
+    return [fn(item) for item in items]
+
+
+def _apply_in_worker(items: Sequence) -> list:
+    return _apply(_WORKER_STATE, items)
+
+
+def map_items(
+    fn: Callable[[Any], Any],
+    items: Sequence,
+    max_workers: int | None = None,
+    on_chunk: Callable[[int], None] | None = None,
+) -> list:
+    """``[fn(item) for item in items]``, éventuellement réparti entre des processus ``fork``.
+
+    Les éléments sont traités par blocs contigus ; ``on_chunk(n)`` est appelé
+    dans le processus courant après chaque bloc, avec le nombre d'éléments
+    traités jusque-là (barre de progression).
+    """
+
+    global _WORKER_STATE
+
+    items = list(items)
+    if max_workers is None:
+        max_workers = workers()
+    if max_workers > 1 and "fork" not in multiprocessing.get_all_start_methods():
+        out.warning("Méthode de démarrage 'fork' indisponible : calcul séquentiel")
+        max_workers = 1
+    max_workers = max(1, min(max_workers, len(items)))
+    n_chunks = max(1, min(len(items), 4 * max_workers, 100))
+    edges = np.linspace(0, len(items), n_chunks + 1).astype(int)
+    chunks = [items[first:last] for first, last in zip(edges[:-1], edges[1:])]
+
+    def collect(chunk_results) -> list:
+        results = []
+        for last, chunk in zip(edges[1:], chunk_results):
+            results.extend(chunk)
+            if on_chunk is not None and len(items):
+                on_chunk(int(last))
+        return results
+
+    if max_workers == 1:
+        return collect(_apply(fn, chunk) for chunk in chunks)
+
+    _WORKER_STATE = fn
+    try:
+        context = multiprocessing.get_context("fork")
+        with ProcessPoolExecutor(max_workers, mp_context=context) as executor:
+            futures = [executor.submit(_apply_in_worker, chunk) for chunk in chunks]
+            return collect(future.result() for future in futures)
+    finally:
+        _WORKER_STATE = None
+
+
+def map_groups(
+    table: pd.DataFrame,
+    column: str,
+    fn: Callable[[pd.DataFrame], Any],
+    keys: Sequence | None = None,
+    max_workers: int | None = None,
+) -> list[tuple[Any, Any]]:
+    """Couples ``(clé, fn(lignes))`` dans l'ordre de ``keys`` (voir ``iter_groups``)."""
+
+    groups = Groups(table, column)
+    keys = groups.keys() if keys is None else list(keys)
+    results = map_items(lambda key: fn(groups.rows(key)), keys, max_workers)
+    return list(zip(keys, results))
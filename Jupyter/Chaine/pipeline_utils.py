@@ -6,19 +6,43 @@ existaient auparavant dans les notebooks Mirabelle, Nowledgeable et ProgSnap2.
 
 from __future__ import annotations
 
-from dataclasses import asdict
-from functools import reduce
+import argparse
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+import csv
+from dataclasses import asdict, dataclass
+import importlib
+import logging
+import os
 from pathlib import Path
-import subprocess
 import sys
-from typing import Iterable
+import traceback
+from typing import Any, Callable, Iterable, Iterator, Mapping, Sequence
 
+import numpy as np
 import pandas as pd
 
-from metric_registry import DatasetSpec, MetricJob, get_dataset
-
-
-REPORT_FILENAMES = {"run_report.csv", "stats.csv"}
+import columnar_store
+import input_summary
+from metric_cache import CacheManifest
+from metric_registry import DATASETS, DatasetSpec, MetricJob, Prerequisite, get_dataset
+import progress
+import resource_usage
+
+
+REPORT_FILENAMES = {"run_report.csv", "stats.csv", "batch_report.csv"}
+RUN_MODES = ("subprocess", "in_process")
+LOG_FORMAT = "%(asctime)s [%(levelname)-5.5s]  %(message)s"
+BATCH_REPORT_FILENAME = "batch_report.csv"
+# Convention d'appel des noyaux (MetricJob.kernel) : fonction appelée en mode
+# in_process, et séparateur des jobs sur la ligne de commande.
+KERNEL_ENTRY_POINT = "compute_metric_maps"
+KERNEL_JOB_SEPARATOR = "--"
+INGESTION_PREREQUISITE = Prerequisite(
+    "ingestion",
+    "pipeline_utils:ingest_dataset",
+    "Copie colonnaire (Parquet) de l'entrée, lue ensuite par tous les scripts.",
+)
 
 
 def detect_project_dir(start: Path | None = None) -> Path:
@@ -48,8 +72,13 @@ def inspect_input(
     project_dir: Path,
     spec: DatasetSpec,
     input_override: Path | None = None,
+    columns: Sequence[str] | None = None,
 ) -> tuple[pd.DataFrame, pd.DataFrame]:
-    """Charge l'entrée et retourne ``(table, résumé)`` pour le notebook."""
+    """Charge l'entrée et retourne ``(table, résumé)`` pour le notebook.
+
+    La copie colonnaire produite par ``ingest_dataset`` est lue si elle est à
+    jour ; ``columns`` limite alors la lecture aux colonnes utiles.
+    """
 
     input_file = dataset_input_file(project_dir, spec, input_override)
     if not input_file.exists():
@@ -57,7 +86,11 @@ def inspect_input(
 
     # Le moteur Python est utile pour Mirabelle ; il reste compatible avec les
     # deux autres fichiers et rend la lecture homogène dans les notebooks.
-    df = pd.read_csv(input_file, on_bad_lines="skip", engine="python")
+    df = columnar_store.read_input(
+        input_file,
+        lambda path: pd.read_csv(path, on_bad_lines="skip", engine="python"),
+        columns,
+    )
 
     id_candidates = ["SubjectID", "actor", "studentId"]
     id_col = next((col for col in id_candidates if col in df.columns), None)
@@ -74,6 +107,97 @@ def inspect_input(
     return df, summary
 
 
+def summarize_input(
+    project_dir: Path,
+    spec: DatasetSpec,
+    input_override: Path | None = None,
+    *,
+    refresh: bool = False,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Résumé de l'entrée pour le notebook, sans la charger en mémoire.
+
+    Retourne ``(résumé, colonnes)`` : le résumé a les colonnes de celui
+    d'``inspect_input``, plus la période couverte (``debut``, ``fin``) ; la
+    seconde table donne les valeurs manquantes de chaque colonne. L'entrée est
+    parcourue par blocs et le résultat est mis en cache à côté d'elle (voir
+    ``input_summary``) : rouvrir le notebook ne relit pas le fichier.
+    """
+
+    input_file = dataset_input_file(project_dir, spec, input_override)
+    if not input_file.exists():
+        raise FileNotFoundError(f"Fichier d'entrée introuvable : {input_file}")
+
+    content = input_summary.load_summary(input_file, refresh=refresh)
+    columns = list(content["columns"])
+    summary = pd.DataFrame([
+        {
+            "corpus": spec.name,
+            "fichier": input_file.name,
+            "lignes": content["rows"],
+            "colonnes": len(columns),
+            "sujets_uniques": content["subjects"],
+            "colonne_identifiant": content["id_column"],
+            "colonne_horodatage": content["time_column"],
+            "debut": content["time_min"],
+            "fin": content["time_max"],
+        }
+    ])
+    null_counts = pd.Series(content["null_counts"], dtype="int64").reindex(columns, fill_value=0)
+    column_table = pd.DataFrame({
+        "colonne": columns,
+        "valeurs_manquantes": null_counts.to_numpy(),
+        "part_manquante": (null_counts / content["rows"]).round(4).to_numpy() if content["rows"] else 0.0,
+    })
+    return summary, column_table
+
+
+def ingest_dataset(
+    project_dir: Path,
+    spec: DatasetSpec,
+    input_override: Path | None = None,
+    *,
+    force: bool = False,
+) -> Path:
+    """Convertit l'entrée d'un corpus en copie colonnaire (Parquet) à côté du CSV.
+
+    Le CSV est lu par ``DatasetSpec.reader``, c'est-à-dire exactement comme le
+    lisent les scripts : la copie porte donc les mêmes lignes et les mêmes types
+    de colonnes, et les métriques calculées dessus sont identiques. Une copie
+    déjà à jour n'est pas régénérée, sauf avec ``force=True``.
+    """
+
+    input_file = dataset_input_file(project_dir, spec, input_override)
+    if not input_file.exists():
+        raise FileNotFoundError(f"Fichier d'entrée introuvable : {input_file}")
+    if not force and columnar_store.is_current(input_file):
+        return columnar_store.columnar_path(input_file)
+
+    log_dir = spec.log_dir(project_dir)
+    log_dir.mkdir(parents=True, exist_ok=True)
+    with _working_directory(project_dir), _captured_output(
+        log_dir / "ingestion.log", "APPEL\n" + f"{spec.reader} {input_file}" + "\n\nSORTIE"
+    ):
+        table = _resolve_entry_point(spec.scripts_path(project_dir), spec.reader)(str(input_file))
+        return columnar_store.write_columnar(table, input_file)
+
+
+def projected_columns(spec: DatasetSpec, jobs: Iterable[MetricJob]) -> list[str] | None:
+    """Colonnes à charger pour ``jobs``, ou ``None`` s'il faut tout charger.
+
+    La projection n'est sûre que si chaque job déclare ses colonnes : un job
+    sans ``required_columns`` (scripts ProgSnap2 historiques) impose la table
+    entière.
+    """
+
+    columns: dict[str, None] = {}
+    for metric_job in jobs:
+        if not metric_job.required_columns:
+            return None
+        columns.update(dict.fromkeys(metric_job.required_columns))
+    columns.update(dict.fromkeys(spec.optional_columns))
+    return list(columns)
+
+
 def missing_columns(job: MetricJob, columns: Iterable[str]) -> list[str]:
     """Colonnes brutes absentes pour un job, d'après le registre."""
 
@@ -116,6 +240,465 @@ def _remove_stale_output(path: Path) -> None:
             path.unlink()
 
 
+def _execute_metric_job(
+    project_dir: Path,
+    script_path: Path,
+    input_path: Path,
+    output_path: Path,
+    log_path: Path,
+    metric_job: MetricJob,
+    row: dict[str, object],
+) -> dict[str, object]:
+    """Lance un script de métrique, écrit son journal et valide sa sortie.
+
+    La fonction ne touche qu'aux fichiers propres au job (CSV et journal) : elle
+    peut donc être appelée depuis plusieurs threads simultanément.
+    """
+
+    command = [
+        sys.executable,
+        str(script_path),
+        str(input_path),
+        str(output_path),
+        *metric_job.extra_args,
+    ]
+    if metric_job.runner:
+        command[1:2] = [str(script_path.with_name(metric_job.runner)), metric_job.script]
+    returncode, stdout, stderr, usage, exceeded = resource_usage.run_command(
+        command, project_dir, timeout_s=metric_job.timeout_s, max_rss_mb=metric_job.max_rss_mb
+    )
+    row.update(usage)
+
+    limit_message = _limit_message(exceeded, metric_job.timeout_s, metric_job.max_rss_mb)
+    log_path.write_text(
+        "COMMANDE\n" + " ".join(command) + "\n\n"
+        + "STDOUT\n" + stdout + "\n\n"
+        + "STDERR\n" + stderr
+        + ("\n\nLIMITE\n" + limit_message if exceeded else ""),
+        encoding="utf-8",
+    )
+    _record_subprocess_result(output_path, metric_job, row, returncode, exceeded, limit_message)
+    return row
+
+
+def _execute_group(
+    project_dir: Path,
+    input_path: Path,
+    group: list[tuple[Path, Path, Path, MetricJob, dict[str, object]]],
+) -> None:
+    """Exécute un groupe de ``_pending_groups`` : un noyau commun ou un seul job."""
+
+    if group[0][3].kernel:
+        _execute_kernel_jobs(project_dir, input_path, group)
+        return
+    script_path, output_path, log_path, metric_job, row = group[0]
+    _execute_metric_job(project_dir, script_path, input_path, output_path, log_path, metric_job, row)
+
+
+def _limit_message(exceeded: str | None, timeout_s: float | None, max_rss_mb: float | None) -> str:
+    if exceeded == "timeout":
+        return f"Job interrompu après {timeout_s} s (timeout_s)."
+    if exceeded == "oom":
+        return f"Job interrompu au-delà de {max_rss_mb} Mo de mémoire (max_rss_mb)."
+    return ""
+
+
+def _record_subprocess_result(
+    output_path: Path,
+    metric_job: MetricJob,
+    row: dict[str, object],
+    returncode: int,
+    exceeded: str | None,
+    limit_message: str,
+) -> None:
+    """Renseigne le statut d'un job d'après le sous-processus qui a écrit son CSV."""
+
+    row["returncode"] = returncode
+    if exceeded is not None:
+        # Un CSV partiellement écrit avant l'arrêt ne doit pas passer pour un résultat.
+        _remove_stale_output(output_path)
+        row.update(status=exceeded, message=limit_message)
+    elif returncode != 0:
+        _remove_stale_output(output_path)
+        row.update(status="error", message="Le script s'est terminé en erreur ; voir le journal.")
+    elif not output_path.exists():
+        row.update(status="no_output", message="Le script n'a produit aucun CSV.")
+    else:
+        _validate_job_output(output_path, metric_job, row)
+        resource_usage.throughput(row)
+
+
+def _pending_groups(
+    pending: list[tuple[Path, Path, Path, MetricJob, dict[str, object]]],
+) -> list[list[tuple[Path, Path, Path, MetricJob, dict[str, object]]]]:
+    """Regroupe les jobs en attente d'un même noyau (``MetricJob.kernel``).
+
+    Les autres jobs forment chacun leur propre groupe ; l'ordre des groupes
+    suit celui de leur premier job.
+    """
+
+    groups: list[list[tuple[Path, Path, Path, MetricJob, dict[str, object]]]] = []
+    by_kernel: dict[str, list[tuple[Path, Path, Path, MetricJob, dict[str, object]]]] = {}
+    for item in pending:
+        kernel = item[3].kernel
+        if not kernel:
+            groups.append([item])
+        elif kernel in by_kernel:
+            by_kernel[kernel].append(item)
+        else:
+            by_kernel[kernel] = [item]
+            groups.append(by_kernel[kernel])
+    return groups
+
+
+def _group_limit(limits: Iterable[float | None]) -> float | None:
+    """Limite d'un groupe de jobs : la plus large, ou aucune si l'un d'eux n'en a pas."""
+
+    limits = list(limits)
+    return None if any(limit is None for limit in limits) else max(limits)
+
+
+def _execute_kernel_jobs(
+    project_dir: Path,
+    input_path: Path,
+    group: list[tuple[Path, Path, Path, MetricJob, dict[str, object]]],
+) -> None:
+    """Lance le noyau commun d'un groupe de jobs dans un seul sous-processus.
+
+    Le noyau reçoit ``<entrée> -- <script> <sortie.csv> [arguments]`` pour
+    chaque job et écrit tous leurs CSV. Le journal est commun
+    (``logs/<noyau>.log``) et chaque job reçoit le coût du sous-processus.
+    """
+
+    kernel = group[0][3].kernel
+    script_path, _, log_path, _, _ = group[0]
+    log_path = log_path.with_name(f"{Path(kernel).stem}.log")
+    command = [sys.executable, str(script_path.with_name(kernel)), str(input_path)]
+    for _, output_path, _, metric_job, _ in group:
+        command += [KERNEL_JOB_SEPARATOR, metric_job.script, str(output_path), *metric_job.extra_args]
+    timeout_s = _group_limit(metric_job.timeout_s for _, _, _, metric_job, _ in group)
+    max_rss_mb = _group_limit(metric_job.max_rss_mb for _, _, _, metric_job, _ in group)
+    returncode, stdout, stderr, usage, exceeded = resource_usage.run_command(
+        command, project_dir, timeout_s=timeout_s, max_rss_mb=max_rss_mb
+    )
+
+    limit_message = _limit_message(exceeded, timeout_s, max_rss_mb)
+    log_path.write_text(
+        "COMMANDE\n" + " ".join(command) + "\n\n"
+        + "STDOUT\n" + stdout + "\n\n"
+        + "STDERR\n" + stderr
+        + ("\n\nLIMITE\n" + limit_message if exceeded else ""),
+        encoding="utf-8",
+    )
+    for _, output_path, _, metric_job, row in group:
+        row.update(usage, log_path=str(log_path))
+        _record_subprocess_result(output_path, metric_job, row, returncode, exceeded, limit_message)
+
+
+def _validate_job_output(output_path: Path, metric_job: MetricJob, row: dict[str, object]) -> None:
+    """Relit le CSV produit par un job et renseigne son statut dans ``row``."""
+
+    try:
+        produced = pd.read_csv(output_path)
+        validation_errors = validate_metric_output(produced, metric_job)
+        if validation_errors:
+            _remove_stale_output(output_path)
+            row.update(
+                status="invalid_output",
+                rows=int(produced.shape[0]),
+                columns=", ".join(produced.columns.astype(str)),
+                message="; ".join(validation_errors),
+            )
+        else:
+            row.update(
+                status="ok",
+                rows=int(produced.shape[0]),
+                columns=", ".join(produced.columns.astype(str)),
+                message="CSV produit et validé",
+            )
+    except Exception as exc:  # pragma: no cover - garde-fou notebook
+        _remove_stale_output(output_path)
+        row.update(status="invalid_output", message=f"CSV illisible : {exc}")
+
+
+def write_metric_map(name: str, metric_map: dict[Any, Any], path: Path) -> None:
+    """Écrit ``SubjectID, <name>`` trié par sujet, au format des scripts."""
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        writer = csv.DictWriter(file, fieldnames=["SubjectID", name], lineterminator="\n")
+        writer.writeheader()
+        for subject_id, value in sorted(metric_map.items()):
+            writer.writerow({"SubjectID": subject_id, name: value})
+
+
+@contextmanager
+def _working_directory(path: Path) -> Iterator[None]:
+    """Change temporairement de dossier courant (``contextlib.chdir`` en 3.11)."""
+
+    previous = Path.cwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+@contextmanager
+def _captured_output(log_path: Path, header: str) -> Iterator[None]:
+    """Redirige print, sorties standard et logging racine vers un journal de job.
+
+    Les handlers du logger racine sont remplacés le temps du job, puis restaurés :
+    ceux que les scripts installent à l'import (``basicConfig``,
+    ``utils.setup_logging``) ne survivent donc pas à la fermeture du journal.
+    """
+
+    root = logging.getLogger()
+    saved_handlers = root.handlers[:]
+    saved_level = root.level
+    with open(log_path, "w", encoding="utf-8") as log_file:
+        log_file.write(header + "\n\n")
+        handler = logging.StreamHandler(log_file)
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        root.handlers = [handler]
+        root.setLevel(logging.DEBUG if saved_level == logging.DEBUG else logging.INFO)
+        try:
+            with redirect_stdout(log_file), redirect_stderr(log_file):
+                yield
+        finally:
+            handler.flush()
+            root.handlers = saved_handlers
+            root.setLevel(saved_level)
+
+
+def _resolve_entry_point(scripts_dir: Path, reference: str) -> Callable[..., Any]:
+    """Importe ``module:fonction`` depuis le dossier de scripts d'un corpus.
+
+    Les scripts s'importent entre eux par leur nom court (``utils``,
+    ``data_filter``…), comme lorsqu'ils sont lancés directement. Un module déjà
+    importé sous le même nom depuis un autre dossier est donc oublié avant
+    l'import, pour ne pas mélanger deux corpus dans le même processus.
+    """
+
+    module_name, _, function_name = reference.partition(":")
+    if not module_name or not function_name:
+        raise ValueError(f"Point d'entrée invalide (attendu 'module:fonction') : {reference!r}")
+
+    scripts_dir = scripts_dir.resolve()
+    if str(scripts_dir) not in sys.path:
+        sys.path.insert(0, str(scripts_dir))
+    for local_name in {path.stem for path in scripts_dir.glob("*.py")}:
+        loaded = sys.modules.get(local_name)
+        module_file = getattr(loaded, "__file__", None)
+        if loaded is not None and (module_file is None or Path(module_file).resolve().parent != scripts_dir):
+            del sys.modules[local_name]
+
+    module = importlib.import_module(module_name)
+    return getattr(module, function_name)
+
+
+def _execute_metric_job_in_process(
+    scripts_dir: Path,
+    table: pd.DataFrame,
+    output_path: Path,
+    log_path: Path,
+    metric_job: MetricJob,
+    row: dict[str, object],
+) -> dict[str, object]:
+    """Calcule une métrique sur la table partagée, puis écrit et valide le CSV.
+
+    Le job reçoit sa propre copie de la table : un script qui ajoute des colonnes
+    (WatWin, par exemple) ne modifie pas l'entrée des jobs suivants.
+    """
+
+    header = "APPEL\n" + " ".join([metric_job.entry_point, *metric_job.extra_args]) + "\n\nSORTIE"
+    usage: dict[str, object] = {}
+    with _captured_output(log_path, header), resource_usage.measure(usage):
+        metric_map, returncode = _call_entry_point(
+            scripts_dir, metric_job.entry_point, table.copy(), *metric_job.extra_args
+        )
+        if returncode == 0 and metric_map is not None:
+            write_metric_map(metric_job.metric, metric_map, output_path)
+
+    # Le coût du job inclut l'écriture du CSV, comme pour un sous-processus.
+    row.update(usage)
+    _record_in_process_result(output_path, metric_job, row, returncode, metric_map)
+    return row
+
+
+def _call_entry_point(scripts_dir: Path, reference: str, *args: Any) -> tuple[Any, int]:
+    """Appelle un point d'entrée ; retourne son résultat et le code retour équivalent."""
+
+    try:
+        compute = _resolve_entry_point(scripts_dir, reference)
+        return compute(*args), 0
+    except SystemExit as exc:
+        # Même convention que le code retour d'un script lancé seul.
+        if exc.code is None or isinstance(exc.code, int):
+            return None, exc.code or 0
+        print(exc.code, file=sys.stderr)
+        return None, 1
+    except Exception:
+        traceback.print_exc()
+        return None, 1
+
+
+def _record_in_process_result(
+    output_path: Path,
+    metric_job: MetricJob,
+    row: dict[str, object],
+    returncode: int,
+    metric_map: dict[Any, Any] | None,
+) -> None:
+    row["returncode"] = returncode
+    if returncode != 0:
+        _remove_stale_output(output_path)
+        row.update(status="error", message="Le calcul s'est terminé en erreur ; voir le journal.")
+    elif metric_map is None:
+        row.update(status="no_output", message="Le calcul n'a produit aucune métrique.")
+    else:
+        _validate_job_output(output_path, metric_job, row)
+        resource_usage.throughput(row)
+
+
+def _execute_kernel_jobs_in_process(
+    scripts_dir: Path,
+    table: pd.DataFrame,
+    group: list[tuple[Path, Path, Path, MetricJob, dict[str, object]]],
+) -> None:
+    """Calcule un groupe de jobs avec leur noyau commun, sur la table partagée."""
+
+    kernel = Path(group[0][3].kernel).stem
+    log_path = group[0][2].with_name(f"{kernel}.log")
+    kernel_jobs = [(metric_job.script, metric_job.extra_args) for _, _, _, metric_job, _ in group]
+    header = "APPEL\n" + f"{kernel}:{KERNEL_ENTRY_POINT} " + " ".join(
+        " ".join([script, *extra_args]) for script, extra_args in kernel_jobs
+    ) + "\n\nSORTIE"
+    usage: dict[str, object] = {}
+    with _captured_output(log_path, header), resource_usage.measure(usage):
+        metric_maps, returncode = _call_entry_point(
+            scripts_dir, f"{kernel}:{KERNEL_ENTRY_POINT}", table.copy(), kernel_jobs
+        )
+        metric_maps = metric_maps or {}
+        if returncode == 0:
+            for _, output_path, _, metric_job, _ in group:
+                if metric_maps.get(metric_job.script) is not None:
+                    write_metric_map(metric_job.metric, metric_maps[metric_job.script], output_path)
+
+    for _, output_path, _, metric_job, row in group:
+        row.update(usage, log_path=str(log_path))
+        _record_in_process_result(output_path, metric_job, row, returncode, metric_maps.get(metric_job.script))
+
+
+def dataset_prerequisites(spec: DatasetSpec, *, ingest: bool = False) -> list[Prerequisite]:
+    """Étapes à exécuter, dans l'ordre, avant les jobs d'un corpus.
+
+    L'ingestion colonnaire, si elle est demandée, précède les étapes du
+    registre : celles-ci lisent alors déjà la copie Parquet.
+    """
+
+    return [INGESTION_PREREQUISITE, *spec.prerequisites] if ingest else list(spec.prerequisites)
+
+
+def run_prerequisite(
+    project_dir: Path,
+    spec: DatasetSpec,
+    name: str,
+    input_override: Path | None = None,
+) -> Any:
+    """Exécute l'étape préalable ``name`` d'un corpus dans le processus courant.
+
+    Le pipeline l'appelle dans un sous-processus (``--prerequisite``), comme
+    les scripts ; le dossier courant est la racine du projet, où les scripts
+    cherchent leurs caches relatifs.
+    """
+
+    if name == INGESTION_PREREQUISITE.name:
+        return ingest_dataset(project_dir, spec, input_override)
+    prerequisite = next((step for step in spec.prerequisites if step.name == name), None)
+    if prerequisite is None:
+        choices = ", ".join(step.name for step in dataset_prerequisites(spec, ingest=True))
+        raise ValueError(f"Étape préalable inconnue pour {spec.name} : {name!r}. Choix possibles : {choices}")
+
+    input_path = input_override.resolve() if input_override is not None else spec.input(project_dir)
+    with _working_directory(project_dir):
+        build = _resolve_entry_point(spec.scripts_path(project_dir), prerequisite.entry_point)
+        return build(str(input_path))
+
+
+def _execute_prerequisite(
+    project_dir: Path,
+    spec: DatasetSpec,
+    prerequisite: Prerequisite,
+    input_path: Path,
+    log_dir: Path,
+) -> dict[str, object]:
+    """Lance une étape préalable dans un sous-processus et retourne sa ligne de rapport."""
+
+    log_path = log_dir / f"prerequis_{prerequisite.name}.log"
+    command = [
+        sys.executable,
+        str(project_dir / "pipeline_utils.py"),
+        spec.name,
+        "--prerequisite",
+        prerequisite.name,
+        "--input",
+        str(input_path),
+    ]
+    returncode, stdout, stderr, usage, _ = resource_usage.run_command(command, project_dir)
+    log_path.write_text(
+        "COMMANDE\n" + " ".join(command) + "\n\n"
+        + "STDOUT\n" + stdout + "\n\n"
+        + "STDERR\n" + stderr,
+        encoding="utf-8",
+    )
+
+    row: dict[str, object] = {
+        "script": prerequisite.name,
+        "entry_point": prerequisite.entry_point,
+        "description": prerequisite.description,
+        "status": "ok" if returncode == 0 else "error",
+        "returncode": returncode,
+        **resource_usage.empty_usage(),
+        "log_path": str(log_path),
+        "message": "Étape préalable terminée" if returncode == 0 else "L'étape s'est terminée en erreur ; voir le journal.",
+    }
+    row.update(usage)
+    return row
+
+
+def _run_prerequisites(
+    project_dir: Path,
+    plan: _JobPlan,
+    prerequisites: Sequence[Prerequisite],
+) -> list[dict[str, object]]:
+    """Exécute les étapes préalables d'un corpus, puis prépare ou annule ses jobs.
+
+    Les étapes s'enchaînent dans l'ordre et s'arrêtent à la première en échec :
+    les jobs en attente sont alors marqués en erreur sans être lancés.
+    """
+
+    rows: list[dict[str, object]] = []
+    for prerequisite in prerequisites:
+        row = _execute_prerequisite(project_dir, plan.spec, prerequisite, plan.input_path, plan.log_dir)
+        rows.append(row)
+        if row["status"] != "ok":
+            for _, output_path, _, _, job_row in plan.pending:
+                _remove_stale_output(output_path)
+                job_row.update(
+                    status="error",
+                    message=f"Étape préalable {prerequisite.name!r} en échec ; voir {Path(str(row['log_path'])).name}.",
+                )
+            plan.pending.clear()
+            return rows
+
+    # L'ingestion a pu créer la copie colonnaire : c'est elle que liront les jobs.
+    source_bytes = resource_usage.input_bytes(plan.input_file)
+    for _, _, _, _, job_row in plan.pending:
+        job_row["input_bytes"] = source_bytes
+    return rows
+
+
 def run_metric_jobs(
     project_dir: Path,
     dataset_name: str,
@@ -123,15 +706,136 @@ def run_metric_jobs(
     overwrite: bool = True,
     precheck_columns: bool = True,
     input_override: Path | None = None,
+    max_workers: int = 1,
+    mode: str = "subprocess",
+    use_cache: bool = True,
+    scripts: Iterable[str] | None = None,
 ) -> pd.DataFrame:
     """Exécute tous les scripts d'un corpus dans des sous-processus isolés.
 
     Un sous-processus par indicateur évite que les imports, loggers et ``sys.argv``
     d'un script contaminent les suivants. La sortie standard et la sortie
     d'erreur sont réunies dans ``csv/<corpus>/logs/<script>.log``.
+
+    ``max_workers`` fixe le nombre de scripts lancés simultanément. Les jobs
+    étant indépendants (une entrée partagée en lecture, une sortie et un
+    journal propres à chacun), ils peuvent tourner en parallèle ; le rapport
+    reste dans l'ordre du registre quel que soit l'ordre de fin.
+
+    ``mode="in_process"`` charge l'entrée une seule fois avec
+    ``DatasetSpec.loader`` puis appelle le point d'entrée de chaque job
+    (``MetricJob.entry_point``) sur une copie de cette table, dans le processus
+    courant. Les CSV, journaux et statuts sont les mêmes qu'en sous-processus ;
+    les jobs sont alors exécutés l'un après l'autre.
+
+    Avec ``use_cache=True``, un job n'est relancé que si son entrée, son source
+    (modules locaux importés compris) ou ses arguments ont changé depuis la
+    production de son CSV, d'après ``csv/<corpus>/cache_manifest.json``. La
+    colonne ``cache`` du rapport vaut ``hit`` (CSV réutilisé) ou ``miss`` (job
+    exécuté).
+
+    ``scripts`` restreint l'exécution (et le rapport) aux scripts nommés.
+
+    Les jobs en attente qui partagent un noyau (``MetricJob.kernel``) sont
+    calculés ensemble : un seul sous-processus ``<noyau> <entrée> -- <script>
+    <sortie.csv> [arguments] ...`` (ou, en mode ``in_process``, un seul appel
+    de ``<noyau>:compute_metric_maps``) écrit tous leurs CSV, validés comme
+    ceux des autres jobs. Leur journal commun est ``logs/<noyau>.log``.
+
+    Les étapes préalables du corpus (``DatasetSpec.prerequisites``, comme la
+    table filtrée de ProgSnap2) sont exécutées une fois avant les jobs, et
+    seulement s'il reste des jobs à lancer ; leurs journaux sont
+    ``logs/prerequis_<étape>.log``.
+
+    Chaque job exécuté renseigne aussi son coût dans le rapport (durée, temps
+    CPU, pic mémoire, octets d'entrée, lignes par seconde ; voir
+    ``resource_usage``), quel que soit le mode.
+
+    Un job qui dépasse ``MetricJob.timeout_s`` ou ``MetricJob.max_rss_mb`` est
+    tué et reçoit le statut ``timeout`` ou ``oom`` ; son CSV éventuel est
+    supprimé. Ces limites ne s'appliquent qu'aux sous-processus : en mode
+    ``in_process``, un job ne peut pas être interrompu sans arrêter le pipeline.
+    """
+
+    if max_workers < 1:
+        raise ValueError("max_workers doit être supérieur ou égal à 1.")
+    if mode not in RUN_MODES:
+        raise ValueError(f"mode doit valoir l'une des valeurs {RUN_MODES}.")
+    if mode == "in_process" and max_workers != 1:
+        raise ValueError("Le mode in_process exécute les jobs séquentiellement : max_workers doit valoir 1.")
+
+    plan = _plan_metric_jobs(
+        project_dir,
+        dataset_name,
+        overwrite=overwrite,
+        precheck_columns=precheck_columns,
+        input_override=input_override,
+        use_cache=use_cache,
+        scripts=scripts,
+    )
+    if plan.pending and plan.spec.prerequisites:
+        _run_prerequisites(project_dir, plan, plan.spec.prerequisites)
+    spec, input_path, log_dir, pending = plan.spec, plan.input_path, plan.log_dir, plan.pending
+
+    if mode == "in_process":
+        if pending:
+            _run_in_process(project_dir, spec, input_path, log_dir, pending)
+    else:
+        groups = _pending_groups(pending)
+        if max_workers == 1 or len(groups) <= 1:
+            for group in groups:
+                _execute_group(project_dir, input_path, group)
+        else:
+            # Des threads suffisent : le travail réel se fait dans les sous-processus.
+            with ThreadPoolExecutor(max_workers=max_workers) as executor, resource_usage.killing_jobs_on_error():
+                futures = [executor.submit(_execute_group, project_dir, input_path, group) for group in groups]
+                for future in futures:
+                    future.result()
+
+    return _finish_metric_jobs(plan)
+
+
+@dataclass
+class _JobPlan:
+    """État de l'exécution d'un corpus, entre sa préparation et son rapport."""
+
+    spec: DatasetSpec
+    input_path: Path
+    input_file: Path
+    csv_dir: Path
+    log_dir: Path
+    jobs: list[MetricJob]
+    report: list[dict[str, object]]
+    # Jobs à exécuter : (script, CSV, journal, job, ligne du rapport).
+    pending: list[tuple[Path, Path, Path, MetricJob, dict[str, object]]]
+    manifest: CacheManifest | None
+    cache_keys: dict[str, str]
+
+
+def _plan_metric_jobs(
+    project_dir: Path,
+    dataset_name: str,
+    *,
+    overwrite: bool,
+    precheck_columns: bool,
+    input_override: Path | None,
+    use_cache: bool,
+    scripts: Iterable[str] | None,
+) -> _JobPlan:
+    """Prépare le rapport d'un corpus et la liste des jobs à exécuter.
+
+    Les CSV réutilisés (``overwrite=False``, cache) et les jobs impossibles
+    (script ou colonnes manquants) reçoivent ici leur statut définitif.
     """
 
     spec = get_dataset(dataset_name)
+    jobs = list(spec.jobs)
+    if scripts is not None:
+        wanted = set(scripts)
+        unknown = sorted(wanted.difference(metric_job.script for metric_job in jobs))
+        if unknown:
+            raise ValueError(f"Scripts absents du registre {dataset_name} : {unknown}")
+        jobs = [metric_job for metric_job in jobs if metric_job.script in wanted]
     scripts_dir = spec.scripts_path(project_dir)
     input_path = input_override.resolve() if input_override is not None else spec.input(project_dir)
     input_file = dataset_input_file(project_dir, spec, input_override)
@@ -153,8 +857,13 @@ def run_metric_jobs(
         # laissent simplement required_columns vide dans le registre.
         raw_columns = set(pd.read_csv(input_file, nrows=0).columns)
 
+    manifest = CacheManifest(csv_dir) if use_cache else None
+    source_bytes = resource_usage.input_bytes(input_file)
+    cache_keys: dict[str, str] = {}
+
     report: list[dict[str, object]] = []
-    for metric_job in spec.jobs:
+    pending: list[tuple[Path, Path, Path, MetricJob, dict[str, object]]] = []
+    for metric_job in jobs:
         script_path = scripts_dir / metric_job.script
         output_path = csv_dir / metric_job.output
         log_path = log_dir / f"{Path(metric_job.script).stem}.log"
@@ -165,10 +874,13 @@ def run_metric_jobs(
             "returncode": None,
             "rows": None,
             "columns": None,
+            **resource_usage.empty_usage(),
             "output_path": str(output_path),
             "log_path": str(log_path),
+            "cache": None,
             "message": "",
         }
+        report.append(row)
 
         # ``overwrite=False`` signifie réellement "réutiliser l'existant" :
         # on ne relance pas un script qui écraserait de toute façon son CSV.
@@ -192,9 +904,18 @@ def run_metric_jobs(
                     )
             except Exception as exc:
                 row.update(status="invalid_existing", message=f"CSV existant illisible : {exc}")
-            report.append(row)
             continue
 
+        if manifest is not None and script_path.exists():
+            cache_key = manifest.job_key(spec, scripts_dir, input_file, metric_job)
+            cache_keys[metric_job.output] = cache_key
+            if manifest.is_fresh(metric_job, cache_key, output_path):
+                _validate_job_output(output_path, metric_job, row)
+                if row["status"] == "ok":
+                    row.update(cache="hit", returncode=0, message="CSV inchangé réutilisé (cache)")
+                    continue
+                row.update(status=None, rows=None, columns=None, message="")
+
         # En mode normal (overwrite=True), l'ancienne sortie est supprimée AVANT
         # tout précontrôle afin qu'un échec ne laisse jamais une métrique obsolète.
         if overwrite:
@@ -202,7 +923,6 @@ def run_metric_jobs(
 
         if not script_path.exists():
             row.update(status="missing_script", message=f"Script introuvable : {script_path}")
-            report.append(row)
             continue
 
         # Pour ProgSnap2, data_filter peut créer SessionID et filtrer la table
@@ -212,69 +932,179 @@ def run_metric_jobs(
             missing = missing_columns(metric_job, raw_columns)
             if missing:
                 row.update(status="missing_columns", message=f"Colonnes manquantes : {missing}")
-                report.append(row)
                 continue
 
-        command = [
-            sys.executable,
-            str(script_path),
-            str(input_path),
-            str(output_path),
-            *metric_job.extra_args,
-        ]
-        completed = subprocess.run(
-            command,
-            cwd=project_dir,
-            capture_output=True,
-            text=True,
-            encoding="utf-8",
-            errors="replace",
-            check=False,
-        )
+        # Seul un job réellement lancé compte comme recalculé ; un job écarté
+        # ci-dessus (script ou colonnes manquants) garde une colonne cache vide.
+        if metric_job.output in cache_keys:
+            row["cache"] = "miss"
+        row["input_bytes"] = source_bytes
+        pending.append((script_path, output_path, log_path, metric_job, row))
 
-        log_path.write_text(
-            "COMMANDE\n" + " ".join(command) + "\n\n"
-            + "STDOUT\n" + completed.stdout + "\n\n"
-            + "STDERR\n" + completed.stderr,
-            encoding="utf-8",
-        )
+    return _JobPlan(spec, input_path, input_file, csv_dir, log_dir, jobs, report, pending, manifest, cache_keys)
 
-        row["returncode"] = completed.returncode
-        if completed.returncode != 0:
-            _remove_stale_output(output_path)
-            row.update(status="error", message="Le script s'est terminé en erreur ; voir le journal.")
-        elif not output_path.exists():
-            row.update(status="no_output", message="Le script n'a produit aucun CSV.")
-        else:
-            try:
-                produced = pd.read_csv(output_path)
-                validation_errors = validate_metric_output(produced, metric_job)
-                if validation_errors:
-                    _remove_stale_output(output_path)
-                    row.update(
-                        status="invalid_output",
-                        rows=int(produced.shape[0]),
-                        columns=", ".join(produced.columns.astype(str)),
-                        message="; ".join(validation_errors),
-                    )
-                else:
-                    row.update(
-                        status="ok",
-                        rows=int(produced.shape[0]),
-                        columns=", ".join(produced.columns.astype(str)),
-                        message="CSV produit et validé",
-                    )
-            except Exception as exc:  # pragma: no cover - garde-fou notebook
-                _remove_stale_output(output_path)
-                row.update(status="invalid_output", message=f"CSV illisible : {exc}")
 
-        report.append(row)
+def _finish_metric_jobs(plan: _JobPlan) -> pd.DataFrame:
+    """Met à jour le manifeste de cache et écrit ``run_report.csv``."""
+
+    jobs, report, manifest, cache_keys = plan.jobs, plan.report, plan.manifest, plan.cache_keys
+    if manifest is not None:
+        for metric_job, row in zip(jobs, report):
+            cache_key = cache_keys.get(metric_job.output)
+            if row["cache"] == "hit" or cache_key is None:
+                continue
+            if row["cache"] == "miss" and row["status"] == "ok":
+                manifest.record(metric_job, cache_key, plan.csv_dir / metric_job.output)
+            else:
+                manifest.forget(metric_job)
+        manifest.save()
 
     report_df = pd.DataFrame(report)
-    report_df.to_csv(log_dir / "run_report.csv", index=False)
+    report_df.to_csv(plan.log_dir / "run_report.csv", index=False)
     return report_df
 
 
+def _previous_wall_s(log_dir: Path) -> dict[str, float]:
+    """Durée de chaque script lors de la dernière exécution du corpus, si connue."""
+
+    try:
+        previous = pd.read_csv(log_dir / "run_report.csv", usecols=["script", "wall_s"])
+    except (OSError, ValueError):
+        return {}
+    return dict(previous.dropna().itertuples(index=False, name=None))
+
+
+def run_all_datasets(
+    project_dir: Path,
+    dataset_names: Iterable[str] | None = None,
+    *,
+    max_workers: int = 1,
+    overwrite: bool = True,
+    use_cache: bool = True,
+    ingest: bool = False,
+    input_overrides: Mapping[str, Path] | None = None,
+) -> pd.DataFrame:
+    """Exécute les jobs de plusieurs corpus comme un seul graphe de tâches.
+
+    Les étapes préalables de chaque corpus (``dataset_prerequisites``) sont
+    lancées d'abord ; dès que celles d'un corpus sont terminées, ses jobs
+    rejoignent la file commune. Les ``max_workers`` sous-processus sont donc
+    partagés entre corpus : les jobs Mirabelle et Nowledgeable tournent pendant
+    que ProgSnap2 construit sa table filtrée, et la durée totale tend vers celle
+    du plus long enchaînement étape préalable -> job. Dans chaque corpus, les
+    jobs les plus longs lors de l'exécution précédente partent en premier.
+
+    Chaque corpus reçoit son ``run_report.csv`` habituel ; le rapport combiné
+    (colonnes ``dataset`` et ``kind`` : ``prerequisite`` ou ``metric``) est
+    retourné et écrit dans ``csv/batch_report.csv``.
+    """
+
+    if max_workers < 1:
+        raise ValueError("max_workers doit être supérieur ou égal à 1.")
+    names = list(DATASETS) if dataset_names is None else list(dataset_names)
+    overrides = dict(input_overrides or {})
+
+    plans = []
+    for name in names:
+        plan = _plan_metric_jobs(
+            project_dir,
+            name,
+            overwrite=overwrite,
+            precheck_columns=True,
+            input_override=overrides.get(name),
+            use_cache=use_cache,
+            scripts=None,
+        )
+        durations = _previous_wall_s(plan.log_dir)
+        plan.pending.sort(key=lambda item: -durations.get(item[3].script, float("inf")))
+        plans.append(plan)
+
+    prerequisite_rows: dict[str, list[dict[str, object]]] = {plan.spec.name: [] for plan in plans}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor, resource_usage.killing_jobs_on_error():
+        job_futures: list[Future] = []
+
+        def submit_jobs(plan: _JobPlan) -> None:
+            for group in _pending_groups(plan.pending):
+                job_futures.append(executor.submit(_execute_group, project_dir, plan.input_path, group))
+
+        # Les étapes préalables sont soumises en premier : elles sont sur le
+        # chemin critique des corpus qui en dépendent.
+        chains: dict[Future, _JobPlan] = {}
+        for plan in plans:
+            prerequisites = dataset_prerequisites(plan.spec, ingest=ingest)
+            if plan.pending and prerequisites:
+                chains[executor.submit(_run_prerequisites, project_dir, plan, prerequisites)] = plan
+        for plan in plans:
+            if plan not in chains.values():
+                submit_jobs(plan)
+
+        while chains:
+            done, _ = wait(chains, return_when=FIRST_COMPLETED)
+            for future in done:
+                plan = chains.pop(future)
+                prerequisite_rows[plan.spec.name] = future.result()
+                submit_jobs(plan)
+        for future in job_futures:
+            future.result()
+
+    reports = []
+    for plan in plans:
+        steps = prerequisite_rows[plan.spec.name]
+        if steps:
+            reports.append(pd.DataFrame(steps).assign(dataset=plan.spec.name, kind="prerequisite"))
+        reports.append(_finish_metric_jobs(plan).assign(dataset=plan.spec.name, kind="metric"))
+    batch_report = pd.concat(reports, ignore_index=True)
+    batch_report = batch_report[["dataset", "kind", *batch_report.columns.drop(["dataset", "kind"])]]
+
+    report_path = project_dir / "csv" / BATCH_REPORT_FILENAME
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    batch_report.to_csv(report_path, index=False)
+    return batch_report
+
+
+def _run_in_process(
+    project_dir: Path,
+    spec: DatasetSpec,
+    input_path: Path,
+    log_dir: Path,
+    pending: list[tuple[Path, Path, Path, MetricJob, dict[str, object]]],
+) -> None:
+    """Charge l'entrée du corpus une fois, puis calcule chaque job en mémoire.
+
+    Le dossier courant est la racine du projet, comme pour les sous-processus :
+    les caches et journaux relatifs des scripts (``cache/``, ``out/``) restent
+    donc au même endroit.
+    """
+
+    scripts_dir = spec.scripts_path(project_dir)
+    load_log = log_dir / "chargement.log"
+    with _working_directory(project_dir):
+        table = None
+        with _captured_output(load_log, "APPEL\n" + f"{spec.loader} {input_path}" + "\n\nSORTIE"):
+            try:
+                loader = _resolve_entry_point(scripts_dir, spec.loader)
+                columns = projected_columns(spec, [metric_job for _, _, _, metric_job, _ in pending])
+                table = loader(str(input_path), columns=columns)
+            except Exception:
+                traceback.print_exc()
+
+        if table is None:
+            for _, _, _, _, row in pending:
+                row.update(
+                    status="error",
+                    returncode=1,
+                    message=f"Chargement de l'entrée impossible ; voir {load_log.name}.",
+                )
+            return
+
+        for group in _pending_groups(pending):
+            if group[0][3].kernel:
+                _execute_kernel_jobs_in_process(scripts_dir, table, group)
+                continue
+            _, output_path, log_path, metric_job, row = group[0]
+            _execute_metric_job_in_process(scripts_dir, table, output_path, log_path, metric_job, row)
+
+
 def metric_inventory(csv_dir: Path) -> pd.DataFrame:
     """Inventorie les CSV de métriques présents dans un dossier de corpus."""
 
@@ -306,19 +1136,14 @@ def metric_inventory(csv_dir: Path) -> pd.DataFrame:
     return pd.DataFrame(rows)
 
 
-def aggregate_metrics(csv_dir: Path, join_mode: str = "outer") -> tuple[pd.DataFrame, pd.DataFrame]:
-    """Agrège les CSV d'un seul corpus en une table ``SubjectID × variables``.
+def _load_metric_tables(csv_dir: Path) -> tuple[list[pd.DataFrame], list[dict[str, object]]]:
+    """Lit les CSV de métriques d'un corpus, indexés par ``SubjectID``.
 
-    Contrairement à l'ancienne version, les collisions de noms de variables ne
-    sont pas renommées silencieusement : elles provoquent une erreur explicite,
-    car elles signalent presque toujours une incohérence de pipeline.
+    Les contrôles sont ceux de l'agrégation : ``SubjectID`` présent, renseigné
+    et unique dans chaque fichier, et aucun nom de variable partagé entre deux
+    fichiers.
     """
 
-    if join_mode not in {"outer", "inner"}:
-        raise ValueError("join_mode doit valoir 'outer' ou 'inner'.")
-    if not csv_dir.exists():
-        raise FileNotFoundError(f"Dossier CSV introuvable : {csv_dir}")
-
     tables: list[pd.DataFrame] = []
     inventory_rows: list[dict[str, object]] = []
     seen_features: set[str] = set()
@@ -344,7 +1169,6 @@ def aggregate_metrics(csv_dir: Path, join_mode: str = "outer") -> tuple[pd.DataF
             raise ValueError(
                 f"SubjectID dupliqué dans {path.name} ({len(duplicates)} sujet(s), ex. {preview})."
             )
-        df = df.copy()
         feature_cols = [col for col in df.columns if col != "SubjectID"]
         collisions = sorted(seen_features.intersection(feature_cols))
         if collisions:
@@ -353,7 +1177,7 @@ def aggregate_metrics(csv_dir: Path, join_mode: str = "outer") -> tuple[pd.DataF
                 "Corrigez le registre ou les scripts plutôt que de renommer implicitement."
             )
         seen_features.update(feature_cols)
-        tables.append(df[["SubjectID", *feature_cols]])
+        tables.append(df.set_index("SubjectID")[feature_cols])
         inventory_rows.append({
             "fichier": path.name,
             "statut": "chargé",
@@ -364,11 +1188,135 @@ def aggregate_metrics(csv_dir: Path, join_mode: str = "outer") -> tuple[pd.DataF
 
     if not tables:
         raise ValueError(f"Aucun CSV de métrique exploitable dans {csv_dir}")
+    return tables, inventory_rows
+
+
+def _align_subjects(tables: list[pd.DataFrame], join_mode: str) -> tuple[pd.Index, list[np.ndarray]]:
+    """Sujets retenus par la jointure et position de chacun dans chaque table.
+
+    Les ``SubjectID`` de tous les fichiers sont codés une seule fois en entiers ;
+    l'alignement se fait ensuite par positions (``-1`` : sujet absent du
+    fichier). L'ordre est celui qu'auraient donné des ``pd.merge`` successifs :
+    union triée en jointure externe, ordre du premier fichier en interne.
+    """
+
+    all_ids = tables[0].index.append([table.index for table in tables[1:]])
+    codes, uniques = pd.factorize(all_ids)
+    bounds = np.cumsum([0, *(len(table) for table in tables)])
+    table_codes = [codes[bounds[i]:bounds[i + 1]] for i in range(len(tables))]
+
+    if join_mode == "inner":
+        kept = np.bincount(codes, minlength=len(uniques)) == len(tables)
+        subject_codes = table_codes[0][kept[table_codes[0]]]
+    else:
+        try:
+            subject_codes = uniques.argsort()
+        except TypeError:  # identifiants de types mélangés : ordre de première apparition
+            subject_codes = np.arange(len(uniques))
+    subjects = uniques.take(subject_codes)
+
+    slot = np.full(len(uniques), -1, dtype=np.intp)
+    slot[subject_codes] = np.arange(len(subject_codes))
+    positions = []
+    for current in table_codes:
+        position = np.full(len(subjects), -1, dtype=np.intp)
+        present = slot[current]
+        found = present >= 0
+        position[present[found]] = np.flatnonzero(found)
+        positions.append(position)
+    return subjects, positions
+
+
+def _aligned_features(
+    tables: list[pd.DataFrame],
+    subjects: pd.Index,
+    positions: list[np.ndarray],
+    rows: slice = slice(None),
+) -> pd.DataFrame:
+    """Assemble les variables de ``tables`` pour les sujets ``subjects[rows]``.
+
+    ``tables`` sont ici indexées par position (``RangeIndex``) : une position
+    ``-1`` n'y existe pas et donne donc une ligne de NaN, comme une fusion.
+    """
 
-    features = reduce(lambda left, right: pd.merge(left, right, on="SubjectID", how=join_mode), tables)
+    index = subjects[rows]
+    features = pd.concat(
+        [table.reindex(position[rows]).set_axis(index) for table, position in zip(tables, positions)],
+        axis=1,
+    )
+    return features.rename_axis("SubjectID").reset_index()
+
+
+def aggregate_metrics(csv_dir: Path, join_mode: str = "outer") -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Agrège les CSV d'un seul corpus en une table ``SubjectID × variables``.
+
+    Contrairement à l'ancienne version, les collisions de noms de variables ne
+    sont pas renommées silencieusement : elles provoquent une erreur explicite,
+    car elles signalent presque toujours une incohérence de pipeline.
+
+    Chaque CSV est aligné par positions sur l'ensemble final des sujets, puis
+    toutes les variables sont réunies en une seule concaténation : le coût est
+    linéaire en nombre de métriques, là où des fusions successives recopiaient
+    toute la table à chaque CSV. Lignes, ordre et types sont ceux des anciennes fusions.
+    """
+
+    if join_mode not in {"outer", "inner"}:
+        raise ValueError("join_mode doit valoir 'outer' ou 'inner'.")
+    if not csv_dir.exists():
+        raise FileNotFoundError(f"Dossier CSV introuvable : {csv_dir}")
+
+    tables, inventory_rows = _load_metric_tables(csv_dir)
+    subjects, positions = _align_subjects(tables, join_mode)
+    features = _aligned_features([table.reset_index(drop=True) for table in tables], subjects, positions)
     return features, pd.DataFrame(inventory_rows)
 
 
+def write_aggregated_metrics(
+    csv_dir: Path,
+    output_path: Path,
+    join_mode: str = "outer",
+    chunk_size: int = 100_000,
+) -> pd.DataFrame:
+    """Écrit l'agrégat de ``aggregate_metrics`` dans un CSV, par blocs de sujets.
+
+    Seuls les CSV de métriques et un bloc de ``chunk_size`` sujets sont en
+    mémoire à la fois, jamais la table large complète : c'est la variante à
+    utiliser pour les corpus de plusieurs centaines de milliers de sujets. Le
+    fichier produit est identique à ``features.to_csv(output_path, index=False)``.
+    Retourne l'inventaire des fichiers.
+    """
+
+    if join_mode not in {"outer", "inner"}:
+        raise ValueError("join_mode doit valoir 'outer' ou 'inner'.")
+    if chunk_size < 1:
+        raise ValueError("chunk_size doit être supérieur ou égal à 1.")
+    if not csv_dir.exists():
+        raise FileNotFoundError(f"Dossier CSV introuvable : {csv_dir}")
+
+    tables, inventory_rows = _load_metric_tables(csv_dir)
+    subjects, positions = _align_subjects(tables, join_mode)
+    tables = [table.reset_index(drop=True) for table in tables]
+
+    # Un bloc où tous les sujets d'un fichier sont présents garderait des
+    # entiers là où la table complète a des NaN : on fixe donc les types une
+    # fois pour toutes, comme les aurait donnés l'alignement complet.
+    for number, (table, position) in enumerate(zip(tables, positions)):
+        if (position < 0).any():
+            tables[number] = table.astype({
+                col: ("object" if pd.api.types.is_bool_dtype(dtype) else "float64")
+                for col, dtype in table.dtypes.items()
+                if pd.api.types.is_integer_dtype(dtype) or pd.api.types.is_bool_dtype(dtype)
+            })
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_name(output_path.name + ".tmp")
+    for start in range(0, max(len(subjects), 1), chunk_size):
+        chunk = _aligned_features(tables, subjects, positions, slice(start, start + chunk_size))
+        chunk.to_csv(tmp_path, index=False, mode="w" if start == 0 else "a", header=start == 0)
+    tmp_path.replace(output_path)
+    return pd.DataFrame(inventory_rows)
+
+
 def prepare_numeric_features(
     features: pd.DataFrame,
     *,
@@ -412,3 +1360,93 @@ def prepare_numeric_features(
 
     x_raw = x_raw[["SubjectID", *usable]]
     return x_raw, usable, pd.DataFrame(removed)
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    """Point d'entrée en ligne de commande, pour les exécutions planifiées.
+
+    Exemples : ``python pipeline_utils.py Mirabelle --jobs 8`` ou, pour tous
+    les corpus à la fois, ``python pipeline_utils.py all --jobs 8``.
+    """
+
+    parser = argparse.ArgumentParser(description="Génère les CSV de métriques d'un corpus.")
+    parser.add_argument(
+        "dataset",
+        help="Nom du corpus déclaré dans metric_registry.DATASETS, ou 'all' pour tous les corpus.",
+    )
+    parser.add_argument(
+        "--jobs", "-j", type=int, default=1,
+        help="Nombre de scripts exécutés simultanément (défaut : 1).",
+    )
+    parser.add_argument(
+        "--ingest", action="store_true",
+        help="Crée ou met à jour la copie colonnaire (Parquet) de l'entrée avant l'exécution.",
+    )
+    parser.add_argument(
+        "--in-process", action="store_true",
+        help="Charge l'entrée une seule fois et calcule les métriques dans ce processus.",
+    )
+    parser.add_argument("--input", type=Path, default=None, help="Entrée remplaçant celle du registre.")
+    parser.add_argument(
+        "--no-overwrite", action="store_true",
+        help="Réutilise les CSV existants au lieu de relancer leurs scripts.",
+    )
+    parser.add_argument(
+        "--no-cache", action="store_true",
+        help="Relance tous les jobs, même ceux dont les entrées n'ont pas changé.",
+    )
+    parser.add_argument(
+        "--quiet", action="store_true",
+        help="Sans barre de progression ni ligne par étudiant dans les scripts (exécutions par lots).",
+    )
+    parser.add_argument(
+        "--prerequisite", default=None, metavar="ETAPE",
+        help="Exécute seulement cette étape préalable du corpus (utilisé par le pipeline).",
+    )
+    args = parser.parse_args(argv)
+    if args.quiet:
+        # Hérité par les sous-processus ; relu à chaque appel en mode in_process.
+        os.environ[progress.QUIET_VARIABLE] = "1"
+
+    project_dir = detect_project_dir(Path(__file__).resolve().parent)
+    if args.prerequisite is not None:
+        print(run_prerequisite(project_dir, get_dataset(args.dataset), args.prerequisite, args.input))
+        return 0
+
+    if args.dataset == "all":
+        if args.in_process or args.input is not None:
+            parser.error("'all' s'exécute en sous-processus, avec les entrées du registre.")
+        batch_report = run_all_datasets(
+            project_dir,
+            max_workers=args.jobs,
+            overwrite=not args.no_overwrite,
+            use_cache=not args.no_cache,
+            ingest=args.ingest,
+        )
+        print(batch_report[["dataset", "kind", "script", "status", "cache", "wall_s", "message"]].to_string(index=False))
+        print(f"Rapport : {project_dir / 'csv' / BATCH_REPORT_FILENAME}")
+        failed = ~batch_report["status"].isin(["ok", "skipped_existing"])
+        return 1 if failed.any() else 0
+
+    if args.ingest:
+        print(f"Copie colonnaire : {ingest_dataset(project_dir, get_dataset(args.dataset), args.input)}")
+
+    report_df = run_metric_jobs(
+        project_dir,
+        args.dataset,
+        overwrite=not args.no_overwrite,
+        input_override=args.input,
+        max_workers=args.jobs,
+        mode="in_process" if args.in_process else "subprocess",
+        use_cache=not args.no_cache,
+    )
+    print(report_df[["script", "status", "cache", "rows", "wall_s", "peak_rss_mb", "message"]].to_string(index=False))
+    hits = int((report_df["cache"] == "hit").sum())
+    misses = int((report_df["cache"] == "miss").sum())
+    print(f"Cache : {hits} réutilisé(s), {misses} recalculé(s).")
+    failed = ~report_df["status"].isin(["ok", "skipped_existing"])
+    return 1 if failed.any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""Barre de progression et lignes de détail des scripts de métriques, à débit limité.
+
+Sur un gros corpus, une barre redessinée à chaque sujet et une ligne de
+journal par étudiant coûtent une part mesurable du temps de calcul (terminal
+et ``out/log.txt``). Ce module regroupe les garde-fous :
+
+- ``Throttle`` n'autorise qu'au plus ``max_hz()`` affichages par seconde ;
+  le dernier (avancement complet) est toujours affiché ;
+- ``detail`` écrit une ligne par étudiant seulement si le niveau demandé est
+  actif, avec les arguments de ``logging`` : le message n'est formaté que
+  s'il est réellement écrit ;
+- ``METRICS_QUIET=1`` supprime la barre et les lignes de détail (exécutions
+  par lots : ``python pipeline_utils.py all --quiet``). Les résumés et
+  avertissements restent écrits.
+
+Ce module est importé depuis les dossiers de scripts ; il ne dépend donc que
+de la bibliothèque standard.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+import time
+
+QUIET_VARIABLE = "METRICS_QUIET"
+MAX_HZ_VARIABLE = "METRICS_PROGRESS_HZ"
+DEFAULT_MAX_HZ = 4.0
+
+
+def quiet() -> bool:
+    """Vrai si la barre de progression et les lignes de détail sont désactivées."""
+
+    return os.environ.get(QUIET_VARIABLE, "").strip().lower() not in ("", "0", "false", "non")
+
+
+def max_hz() -> float:
+    """Nombre maximal d'affichages par seconde (``METRICS_PROGRESS_HZ``, 4 par défaut)."""
+
+    return float(os.environ.get(MAX_HZ_VARIABLE, DEFAULT_MAX_HZ))
+
+
+class Throttle:
+    """Limite le nombre d'affichages par seconde d'une barre de progression."""
+
+    def __init__(self) -> None:
+        self._last = None
+
+    def ready(self, final: bool = False) -> bool:
+        """Vrai si l'affichage peut avoir lieu maintenant ; ``final`` passe toujours.
+
+        Le premier affichage passe aussi, puis au plus ``max_hz()`` par seconde.
+        En mode silencieux, rien ne passe.
+        """
+
+        if quiet():
+            return False
+        now = time.monotonic()
+        if final:
+            self._last = None
+            return True
+        rate = max_hz()
+        if self._last is not None and (rate <= 0 or now - self._last < 1.0 / rate):
+            return False
+        self._last = now
+        return True
+
+
+def enabled(logger: logging.Logger, level: int = logging.INFO) -> bool:
+    """Vrai si une ligne de détail de niveau ``level`` serait écrite.
+
+    À tester avant de préparer un argument coûteux (``Series.to_dict()``…).
+    """
+
+    return not quiet() and logger.isEnabledFor(level)
+
+
+def detail(logger: logging.Logger, msg: str, *args, level: int = logging.INFO) -> None:
+    """Ligne de détail (une par étudiant, par sujet…), omise en mode silencieux.
+
+    ``msg`` et ``args`` suivent la convention de ``logging`` : le formatage
+    n'a lieu que si ``level`` est actif pour ``logger``.
+    """
+
+    if enabled(logger, level):
+        logger.log(level, msg, *args)
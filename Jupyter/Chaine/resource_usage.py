@@ -0,0 +1,338 @@
+"""Mesure du coût de chaque job de métrique, reporté dans ``run_report.csv``.
+
+Pour chaque job exécuté, le rapport reçoit :
+
+- ``wall_s`` : durée réelle du calcul (écriture du CSV comprise) ;
+- ``user_cpu_s`` / ``sys_cpu_s`` : temps CPU utilisateur et système ;
+- ``peak_rss_mb`` : pic de mémoire résidente ;
+- ``input_bytes`` : taille de l'entrée lue (copie colonnaire si elle est à
+  jour, sinon CSV) ;
+- ``rows_per_s`` : lignes du CSV produit par seconde de ``wall_s``.
+
+En sous-processus, le temps CPU et le pic mémoire sont ceux de l'enfant, lus à
+sa terminaison avec ``os.wait4``. Sous Linux, ``ru_maxrss`` conserve à travers
+``execve`` la mémoire du processus parent au moment du lancement : lorsque la
+valeur ne dépasse pas ce pic du parent, on retient plutôt le ``VmHWM`` de
+l'enfant relevé pendant son exécution. En mode ``in_process``, le temps CPU est celui
+du processus courant pendant le job (les jobs y sont séquentiels) et
+``peak_rss_mb`` est le pic atteint par ce processus depuis son démarrage : il
+ne peut que croître d'un job au suivant. Sur les plateformes sans ``os.wait4``
+ou sans module ``resource`` (Windows), les colonnes indisponibles restent vides.
+
+``run_command`` applique aussi les limites d'un job (``MetricJob.timeout_s``,
+``MetricJob.max_rss_mb``) en tuant le sous-processus qui les dépasse. Le
+sous-processus est lancé dans sa propre session : les processus qu'il crée
+(réservoir ``partition.map_items`` avec ``METRICS_WORKERS > 1``) appartiennent
+à son groupe, que l'on tue en entier. Le plafond mémoire porte sur le job
+entier : dès que le sous-processus a des descendants, leur mémoire est additionnée
+à la sienne (mémoire proportionnelle ``Pss``, qui ne compte qu'une fois les
+pages partagées après ``fork``, ou à défaut ``VmRSS``). Ce total entre aussi
+dans ``peak_rss_mb``.
+"""
+
+from __future__ import annotations
+
+from contextlib import contextmanager
+import io
+import os
+from pathlib import Path
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from typing import Iterator, Sequence
+
+import columnar_store
+
+try:
+    import resource
+except ImportError:  # pragma: no cover - Windows
+    resource = None
+
+
+RESOURCE_COLUMNS = ("wall_s", "user_cpu_s", "sys_cpu_s", "peak_rss_mb", "input_bytes", "rows_per_s")
+POLL_INTERVAL_S = 0.02
+# Les descendants d'un job sont recherchés moins souvent : sans
+# ``/proc/<pid>/task/*/children``, il faut parcourir tout ``/proc``.
+TREE_POLL_INTERVAL_S = 0.2
+
+# Sous-processus en cours, tués par ``kill_running`` si le pipeline est interrompu :
+# lancés dans leur propre session, ils ne reçoivent plus le Ctrl-C du terminal.
+_running: set[subprocess.Popen] = set()
+_running_lock = threading.Lock()
+
+
+def empty_usage() -> dict[str, object]:
+    """Colonnes de coût d'un job non exécuté (réutilisé, ignoré…)."""
+
+    return dict.fromkeys(RESOURCE_COLUMNS)
+
+
+def input_bytes(input_file: Path) -> int:
+    """Taille du fichier que les chargeurs liront réellement pour ``input_file``."""
+
+    if columnar_store.is_current(input_file) and columnar_store.has_engine():
+        return columnar_store.columnar_path(input_file).stat().st_size
+    return input_file.stat().st_size
+
+
+def _max_rss_mb(max_rss: int) -> float:
+    # ``ru_maxrss`` est en octets sous macOS et en kilo-octets ailleurs.
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(max_rss / divisor, 1)
+
+
+def _sampled_peak_mb(pid: int) -> float | None:
+    """Pic mémoire courant (``VmHWM``) d'un processus Linux, ou ``None``."""
+
+    peak_kb = _status_kb(pid, "VmHWM:")
+    return None if peak_kb is None else round(peak_kb / 1024, 1)
+
+
+def _status_kb(pid: int, field: str) -> int | None:
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii", errors="replace") as status:
+            for line in status:
+                if line.startswith(field):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def _children(pid: int) -> list[int]:
+    """Enfants directs d'un processus Linux.
+
+    Lus dans ``/proc/<pid>/task/*/children`` ; sans ce fichier (noyau compilé
+    sans ``CONFIG_PROC_CHILDREN``), par le parent noté dans chaque ``/proc/<pid>/stat``.
+    """
+
+    task_dir = Path(f"/proc/{pid}/task")
+    if (task_dir / str(pid) / "children").exists():
+        children = []
+        for children_file in task_dir.glob("*/children"):
+            try:
+                children.extend(int(child) for child in children_file.read_text().split())
+            except (OSError, ValueError):
+                pass
+        return children
+
+    children = []
+    for entry in os.scandir("/proc"):
+        if not entry.name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry.name}/stat", encoding="ascii", errors="replace") as stat:
+                # Le nom du programme, entre parenthèses, peut contenir des espaces.
+                fields = stat.read().rsplit(")", 1)[1].split()
+        except (OSError, IndexError):
+            continue
+        if len(fields) > 1 and fields[1] == str(pid):
+            children.append(int(entry.name))
+    return children
+
+
+def _descendants(pid: int) -> list[int]:
+    descendants = []
+    pending = _children(pid)
+    while pending:
+        child = pending.pop()
+        descendants.append(child)
+        pending.extend(_children(child))
+    return descendants
+
+
+def _proportional_kb(pid: int) -> int | None:
+    """Mémoire proportionnelle (``Pss``) d'un processus, ou à défaut ``VmRSS``, en Ko."""
+
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="ascii", errors="replace") as rollup:
+            for line in rollup:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError):
+        pass
+    return _status_kb(pid, "VmRSS:")
+
+
+def _job_memory_mb(pid: int) -> float | None:
+    """Mémoire courante d'un job et de ses descendants, ou ``None`` s'il n'en a pas.
+
+    Un job sans descendant reste mesuré par son seul ``VmHWM`` (``_sampled_peak_mb``).
+    """
+
+    descendants = _descendants(pid)
+    if not descendants:
+        return None
+    total_kb = sum(_proportional_kb(member) or 0 for member in [pid, *descendants])
+    return round(total_kb / 1024, 1)
+
+
+def _kill(process: subprocess.Popen) -> None:
+    """Tue le sous-processus et, sous POSIX, tout son groupe de processus."""
+
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+    else:  # pragma: no cover - Windows
+        process.kill()
+
+
+def kill_running() -> None:
+    """Tue tous les jobs lancés par ``run_command`` et encore en cours."""
+
+    with _running_lock:
+        processes = list(_running)
+    for process in processes:
+        _kill(process)
+
+
+@contextmanager
+def killing_jobs_on_error() -> Iterator[None]:
+    """Tue les jobs en cours si le bloc est interrompu (Ctrl-C, exception).
+
+    À placer à l'intérieur du ``ThreadPoolExecutor`` qui attend les jobs, pour
+    qu'ils soient tués avant que sa fermeture n'attende leur fin.
+    """
+
+    try:
+        yield
+    except BaseException:
+        kill_running()
+        raise
+
+
+def _read_text(file: io.BufferedRandom) -> str:
+    file.seek(0)
+    return io.TextIOWrapper(file, encoding="utf-8", errors="replace").read()
+
+
+def run_command(
+    command: Sequence[str],
+    cwd: Path,
+    *,
+    timeout_s: float | None = None,
+    max_rss_mb: float | None = None,
+) -> tuple[int, str, str, dict[str, object], str | None]:
+    """Exécute ``command`` et retourne ``(code retour, stdout, stderr, coût, limite)``.
+
+    Les sorties passent par des fichiers temporaires plutôt que par des tubes :
+    le processus peut ainsi être attendu avec ``os.wait4``, qui fournit son
+    temps CPU et son pic mémoire sans interférer avec les autres jobs lancés en
+    parallèle.
+
+    Un job qui dépasse ``timeout_s`` secondes ou ``max_rss_mb`` Mo de
+    mémoire résidente, descendants compris, est tué avec tout son groupe de
+    processus ; ``limite`` vaut alors ``"timeout"`` ou ``"oom"`` (``None``
+    sinon). La mémoire est relevée à chaque scrutation (``POLL_INTERVAL_S``)
+    dans ``/proc`` : le plafond mémoire n'est appliqué que sous Linux.
+    """
+
+    usage: dict[str, object] = {}
+    with tempfile.TemporaryFile() as stdout, tempfile.TemporaryFile() as stderr:
+        start = time.perf_counter()
+        process = subprocess.Popen(
+            command, cwd=cwd, stdout=stdout, stderr=stderr, start_new_session=hasattr(os, "killpg")
+        )
+        with _running_lock:
+            _running.add(process)
+        try:
+            exceeded = _wait(process, start, timeout_s, max_rss_mb, usage)
+        except BaseException:
+            _kill(process)
+            raise
+        finally:
+            with _running_lock:
+                _running.discard(process)
+        usage["wall_s"] = round(time.perf_counter() - start, 3)
+        return process.returncode, _read_text(stdout), _read_text(stderr), usage, exceeded
+
+
+def _wait(
+    process: subprocess.Popen,
+    start: float,
+    timeout_s: float | None,
+    max_rss_mb: float | None,
+    usage: dict[str, object],
+) -> str | None:
+    """Attend la fin de ``process`` en appliquant ses limites ; retourne la limite dépassée."""
+
+    exceeded = None
+    if hasattr(os, "wait4"):
+        sampled_peak = job_peak = None
+        next_tree_poll = start
+        while True:
+            pid, status, rusage = os.wait4(process.pid, os.WNOHANG)
+            if pid:
+                break
+            sampled_peak = _sampled_peak_mb(process.pid) or sampled_peak
+            if time.perf_counter() >= next_tree_poll:
+                next_tree_poll = time.perf_counter() + TREE_POLL_INTERVAL_S
+                job_memory = _job_memory_mb(process.pid)
+                if job_memory is not None:
+                    job_peak = max(job_peak or 0.0, job_memory)
+            memory = max((value for value in (sampled_peak, job_peak) if value is not None), default=None)
+            if exceeded is None:
+                if timeout_s is not None and time.perf_counter() - start > timeout_s:
+                    exceeded = "timeout"
+                elif max_rss_mb is not None and memory is not None and memory > max_rss_mb:
+                    exceeded = "oom"
+                if exceeded is not None:
+                    _kill(process)
+                    continue
+            time.sleep(POLL_INTERVAL_S)
+        process.returncode = os.waitstatus_to_exitcode(status)
+        peak_rss_mb = _max_rss_mb(rusage.ru_maxrss)
+        if sampled_peak is not None and resource is not None:
+            if peak_rss_mb <= _max_rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss):
+                peak_rss_mb = sampled_peak
+        if job_peak is not None:
+            peak_rss_mb = max(peak_rss_mb, job_peak)
+        usage.update(
+            user_cpu_s=round(rusage.ru_utime, 3),
+            sys_cpu_s=round(rusage.ru_stime, 3),
+            peak_rss_mb=peak_rss_mb,
+        )
+    else:  # pragma: no cover - Windows
+        try:
+            process.wait(timeout=timeout_s)
+        except subprocess.TimeoutExpired:
+            exceeded = "timeout"
+            _kill(process)
+            process.wait()
+    return exceeded
+
+
+@contextmanager
+def measure(usage: dict[str, object]) -> Iterator[None]:
+    """Renseigne ``usage`` avec le coût du bloc exécuté dans le processus courant.
+
+    Seules les colonnes mesurées sont écrites : ``input_bytes`` et
+    ``rows_per_s`` sont renseignées par l'appelant.
+    """
+
+    start_times = os.times()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end_times = os.times()
+        usage.update(
+            wall_s=round(time.perf_counter() - start, 3),
+            user_cpu_s=round(end_times.user - start_times.user, 3),
+            sys_cpu_s=round(end_times.system - start_times.system, 3),
+        )
+        if resource is not None:
+            usage["peak_rss_mb"] = _max_rss_mb(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def throughput(row: dict[str, object]) -> None:
+    """Complète ``rows_per_s`` une fois le CSV du job validé."""
+
+    rows, wall_s = row.get("rows"), row.get("wall_s")
+    if rows is not None and wall_s:
+        row["rows_per_s"] = round(float(rows) / float(wall_s), 1)
@@ -31,6 +31,9 @@ from typing import Any
 import pandas as pd
 
 import utils_Mirabelle as um
+# Modules communs à la racine du projet, que utils_Mirabelle place dans sys.path.
+import partition
+import progress
 
 out = um.out
 COL_EVENT_ID = "_id.$oid"
@@ -108,8 +111,9 @@ def calculate_metric(actor_rows: pd.DataFrame) -> tuple[float, int] | None:
     return sum(distances) / len(distances), len(distances)
 
 
-def main(read_path: str, write_path: str) -> None:
-    df = um.load_csv(read_path)
+def compute_metric_map(df: pd.DataFrame) -> dict[str, float]:
+    """Calcule la métrique par étudiant sur des traces déjà chargées."""
+
     if not um.check_columns(df, REQUIRED_COLS):
         sys.exit(1)
 
@@ -118,18 +122,22 @@ def main(read_path: str, write_path: str) -> None:
     metric_map: dict[str, float] = {}
     dropped = 0
 
-    for actor in sorted(actors):
-        result = calculate_metric(attempts[attempts[um.COL_ACTOR] == actor])
+    for actor, result in partition.map_groups(attempts, um.COL_ACTOR, calculate_metric, keys=sorted(actors)):
         if result is None:
             out.warning("  %s : aucune transition avec changement de code — ignoré", actor)
             dropped += 1
             continue
         value, transitions = result
         metric_map[actor] = round(value, 6)
-        out.info("  %s : %.4f (%d transition(s) modifiée(s))", actor, value, transitions)
+        progress.detail(out, "  %s : %.4f (%d transition(s) modifiée(s))", actor, value, transitions)
 
     out.info("%d étudiant(s) ignoré(s)", dropped)
-    um.write_metric(METRIC_NAME, metric_map, write_path)
+    return metric_map
+
+
+def main(read_path: str, write_path: str) -> None:
+    df = um.load_csv(read_path)
+    um.write_metric(METRIC_NAME, compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
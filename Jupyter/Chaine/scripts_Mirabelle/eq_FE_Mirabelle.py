@@ -5,28 +5,33 @@ Voir README.md pour la formule détaillée et les conventions de segmentation.
 
 import sys
 
+import pandas as pd
+
 import utils_Mirabelle as um
+# Modules communs à la racine du projet, que utils_Mirabelle place dans sys.path.
+import partition
+import progress
 
 out = um.out
 
 
-def calculate_eq(actor_attempts) -> float | None:
+def calculate_eq(actor_attempts, pairs=None) -> float | None:
     """
     Calcule l'Error Quotient d'un étudiant à partir de la table de ses
     tentatives (issue de utils_Mirabelle.build_attempts).
 
     Retourne un float dans [0.0, 1.0], ou None si aucune paire de
-    tentatives consécutives n'est disponible.
+    tentatives consécutives n'est disponible. ``pairs`` : paires déjà
+    calculées (utils_Mirabelle.attempt_pair_array), recalculées si absentes.
     """
-    pairs = um.extract_attempt_pairs(actor_attempts)
+    if pairs is None:
+        pairs = um.attempt_pair_array(actor_attempts)
     if len(pairs) == 0:
         return None
 
+    errors = actor_attempts["error_categories"].to_numpy()
     total_score = 0.0
-    for e1_idx, e2_idx in pairs:
-        e1_errors = actor_attempts["error_categories"].iloc[e1_idx]
-        e2_errors = actor_attempts["error_categories"].iloc[e2_idx]
-
+    for e1_errors, e2_errors in zip(errors[pairs[:, 0]], errors[pairs[:, 1]]):
         score_delta = 0
         if len(e1_errors) > 0 and len(e2_errors) > 0:
             # Les deux tentatives ont produit une erreur
@@ -44,8 +49,14 @@ def load_csv(path: str):
     return um.load_csv(path)
 
 
-def main(read_path: str, write_path: str) -> None:
-    df = um.load_csv(read_path)
+def actor_eq(actor_rows) -> tuple[float | None, int]:
+    """EQ d'un étudiant (voir calculate_eq) et nombre de ses Run.Test."""
+    attempts = um.build_attempts(actor_rows)
+    return calculate_eq(attempts), len(attempts)
+
+
+def compute_metric_map(df: pd.DataFrame) -> dict[str, float]:
+    """Calcule la métrique par étudiant sur des traces déjà chargées."""
 
     if not um.check_columns(df, um.REQUIRED_COLS):
         sys.exit(1)
@@ -56,20 +67,21 @@ def main(read_path: str, write_path: str) -> None:
     metric_map: dict[str, float] = {}
     dropped = 0
 
-    for actor in sorted(actors):
-        actor_rows = df[df[um.COL_ACTOR] == actor]
-        attempts = um.build_attempts(actor_rows)
-        eq = calculate_eq(attempts)
-
+    for actor, (eq, n_attempts) in partition.map_groups(df, um.COL_ACTOR, actor_eq):
         if eq is None:
             out.warning("  %s : pas de paire de tentatives exploitable — ignoré", actor)
             dropped += 1
         else:
             metric_map[actor] = round(eq, 6)
-            out.info("  %s : EQ = %.3f  (%d Run.Test)", actor, eq, len(attempts))
+            progress.detail(out, "  %s : EQ = %.3f  (%d Run.Test)", actor, eq, n_attempts)
 
     out.info("%d étudiant(s) ignoré(s) (pas de paire de tentatives exploitable)", dropped)
-    um.write_metric("ErrorQuotient_FE", metric_map, write_path)
+    return metric_map
+
+
+def main(read_path: str, write_path: str) -> None:
+    df = um.load_csv(read_path)
+    um.write_metric("ErrorQuotient_FE", compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,116 @@
+"""Indicateurs d'erreur Mirabelle (EQ, EQ_FE, RED, RED_FE) calculés ensemble.
+
+``eq_Mirabelle.py``, ``eq_FE_Mirabelle.py``, ``red_Mirabelle.py`` et
+``red_FE_Mirabelle.py`` reconstruisent chacun, pour chaque étudiant, la table
+des tentatives (``utils_Mirabelle.build_attempts``, qui calcule à la fois
+``error_categories`` et ``error_messages``) puis ses segments. Ce noyau
+découpe la table par étudiant une seule fois (``partition.map_groups``),
+construit tentatives, segments et paires une seule fois par étudiant, et
+applique les fonctions ``calculate_eq`` / ``calculate_red`` des quatre
+scripts : les CSV sont les mêmes.
+
+Le pipeline l'exécute pour les jobs dont ``MetricJob.kernel`` vaut
+``error_metrics_Mirabelle.py`` ; un seul sous-processus écrit alors tous
+leurs CSV :
+
+    python error_metrics_Mirabelle.py <entrée> -- <script> <sortie.csv> [-- <script> <sortie.csv> ...]
+"""
+
+import sys
+
+import pandas as pd
+
+import utils_Mirabelle as um
+import eq_Mirabelle
+import eq_FE_Mirabelle
+import red_Mirabelle
+import red_FE_Mirabelle
+# Modules communs à la racine du projet, que utils_Mirabelle place dans sys.path.
+import partition
+import progress
+
+out = um.out
+
+JOB_SEPARATOR = "--"
+
+# Script remplacé -> (nom de la métrique, libellé du détail, calcul par étudiant,
+# découpage que reçoit le calcul en plus des tentatives : "pairs" ou "segments").
+KERNEL_METRICS = {
+    "eq_FE_Mirabelle.py": ("ErrorQuotient_FE", "EQ", eq_FE_Mirabelle.calculate_eq, "pairs"),
+    "eq_Mirabelle.py": ("ErrorQuotient", "EQ", eq_Mirabelle.calculate_eq, "pairs"),
+    "red_FE_Mirabelle.py": ("RED_FE", "RED", red_FE_Mirabelle.calculate_red, "segments"),
+    "red_Mirabelle.py": ("RED", "RED", red_Mirabelle.calculate_red, "segments"),
+}
+
+
+def compute_metric_maps(df: pd.DataFrame, jobs) -> dict[str, dict[str, float] | None]:
+    """Dictionnaire ``actor -> valeur`` de chaque job ``(script, arguments)``.
+
+    La valeur associée à un script est ``None`` lorsqu'il n'aurait produit
+    aucun CSV (colonne manquante).
+    """
+    scripts = [script for script, _ in jobs]
+    if not um.check_columns(df, um.REQUIRED_COLS):
+        return {script: None for script in scripts}
+
+    actors = df[um.COL_ACTOR].dropna().unique()
+    out.info("%d étudiant(s) trouvé(s)", len(actors))
+
+    metric_maps: dict[str, dict[str, float]] = {script: {} for script in scripts}
+    dropped = {script: 0 for script in scripts}
+
+    def actor_values(actor_rows):
+        """Valeur de chaque script pour un étudiant, et nombre de ses Run.Test."""
+        attempts = um.build_attempts(actor_rows)
+        segments = um.get_segments_indexes(attempts)
+        layout = {"segments": segments, "pairs": um.segment_pair_array(segments)}
+        values = []
+        for script in scripts:
+            _, _, calculate, cut = KERNEL_METRICS[script]
+            values.append(calculate(attempts, layout[cut]))
+        return values, len(attempts)
+
+    for actor, (values, n_attempts) in partition.map_groups(df, um.COL_ACTOR, actor_values):
+        for script, value in zip(scripts, values):
+            metric, label = KERNEL_METRICS[script][:2]
+            if value is None:
+                out.warning("  %s : pas de paire de tentatives exploitable — ignoré (%s)", actor, metric)
+                dropped[script] += 1
+            else:
+                metric_maps[script][actor] = round(value, 6)
+                progress.detail(out, "  %s : %s = %.3f  (%d Run.Test, %s)", actor, label, value,
+                                n_attempts, metric)
+
+    for script in scripts:
+        out.info("%s : %d étudiant(s) ignoré(s) (pas de paire de tentatives exploitable)",
+                 KERNEL_METRICS[script][0], dropped[script])
+    return metric_maps
+
+
+def parse_jobs(arguments):
+    """Découpe ``-- <script> <sortie.csv> [arguments]`` répété en triplets (script, sortie, arguments)."""
+    jobs = []
+    current = None
+    for argument in arguments:
+        if argument == JOB_SEPARATOR:
+            current = []
+            jobs.append(current)
+        elif current is None:
+            raise ValueError("Les jobs doivent être précédés de %r : %s" % (JOB_SEPARATOR, arguments))
+        else:
+            current.append(argument)
+    for job in jobs:
+        if len(job) < 2 or job[0] not in KERNEL_METRICS:
+            raise ValueError("Job invalide (attendu : <script> <sortie.csv> [arguments]) : %s" % job)
+    return [(job[0], job[1], job[2:]) for job in jobs]
+
+
+if __name__ == "__main__":
+    read_path = sys.argv[1]
+    kernel_jobs = parse_jobs(sys.argv[2:])
+
+    df = um.load_csv(read_path)
+    metric_maps = compute_metric_maps(df, [(script, extra_args) for script, _, extra_args in kernel_jobs])
+    for script, write_path, _ in kernel_jobs:
+        if metric_maps[script] is not None:
+            um.write_metric(KERNEL_METRICS[script][0], metric_maps[script], write_path)
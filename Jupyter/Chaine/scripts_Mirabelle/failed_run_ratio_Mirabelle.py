@@ -12,38 +12,42 @@ import sys
 import pandas as pd
 
 import utils_Mirabelle as um
+import test_cases
 
 TARGET_VERDICT = "FailedVerdict"
 METRIC_NAME = "FailedTestRunRatio"
 REQUIRED_COLS = [um.COL_ACTOR, um.COL_VERB, um.COL_TESTS]
 
 
-def calculate_ratio(actor_rows: pd.DataFrame) -> float | None:
-    """Calcule ``runs avec FailedVerdict / runs non vides``."""
+def run_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """Par étudiant : ``total`` des runs non vides, ``matching`` des runs avec FailedVerdict."""
 
-    total = 0
-    matching = 0
-    for raw_tests in actor_rows.loc[actor_rows[um.COL_VERB] == um.VERB_TEST, um.COL_TESTS]:
-        cases = um.parse_tests(raw_tests)
-        if not cases:
-            continue
-        total += 1
-        matching += int(any(case.get("verdict") == TARGET_VERDICT for case in cases))
+    runs = df[(df[um.COL_VERB] == um.VERB_TEST) & df[um.COL_ACTOR].notna()]
+    cases = test_cases.explode(runs)
+    flags = pd.DataFrame({
+        "total": test_cases.case_counts(cases, len(runs)) > 0,
+        "matching": test_cases.case_counts(cases, len(runs), cases["verdict"] == TARGET_VERDICT) > 0,
+    })
+    return flags.groupby(runs[um.COL_ACTOR].to_numpy(), sort=True).sum()
 
-    return None if total == 0 else matching / total
 
+def compute_metric_map(df: pd.DataFrame) -> dict[str, float]:
+    """Calcule la métrique par étudiant sur des traces déjà chargées."""
 
-def main(read_path: str, write_path: str) -> None:
-    df = um.load_csv(read_path)
     if not um.check_columns(df, REQUIRED_COLS):
         raise SystemExit(1)
 
     metric_map: dict[str, float] = {}
-    for actor, actor_rows in df.dropna(subset=[um.COL_ACTOR]).groupby(um.COL_ACTOR, sort=True):
-        value = calculate_ratio(actor_rows)
-        if value is not None:
-            metric_map[str(actor)] = round(value, 6)
-    um.write_metric(METRIC_NAME, metric_map, write_path)
+    counts = run_counts(df)
+    for actor, total, matching in zip(counts.index, counts["total"], counts["matching"]):
+        if total:
+            metric_map[str(actor)] = round(int(matching) / int(total), 6)
+    return metric_map
+
+
+def main(read_path: str, write_path: str) -> None:
+    df = um.load_csv(read_path)
+    um.write_metric(METRIC_NAME, compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
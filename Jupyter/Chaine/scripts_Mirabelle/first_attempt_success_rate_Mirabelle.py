@@ -14,51 +14,22 @@ python first_attempt_success_rate_Mirabelle.py [entree.csv] [sortie.csv]
 
 from __future__ import annotations
 
-import os
-import re
 import sys
-from typing import Any
 
 import pandas as pd
 
 import utils_Mirabelle as um
+import test_cases
+# Modules communs à la racine du projet, que utils_Mirabelle place dans sys.path.
+import partition
+import progress
 
 out = um.out
 COL_EVENT_ID = "_id.$oid"
-FUNCTION_RE = re.compile(r"^\s*([A-Za-z_]\w*)\s*(?:\(|$)")
 METRIC_NAME = "FirstAttemptSuccessRate"
 REQUIRED_COLS = [um.COL_ACTOR, um.COL_VERB, um.COL_TESTS, um.COL_TS]
 
 
-def status_is_passed(value: Any) -> bool:
-    if value is True:
-        return True
-    if isinstance(value, (int, float)) and not isinstance(value, bool) and not pd.isna(value):
-        return value == 1
-    if isinstance(value, str):
-        return value.strip().lower() in {"true", "1", "passed", "pass"}
-    return False
-
-
-def extract_function_name(case: dict[str, Any]) -> str | None:
-    for key in ("name", "tested_line"):
-        raw = case.get(key)
-        if isinstance(raw, str) and raw.strip():
-            match = FUNCTION_RE.match(raw)
-            if match:
-                return match.group(1)
-    return None
-
-
-def extract_filename(case: dict[str, Any], fallback: Any) -> str:
-    raw = case.get("filename")
-    if isinstance(raw, str) and raw.strip():
-        return os.path.basename(raw.strip())
-    if pd.notna(fallback) and str(fallback).strip():
-        return os.path.basename(str(fallback).strip())
-    return "<fichier_inconnu>"
-
-
 def prepare_function_attempts(df: pd.DataFrame) -> pd.DataFrame:
     rows = df[df[um.COL_VERB] == um.VERB_TEST].copy()
     rows["__row_order"] = range(len(rows))
@@ -70,37 +41,19 @@ def prepare_function_attempts(df: pd.DataFrame) -> pd.DataFrame:
         has_id = rows[COL_EVENT_ID].notna() & rows[COL_EVENT_ID].astype(str).str.strip().ne("")
         rows = rows.loc[~(has_id & rows.duplicated(COL_EVENT_ID, keep="first"))].copy()
 
-    records: list[dict[str, Any]] = []
-    for _, row in rows.iterrows():
-        grouped: dict[tuple[str, str], list[dict[str, Any]]] = {}
-        for case in um.parse_tests(row[um.COL_TESTS]):
-            if not isinstance(case, dict):
-                continue
-            function = extract_function_name(case)
-            if function is None:
-                continue
-            filename = extract_filename(case, row.get(um.COL_FILE))
-            grouped.setdefault((filename, function), []).append(case)
-
-        for (filename, function), cases in grouped.items():
-            valid = [case for case in cases if "status" in case]
-            if not valid:
-                continue
-            records.append({
-                um.COL_ACTOR: str(row[um.COL_ACTOR]),
-                "__session": str(row[um.COL_ACTIVITY_SESSION]),
-                "__filename": filename,
-                "__function": function,
-                "__timestamp": row["__timestamp"],
-                "__row_order": row["__row_order"],
-                "__success": all(status_is_passed(case.get("status")) for case in valid),
-            })
-
-    columns = [
-        um.COL_ACTOR, "__session", "__filename", "__function",
-        "__timestamp", "__row_order", "__success",
-    ]
-    attempts = pd.DataFrame.from_records(records, columns=columns)
+    units = test_cases.function_tests(rows)
+    units = units[units["n_status"] > 0]
+    positions = units["__row"].to_numpy()
+    attempts = pd.DataFrame({
+        um.COL_ACTOR: rows[um.COL_ACTOR].astype(str).to_numpy(dtype=object)[positions],
+        "__session": rows[um.COL_ACTIVITY_SESSION].astype(str).to_numpy(dtype=object)[positions],
+        "__filename": units["__filename"].to_numpy(dtype=object),
+        "__function": units["__function"].to_numpy(dtype=object),
+        "__timestamp": rows["__timestamp"].array[positions],
+        "__row_order": rows["__row_order"].to_numpy()[positions],
+        # Tentative réussie : tous les cas de la fonction portant un ``status`` sont réussis.
+        "__success": (units["n_passed"] == units["n_status"]).to_numpy(),
+    })
     if attempts.empty:
         return attempts
     return attempts.sort_values(
@@ -126,8 +79,9 @@ def calculate_metric(actor_rows: pd.DataFrame) -> tuple[float, int, int] | None:
     return first_successes / total, first_successes, total
 
 
-def main(read_path: str, write_path: str) -> None:
-    df = um.load_csv(read_path)
+def compute_metric_map(df: pd.DataFrame) -> dict[str, float]:
+    """Calcule la métrique par étudiant sur des traces déjà chargées."""
+
     if not um.check_columns(df, REQUIRED_COLS):
         sys.exit(1)
 
@@ -136,19 +90,22 @@ def main(read_path: str, write_path: str) -> None:
     metric_map: dict[str, float] = {}
     dropped = 0
 
-    for actor in sorted(actors):
-        actor_rows = attempts[attempts[um.COL_ACTOR] == actor] if not attempts.empty else attempts
-        result = calculate_metric(actor_rows)
+    for actor, result in partition.map_groups(attempts, um.COL_ACTOR, calculate_metric, keys=sorted(actors)):
         if result is None:
             out.warning("  %s : aucune unité testée — ignoré", actor)
             dropped += 1
             continue
         rate, successes, total = result
         metric_map[actor] = round(rate, 6)
-        out.info("  %s : %.1f %% (%d/%d unités)", actor, rate * 100, successes, total)
+        progress.detail(out, "  %s : %.1f %% (%d/%d unités)", actor, rate * 100, successes, total)
 
     out.info("%d étudiant(s) ignoré(s)", dropped)
-    um.write_metric(METRIC_NAME, metric_map, write_path)
+    return metric_map
+
+
+def main(read_path: str, write_path: str) -> None:
+    df = um.load_csv(read_path)
+    um.write_metric(METRIC_NAME, compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
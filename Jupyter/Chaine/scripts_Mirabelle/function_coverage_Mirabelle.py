@@ -28,14 +28,14 @@ python function_coverage_Mirabelle.py \\
 
 from __future__ import annotations
 
-import os
-import re
 import sys
-from typing import Any
 
 import pandas as pd
 
 import utils_Mirabelle as um
+import test_cases
+# Module commun à la racine du projet, que utils_Mirabelle place dans sys.path.
+import progress
 
 
 out = um.out
@@ -44,54 +44,6 @@ COL_EVENT_ID = "_id.$oid"
 COL_CODE_STATE = um.COL_CODESTATE
 METRIC_NAME = "FunctionCoverage"
 
-# Reconnaît un nom Python placé au début d'une signature ou d'un appel.
-FUNCTION_NAME_RE = re.compile(r"^\s*([A-Za-z_]\w*)\s*(?:\(|$)")
-
-
-def status_is_passed(value: Any) -> bool:
-    """Retourne True pour les représentations usuelles d'un test réussi."""
-    if value is True:
-        return True
-    if isinstance(value, bool):
-        return value
-    if isinstance(value, (int, float)) and not pd.isna(value):
-        return value == 1
-    if isinstance(value, str):
-        return value.strip().lower() in {"true", "1", "passed", "pass"}
-    return False
-
-
-def extract_function_name(case: dict[str, Any]) -> str | None:
-    """Extrait le nom canonique d'une fonction depuis un cas de test.
-
-    Le champ ``name`` est prioritaire. ``tested_line`` sert de repli pour les
-    rares cas où ``name`` serait absent ou mal formé.
-    """
-    for key in ("name", "tested_line"):
-        raw = case.get(key)
-        if not isinstance(raw, str) or not raw.strip():
-            continue
-        match = FUNCTION_NAME_RE.match(raw)
-        if match:
-            return match.group(1)
-    return None
-
-
-def extract_test_filename(case: dict[str, Any], fallback: Any) -> str:
-    """Renvoie un nom de fichier court pour distinguer les homonymes."""
-    raw_filename = case.get("filename")
-    if isinstance(raw_filename, str) and raw_filename.strip():
-        return os.path.basename(raw_filename.strip())
-
-    if pd.notna(fallback):
-        fallback_text = str(fallback).strip()
-        if fallback_text:
-            return os.path.basename(fallback_text)
-
-    # Les données sans fichier restent exploitables. Elles seront regroupées
-    # uniquement par nom de fonction.
-    return "<fichier_inconnu>"
-
 
 def prepare_function_attempts(
     df: pd.DataFrame,
@@ -124,54 +76,10 @@ def prepare_function_attempts(
             )
             attempts = attempts.loc[~duplicated_event].copy()
 
-    records: list[dict[str, Any]] = []
-    unparsed_test_events = 0
-    missing_function_cases = 0
-
-    for row_index, row in attempts.iterrows():
-        cases = um.parse_tests(row[um.COL_TESTS])
-        if not cases:
-            unparsed_test_events += 1
-            continue
-
-        # Agrégation locale : une seule ligne par fonction pour ce Run.Test.
-        event_functions: dict[tuple[str, str], bool] = {}
-        fallback_filename = row.get(um.COL_FILE)
-
-        for case in cases:
-            if not isinstance(case, dict):
-                continue
-
-            function_name = extract_function_name(case)
-            if function_name is None:
-                missing_function_cases += 1
-                continue
-
-            filename = extract_test_filename(case, fallback_filename)
-            function_key = (filename, function_name)
-            passed = status_is_passed(case.get("status"))
-            event_functions[function_key] = (
-                event_functions.get(function_key, False) or passed
-            )
-
-        event_id = (
-            row.get(COL_EVENT_ID)
-            if COL_EVENT_ID in attempts.columns
-            else row_index
-        )
-
-        for (filename, function_name), has_passed_test in event_functions.items():
-            records.append(
-                {
-                    um.COL_ACTOR: str(row[um.COL_ACTOR]),
-                    "__event_id": event_id,
-                    "__filename": filename,
-                    "__function_name": function_name,
-                    "__function_key": f"{filename}::{function_name}",
-                    "__has_passed_test": has_passed_test,
-                    code_state_col: row.get(code_state_col),
-                }
-            )
+    cases = test_cases.explode(attempts)
+    unparsed_test_events = int((test_cases.case_counts(cases, len(attempts)) == 0).sum())
+    missing_function_cases = int(cases["function"].isna().sum())
+    units = test_cases.function_tests(attempts, cases)
 
     if unparsed_test_events:
         out.warning(
@@ -184,16 +92,52 @@ def prepare_function_attempts(
             missing_function_cases,
         )
 
-    columns = [
-        um.COL_ACTOR,
-        "__event_id",
-        "__filename",
-        "__function_name",
-        "__function_key",
-        "__has_passed_test",
-        code_state_col,
-    ]
-    return pd.DataFrame.from_records(records, columns=columns)
+    rows = units["__row"].to_numpy()
+    event_ids = attempts[COL_EVENT_ID] if COL_EVENT_ID in attempts.columns else attempts.index.to_series()
+    if code_state_col in attempts.columns:
+        code_states = attempts[code_state_col]
+    else:
+        code_states = pd.Series(None, index=attempts.index, dtype=object)
+    return pd.DataFrame({
+        um.COL_ACTOR: attempts[um.COL_ACTOR].astype(str).to_numpy(dtype=object)[rows],
+        "__event_id": event_ids.to_numpy(dtype=object)[rows],
+        "__filename": units["__filename"].to_numpy(dtype=object),
+        "__function_name": units["__function"].to_numpy(dtype=object),
+        "__function_key": (units["__filename"] + "::" + units["__function"]).to_numpy(dtype=object),
+        "__has_passed_test": units["n_passed"].to_numpy() > 0,
+        code_state_col: code_states.to_numpy(dtype=object)[rows],
+    })
+
+
+def coverage_counts(
+    function_attempts: pd.DataFrame,
+    code_state_col: str = COL_CODE_STATE,
+) -> pd.DataFrame:
+    """Compte les fonctions traitées de chaque étudiant.
+
+    Colonnes ``total``, ``by_passed_test`` et ``by_code_states_only`` (ce
+    dernier nombre exclut les fonctions qui ont déjà au moins un test réussi),
+    indexées par étudiant.
+    """
+    keys = [um.COL_ACTOR, "__function_key"]
+    has_passed_test = function_attempts.groupby(keys, sort=False)["__has_passed_test"].any()
+
+    code_states = function_attempts[code_state_col].dropna().astype(str)
+    code_states = code_states[code_states.str.strip().ne("")]
+    distinct_code_state_count = (
+        function_attempts.loc[code_states.index, keys]
+        .assign(__code_state=code_states)
+        .groupby(keys, sort=False)["__code_state"]
+        .nunique()
+        .reindex(has_passed_test.index, fill_value=0)
+    )
+
+    treated = has_passed_test | (distinct_code_state_count >= 2)
+    return pd.DataFrame({
+        "total": treated,
+        "by_passed_test": treated & has_passed_test,
+        "by_code_states_only": treated & ~has_passed_test,
+    }).groupby(level=0).sum()
 
 
 def calculate_function_coverage(
@@ -205,37 +149,15 @@ def calculate_function_coverage(
     Retourne ``(total, par_test_reussi, par_code_states_uniquement)``. Le
     troisième nombre exclut les fonctions qui ont déjà au moins un test réussi.
     """
-    treated_count = 0
-    treated_by_passed_test = 0
-    treated_by_code_states_only = 0
-
-    for _, function_rows in actor_rows.groupby("__function_key", sort=False):
-        has_passed_test = bool(function_rows["__has_passed_test"].any())
-        distinct_code_state_count = (
-            function_rows[code_state_col]
-            .dropna()
-            .astype(str)
-            .loc[lambda values: values.str.strip().ne("")]
-            .nunique()
-        )
-        has_two_distinct_code_states = distinct_code_state_count >= 2
+    counts = coverage_counts(actor_rows, code_state_col).sum()
+    return int(counts["total"]), int(counts["by_passed_test"]), int(counts["by_code_states_only"])
 
-        if has_passed_test or has_two_distinct_code_states:
-            treated_count += 1
-            if has_passed_test:
-                treated_by_passed_test += 1
-            else:
-                treated_by_code_states_only += 1
 
-    return treated_count, treated_by_passed_test, treated_by_code_states_only
-
-
-def main(
-    read_path: str,
-    write_path: str,
+def compute_metric_map(
+    df: pd.DataFrame,
     code_state_col: str = COL_CODE_STATE,
-) -> None:
-    df = um.load_csv(read_path)
+) -> dict[str, int]:
+    """Calcule la métrique par étudiant sur des traces déjà chargées."""
 
     required_cols = [
         um.COL_ACTOR,
@@ -264,17 +186,19 @@ def main(
         len(function_attempts),
     )
 
+    counts = coverage_counts(function_attempts, code_state_col)
     metric_map: dict[str, int] = {}
     for actor in sorted(actors):
-        actor_rows = function_attempts[
-            function_attempts[um.COL_ACTOR] == str(actor)
-        ]
-        coverage, by_passed_test, by_code_states_only = (
-            calculate_function_coverage(actor_rows, code_state_col)
-        )
+        if str(actor) in counts.index:
+            coverage, by_passed_test, by_code_states_only = (
+                int(value) for value in counts.loc[str(actor)]
+            )
+        else:
+            coverage, by_passed_test, by_code_states_only = 0, 0, 0
 
         metric_map[str(actor)] = coverage
-        out.info(
+        progress.detail(
+            out,
             "  %s : %d fonction(s) traitée(s) "
             "(%d avec au moins un test réussi, "
             "%d par états de code distincts uniquement)",
@@ -284,7 +208,20 @@ def main(
             by_code_states_only,
         )
 
-    um.write_metric(METRIC_NAME, metric_map, write_path)
+    return metric_map
+
+
+def main(
+    read_path: str,
+    write_path: str,
+    code_state_col: str = COL_CODE_STATE,
+) -> None:
+    df = um.load_csv(read_path)
+    um.write_metric(
+        METRIC_NAME,
+        compute_metric_map(df, code_state_col=code_state_col),
+        write_path,
+    )
 
 
 if __name__ == "__main__":
@@ -30,18 +30,19 @@ python productive_transition_rate_Mirabelle.py [entree.csv] [sortie.csv]
 
 from __future__ import annotations
 
-import os
-import re
 import sys
 from typing import Any
 
+import numpy as np
 import pandas as pd
 
 import utils_Mirabelle as um
+import test_cases
+# Module commun à la racine du projet, que utils_Mirabelle place dans sys.path.
+import progress
 
 out = um.out
 COL_EVENT_ID = "_id.$oid"
-FUNCTION_RE = re.compile(r"^\s*([A-Za-z_]\w*)\s*(?:\(|$)")
 METRIC_NAME = "ProductiveTransitionRate"
 REQUIRED_COLS = [
     um.COL_ACTOR,
@@ -52,52 +53,12 @@ REQUIRED_COLS = [
 ]
 
 
-def status_is_passed(value: Any) -> bool:
-    if value is True:
-        return True
-    if isinstance(value, (int, float)) and not isinstance(value, bool) and not pd.isna(value):
-        return value == 1
-    if isinstance(value, str):
-        return value.strip().lower() in {"true", "1", "passed", "pass"}
-    return False
-
-
 def normalize_code(value: Any) -> str | None:
     if pd.isna(value):
         return None
     return str(value).replace("\r\n", "\n").replace("\r", "\n")
 
 
-def extract_function_name(case: dict[str, Any]) -> str:
-    for key in ("name", "tested_line"):
-        raw = case.get(key)
-        if isinstance(raw, str) and raw.strip():
-            match = FUNCTION_RE.match(raw)
-            if match:
-                return match.group(1)
-    return "<fonction_inconnue>"
-
-
-def infer_filename(row: pd.Series, cases: list[dict[str, Any]]) -> str | None:
-    fallback = row.get(um.COL_FILE)
-    if pd.notna(fallback) and str(fallback).strip():
-        return os.path.basename(str(fallback).strip())
-    for case in cases:
-        raw = case.get("filename")
-        if isinstance(raw, str) and raw.strip():
-            return os.path.basename(raw.strip())
-    return None
-
-
-def test_identity(case: dict[str, Any]) -> tuple[str, str, str]:
-    """Identité d'un test sans ``lineno``, qui bouge avec les insertions."""
-    return (
-        extract_function_name(case),
-        str(case.get("tested_line", "")).strip(),
-        str(case.get("expected_result", "")).strip(),
-    )
-
-
 def prepare_attempts(df: pd.DataFrame) -> pd.DataFrame:
     rows = df[df[um.COL_VERB] == um.VERB_TEST].copy()
     rows["__row_order"] = range(len(rows))
@@ -109,90 +70,106 @@ def prepare_attempts(df: pd.DataFrame) -> pd.DataFrame:
         has_id = rows[COL_EVENT_ID].notna() & rows[COL_EVENT_ID].astype(str).str.strip().ne("")
         rows = rows.loc[~(has_id & rows.duplicated(COL_EVENT_ID, keep="first"))].copy()
 
-    records: list[dict[str, Any]] = []
-    for _, row in rows.iterrows():
-        cases = [
-            case for case in um.parse_tests(row[um.COL_TESTS])
-            if isinstance(case, dict) and "status" in case
-        ]
-        if not cases:
-            continue
-        code = normalize_code(row.get(um.COL_CODESTATE))
-        if code is None:
-            continue
-        filename = infer_filename(row, cases)
-        if filename is None:
-            continue
-
-        passed = sum(status_is_passed(case.get("status")) for case in cases)
-        signature = tuple(sorted(test_identity(case) for case in cases))
-        records.append({
-            um.COL_ACTOR: str(row[um.COL_ACTOR]),
-            "__session": str(row[um.COL_ACTIVITY_SESSION]),
-            "__filename": filename,
-            "__timestamp": row["__timestamp"],
-            "__row_order": row["__row_order"],
-            "__code": code,
-            "__test_signature": signature,
-            "__pass_rate": passed / len(cases),
-        })
-
-    columns = [
-        um.COL_ACTOR, "__session", "__filename", "__timestamp", "__row_order",
-        "__code", "__test_signature", "__pass_rate",
-    ]
-    attempts = pd.DataFrame.from_records(records, columns=columns)
+    # Seuls les cas portant un ``status`` sont exploitables.
+    cases = test_cases.explode(rows)
+    cases = cases[cases["has_status"]]
+    case_count = test_cases.case_counts(cases, len(rows))
+    passed = test_cases.case_counts(cases, len(rows), cases["status"])
+
+    # Fichier : ``filename_infere``, à défaut le premier cas qui en indique un.
+    filenames = pd.Series(test_cases.fallback_filenames(rows), dtype=object)
+    case_files = cases.dropna(subset=["case_filename"]).groupby("__row")["case_filename"].first()
+    filenames = filenames.fillna(pd.Series(case_files.to_numpy(dtype=object), index=case_files.index))
+    codes = [normalize_code(value) for value in rows[um.COL_CODESTATE]]
+
+    # Identité d'un test sans ``lineno``, qui bouge avec les insertions.
+    identities = list(zip(
+        cases["function"].fillna("<fonction_inconnue>"),
+        cases["tested_line"],
+        cases["expected_result"],
+    ))
+    ends = np.cumsum(case_count)
+    signatures = [tuple(sorted(identities[end - count:end])) for end, count in zip(ends, case_count)]
+
+    keep = (case_count > 0) & pd.notna(codes) & filenames.notna().to_numpy()
+    attempts = pd.DataFrame({
+        um.COL_ACTOR: rows[um.COL_ACTOR].astype(str).to_numpy(dtype=object),
+        "__session": rows[um.COL_ACTIVITY_SESSION].astype(str).to_numpy(dtype=object),
+        "__filename": filenames.to_numpy(dtype=object),
+        "__timestamp": rows["__timestamp"].array,
+        "__row_order": rows["__row_order"].to_numpy(),
+        "__code": pd.Series(codes, dtype=object).to_numpy(),
+        "__test_signature": pd.Series(signatures, dtype=object).to_numpy(),
+        "__pass_rate": passed / np.maximum(case_count, 1),
+    })[keep]
     return attempts.sort_values(
         [um.COL_ACTOR, "__session", "__filename", "__timestamp", "__row_order"],
         kind="mergesort",
     ).reset_index(drop=True)
 
 
-def calculate_metric(actor_rows: pd.DataFrame) -> tuple[float, int, int] | None:
-    productive = 0
-    comparable = 0
-
-    for _, unit_rows in actor_rows.groupby(["__session", "__filename"], sort=False):
-        previous = None
-        for _, current in unit_rows.iterrows():
-            if previous is not None:
-                if (
-                    previous["__code"] != current["__code"]
-                    and previous["__test_signature"] == current["__test_signature"]
-                ):
-                    comparable += 1
-                    if float(current["__pass_rate"]) > float(previous["__pass_rate"]):
-                        productive += 1
-            previous = current
+def transition_counts(attempts: pd.DataFrame) -> pd.DataFrame:
+    """Transitions comparables et productives par étudiant (``prepare_attempts`` trié).
+
+    Une transition relie deux Run.Test consécutifs d'un même étudiant, d'une
+    même session et d'un même fichier.
+    """
+    unit = [um.COL_ACTOR, "__session", "__filename"]
+    same_unit = (attempts[unit] == attempts[unit].shift()).all(axis=1).to_numpy()
+    signatures = pd.factorize(attempts["__test_signature"])[0]
+    codes = attempts["__code"].to_numpy(dtype=object)
+    pass_rates = attempts["__pass_rate"].to_numpy(dtype=float)
+
+    comparable = same_unit.copy()
+    comparable[1:] &= (codes[1:] != codes[:-1]) & (signatures[1:] == signatures[:-1])
+    productive = comparable.copy()
+    productive[1:] &= pass_rates[1:] > pass_rates[:-1]
+    return pd.DataFrame({
+        um.COL_ACTOR: attempts[um.COL_ACTOR].to_numpy(),
+        "productive": productive,
+        "comparable": comparable,
+    }).groupby(um.COL_ACTOR, sort=False).sum()
 
+
+def calculate_metric(actor_rows: pd.DataFrame) -> tuple[float, int, int] | None:
+    counts = transition_counts(actor_rows).sum()
+    productive = int(counts["productive"])
+    comparable = int(counts["comparable"])
     if comparable == 0:
         return None
     return productive / comparable, productive, comparable
 
 
-def main(read_path: str, write_path: str) -> None:
-    df = um.load_csv(read_path)
+def compute_metric_map(df: pd.DataFrame) -> dict[str, float]:
+    """Calcule la métrique par étudiant sur des traces déjà chargées."""
+
     if not um.check_columns(df, REQUIRED_COLS):
         sys.exit(1)
 
     attempts = prepare_attempts(df)
     actors = df[um.COL_ACTOR].dropna().astype(str).unique().tolist()
+    counts = transition_counts(attempts)
     metric_map: dict[str, float] = {}
     dropped = 0
 
     for actor in sorted(actors):
-        actor_rows = attempts[attempts[um.COL_ACTOR] == actor]
-        result = calculate_metric(actor_rows)
-        if result is None:
+        comparable = int(counts.at[actor, "comparable"]) if actor in counts.index else 0
+        if comparable == 0:
             out.warning("  %s : aucune transition comparable — ignoré", actor)
             dropped += 1
             continue
-        rate, productive, total = result
+        productive = int(counts.at[actor, "productive"])
+        rate = productive / comparable
         metric_map[actor] = round(rate, 6)
-        out.info("  %s : %.1f %% (%d/%d transitions)", actor, rate * 100, productive, total)
+        progress.detail(out, "  %s : %.1f %% (%d/%d transitions)", actor, rate * 100, productive, comparable)
 
     out.info("%d étudiant(s) ignoré(s)", dropped)
-    um.write_metric(METRIC_NAME, metric_map, write_path)
+    return metric_map
+
+
+def main(read_path: str, write_path: str) -> None:
+    df = um.load_csv(read_path)
+    um.write_metric(METRIC_NAME, compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
@@ -5,28 +5,38 @@ Voir README.md pour la formule détaillée et les conventions de segmentation.
 
 import sys
 
+import pandas as pd
+
 import utils_Mirabelle as um
+# Modules communs à la racine du projet, que utils_Mirabelle place dans sys.path.
+import partition
+import progress
 
 out = um.out
 
 
-def calculate_red(actor_attempts) -> float | None:
+def calculate_red(actor_attempts, segments=None) -> float | None:
     """
     Calcule la Repeated Error Density d'un étudiant à partir de la table
     de ses tentatives (issue de utils_Mirabelle.build_attempts).
 
     Retourne un float >= 0.0, ou None si aucune paire de tentatives
-    consécutives n'est disponible.
+    consécutives n'est disponible. ``segments`` : segments déjà calculés
+    (utils_Mirabelle.get_segments_indexes), recalculés si absents.
     """
     red = 0.0
     divisor = 0
+    errors = actor_attempts["error_categories"].tolist()
+
+    if segments is None:
+        segments = um.get_segments_indexes(actor_attempts)
 
-    for segment in um.get_segments_indexes(actor_attempts):
+    for segment in segments:
         repeated = 0
         for i in range(1, len(segment)):
             divisor += 1
-            e1_errors = actor_attempts["error_categories"].iloc[segment[i - 1]]
-            e2_errors = actor_attempts["error_categories"].iloc[segment[i]]
+            e1_errors = errors[segment[i - 1]]
+            e2_errors = errors[segment[i]]
             shared_errors = e1_errors & e2_errors
 
             if len(shared_errors) > 0:
@@ -48,8 +58,14 @@ def calculate_red(actor_attempts) -> float | None:
     return red / divisor
 
 
-def main(read_path: str, write_path: str) -> None:
-    df = um.load_csv(read_path)
+def actor_red(actor_rows) -> tuple[float | None, int]:
+    """RED d'un étudiant (voir calculate_red) et nombre de ses Run.Test."""
+    attempts = um.build_attempts(actor_rows)
+    return calculate_red(attempts), len(attempts)
+
+
+def compute_metric_map(df: pd.DataFrame) -> dict[str, float]:
+    """Calcule la métrique par étudiant sur des traces déjà chargées."""
 
     if not um.check_columns(df, um.REQUIRED_COLS):
         sys.exit(1)
@@ -60,20 +76,21 @@ def main(read_path: str, write_path: str) -> None:
     metric_map: dict[str, float] = {}
     dropped = 0
 
-    for actor in sorted(actors):
-        actor_rows = df[df[um.COL_ACTOR] == actor]
-        attempts = um.build_attempts(actor_rows)
-        red = calculate_red(attempts)
-
+    for actor, (red, n_attempts) in partition.map_groups(df, um.COL_ACTOR, actor_red):
         if red is None:
             out.warning("  %s : pas de paire de tentatives exploitable — ignoré", actor)
             dropped += 1
         else:
             metric_map[actor] = round(red, 6)
-            out.info("  %s : RED = %.3f  (%d Run.Test)", actor, red, len(attempts))
+            progress.detail(out, "  %s : RED = %.3f  (%d Run.Test)", actor, red, n_attempts)
 
     out.info("%d étudiant(s) ignoré(s) (pas de paire de tentatives exploitable)", dropped)
-    um.write_metric("RED_FE", metric_map, write_path)
+    return metric_map
+
+
+def main(read_path: str, write_path: str) -> None:
+    df = um.load_csv(read_path)
+    um.write_metric("RED_FE", compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
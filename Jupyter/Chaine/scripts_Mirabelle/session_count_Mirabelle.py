@@ -21,32 +21,33 @@ DEFAULT_GAP_MINUTES = um.DEFAULT_SESSION_GAP_MINUTES
 REQUIRED_COLS = [um.COL_ACTOR, um.COL_VERB, um.COL_TS]
 
 
-def calculate_session_count(actor_rows: pd.DataFrame, gap_minutes: float) -> int | None:
-    """Compte les groupes de ``Run.Test`` séparés par plus de ``gap_minutes``."""
+def session_counts(df: pd.DataFrame, gap_minutes: float) -> pd.Series:
+    """Nombre de sessions de ``Run.Test`` de chaque étudiant, indexé par ``actor``.
 
-    run_tests = actor_rows.loc[actor_rows[um.COL_VERB] == um.VERB_TEST].copy()
-    if run_tests.empty:
-        return None
+    Les sessions de tous les étudiants sont découpées en une seule passe ; un
+    étudiant sans ``Run.Test`` horodaté n'apparaît pas dans le résultat.
+    """
+
+    run_tests = df.loc[df[um.COL_VERB] == um.VERB_TEST]
     sessionized = um.add_activity_session_ids(run_tests, gap_minutes=gap_minutes)
-    if sessionized.empty:
-        return None
-    return int(sessionized[um.COL_ACTIVITY_SESSION].nunique())
+    return sessionized.groupby(um.COL_ACTOR, sort=True)[um.COL_ACTIVITY_SESSION].nunique()
 
 
-def main(read_path: str, write_path: str, gap_minutes: float = DEFAULT_GAP_MINUTES) -> None:
-    """Charge les traces, calcule la métrique par étudiant et écrit le CSV."""
+def compute_metric_map(df: pd.DataFrame, gap_minutes: float = DEFAULT_GAP_MINUTES) -> dict[str, int]:
+    """Calcule la métrique par étudiant sur des traces déjà chargées."""
 
-    df = um.load_csv(read_path)
     if not um.check_columns(df, REQUIRED_COLS):
         raise SystemExit(1)
 
-    metric_map: dict[str, int] = {}
-    for actor, actor_rows in df.dropna(subset=[um.COL_ACTOR]).groupby(um.COL_ACTOR, sort=True):
-        value = calculate_session_count(actor_rows, gap_minutes)
-        if value is not None:
-            metric_map[str(actor)] = value
+    counts = session_counts(df.dropna(subset=[um.COL_ACTOR]), float(gap_minutes))
+    return {str(actor): int(count) for actor, count in counts.items()}
+
 
-    um.write_metric(METRIC_NAME, metric_map, write_path)
+def main(read_path: str, write_path: str, gap_minutes: float = DEFAULT_GAP_MINUTES) -> None:
+    """Charge les traces, calcule la métrique par étudiant et écrit le CSV."""
+
+    df = um.load_csv(read_path)
+    um.write_metric(METRIC_NAME, compute_metric_map(df, gap_minutes), write_path)
 
 
 if __name__ == "__main__":
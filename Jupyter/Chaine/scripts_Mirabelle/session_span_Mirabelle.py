@@ -20,39 +20,39 @@ METRIC_NAME = "SessionSpanMinutes"
 REQUIRED_COLS = [um.COL_ACTOR, um.COL_VERB, um.COL_TS]
 
 
-def calculate_session_span(
-    actor_rows: pd.DataFrame,
+def session_spans(
+    df: pd.DataFrame,
     gap_minutes: float = um.DEFAULT_SESSION_GAP_MINUTES,
-) -> float | None:
-    """Retourne la durée moyenne des sessions d'activité en minutes."""
+) -> pd.Series:
+    """Durée moyenne des sessions d'activité de chaque étudiant, en minutes.
 
-    run_tests = actor_rows.loc[actor_rows[um.COL_VERB] == um.VERB_TEST].copy()
-    if run_tests.empty:
-        return None
+    Les sessions de tous les étudiants sont découpées en une seule passe ; un
+    étudiant sans ``Run.Test`` horodaté n'apparaît pas dans le résultat.
+    """
+
+    run_tests = df.loc[df[um.COL_VERB] == um.VERB_TEST]
     sessionized = um.add_activity_session_ids(run_tests, gap_minutes=gap_minutes)
-    if sessionized.empty:
-        return None
-    sessionized["__timestamp"] = pd.to_datetime(sessionized[um.COL_TS], errors="coerce", utc=True)
-    spans = sessionized.groupby(um.COL_ACTIVITY_SESSION)["__timestamp"].agg(
-        lambda x: max((x.max() - x.min()).total_seconds() / 60.0, 0.0)
+    timestamps = pd.to_datetime(sessionized[um.COL_TS], errors="coerce", utc=True)
+    sessions = timestamps.groupby(
+        [sessionized[um.COL_ACTOR], sessionized[um.COL_ACTIVITY_SESSION]], sort=True
     )
-    if spans.empty:
-        return None
-    return float(spans.mean())
+    spans = ((sessions.max() - sessions.min()).dt.total_seconds() / 60.0).clip(lower=0.0)
+    return spans.groupby(level=0, sort=True).mean()
 
 
-def main(read_path: str, write_path: str) -> None:
-    df = um.load_csv(read_path)
+def compute_metric_map(df: pd.DataFrame) -> dict[str, float]:
+    """Calcule la métrique par étudiant sur des traces déjà chargées."""
+
     if not um.check_columns(df, REQUIRED_COLS):
         raise SystemExit(1)
 
-    metric_map: dict[str, float] = {}
-    for actor, actor_rows in df.dropna(subset=[um.COL_ACTOR]).groupby(um.COL_ACTOR, sort=True):
-        value = calculate_session_span(actor_rows)
-        if value is not None:
-            metric_map[str(actor)] = round(value, 6)
+    spans = session_spans(df.dropna(subset=[um.COL_ACTOR]))
+    return {str(actor): round(float(value), 6) for actor, value in spans.items()}
 
-    um.write_metric(METRIC_NAME, metric_map, write_path)
+
+def main(read_path: str, write_path: str) -> None:
+    df = um.load_csv(read_path)
+    um.write_metric(METRIC_NAME, compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
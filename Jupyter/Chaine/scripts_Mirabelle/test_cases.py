@@ -0,0 +1,189 @@
+"""Table longue des cas de test Mirabelle : une ligne par (Run.Test, cas de test).
+
+La colonne ``tests`` contient, pour chaque évènement, la représentation Python
+d'une liste de cas de test. Plutôt que de la redécouper ligne par ligne avec
+``iterrows`` dans chaque script, ``explode`` la déplie une fois en une table
+typée, sur laquelle les indicateurs s'expriment par des agrégations groupées.
+
+Les attributs d'un cas ne dépendent que de la chaîne brute : ils sont calculés
+une seule fois par chaîne distincte (l'analyse elle-même passe par
+``utils_Mirabelle.parse_tests`` et son magasin ``tests_cache``), puis recopiés
+sur les évènements par indexation.
+
+Colonnes produites :
+
+- ``__row`` : position de l'évènement dans la table passée à ``explode`` ;
+- ``__case`` : position du cas dans la liste de l'évènement ;
+- ``verdict`` (catégorie) et ``has_verdict``, ``has_status`` (présence des clés) ;
+- ``status`` : statut réussi (vrai, 1, ``"true"``, ``"passed"``…) ;
+- ``status_numeric`` : statut numérique (hors booléen et NaN), qui fait seul foi ;
+- ``verdict_passed`` : verdict textuel commençant par ``Passed`` ;
+- ``function`` : nom de fonction tiré de ``name`` puis de ``tested_line`` ;
+- ``case_filename`` : nom court du champ ``filename`` du cas ;
+- ``tested_line``, ``expected_result`` : textes comparés (``str(...).strip()``,
+  chaîne vide si la clé est absente) ;
+- ``error_message`` : identité fine de l'erreur (``utils_Mirabelle.error_message``).
+"""
+
+from __future__ import annotations
+
+import os
+import re
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+import utils_Mirabelle as um
+
+# Reconnaît un nom Python placé au début d'une signature ou d'un appel.
+FUNCTION_NAME_RE = re.compile(r"^\s*([A-Za-z_]\w*)\s*(?:\(|$)")
+COLUMNS = [
+    "verdict",
+    "has_verdict",
+    "has_status",
+    "status",
+    "status_numeric",
+    "verdict_passed",
+    "function",
+    "case_filename",
+    "tested_line",
+    "expected_result",
+    "error_message",
+]
+
+# Chaîne brute -> attributs de ses cas (un tuple par cas, dans l'ordre de COLUMNS).
+_features: dict[str, list[tuple]] = {}
+
+
+def status_is_passed(value: Any) -> bool:
+    """Retourne True pour les représentations usuelles d'un test réussi."""
+    if value is True:
+        return True
+    if isinstance(value, (int, float)) and not isinstance(value, bool) and not pd.isna(value):
+        return value == 1
+    if isinstance(value, str):
+        return value.strip().lower() in {"true", "1", "passed", "pass"}
+    return False
+
+
+def extract_function_name(case: dict[str, Any]) -> str | None:
+    """Nom canonique de la fonction testée (``name`` prioritaire, puis ``tested_line``)."""
+    for key in ("name", "tested_line"):
+        raw = case.get(key)
+        if isinstance(raw, str) and raw.strip():
+            match = FUNCTION_NAME_RE.match(raw)
+            if match:
+                return match.group(1)
+    return None
+
+
+def case_filename(case: dict[str, Any]) -> str | None:
+    raw = case.get("filename")
+    if isinstance(raw, str) and raw.strip():
+        return os.path.basename(raw.strip())
+    return None
+
+
+def case_features(case: dict[str, Any]) -> tuple:
+    """Attributs d'un cas de test, dans l'ordre de ``COLUMNS``."""
+    status = case.get("status")
+    verdict = case.get("verdict")
+    return (
+        verdict,
+        "verdict" in case,
+        "status" in case,
+        status_is_passed(status),
+        isinstance(status, (int, float)) and not isinstance(status, bool) and bool(pd.notna(status)),
+        isinstance(verdict, str) and verdict.lower().startswith("passed"),
+        extract_function_name(case),
+        case_filename(case),
+        str(case.get("tested_line", "")).strip(),
+        str(case.get("expected_result", "")).strip(),
+        um.error_message(case),
+    )
+
+
+def _raw_features(raw) -> list[tuple]:
+    if not isinstance(raw, str):
+        return []
+    features = _features.get(raw)
+    if features is None:
+        features = _features[raw] = [case_features(case) for case in um.parse_tests(raw)]
+    return features
+
+
+def explode(events: pd.DataFrame) -> pd.DataFrame:
+    """Déplie la colonne ``tests`` de ``events`` : une ligne par (évènement, cas).
+
+    Les lignes suivent l'ordre des évènements, puis celui des cas dans chaque
+    liste. Un évènement sans cas de test exploitable n'a aucune ligne.
+    """
+    codes, uniques = pd.factorize(events[um.COL_TESTS], use_na_sentinel=True)
+    unique_features = [_raw_features(raw) for raw in uniques]
+    unique_counts = np.array([len(features) for features in unique_features], dtype=np.int64)
+    unique_offsets = np.cumsum(unique_counts) - unique_counts
+
+    valid = codes >= 0
+    row_counts = np.zeros(len(events), dtype=np.int64)
+    row_counts[valid] = unique_counts[codes[valid]]
+    rows = np.repeat(np.arange(len(events), dtype=np.int64), row_counts)
+    row_starts = np.cumsum(row_counts) - row_counts
+    cases = np.arange(len(rows), dtype=np.int64) - np.repeat(row_starts, row_counts)
+    positions = np.repeat(np.where(valid, unique_offsets[np.maximum(codes, 0)], 0), row_counts) + cases
+
+    flat = [case for features in unique_features for case in features]
+    table = pd.DataFrame.from_records(flat, columns=COLUMNS) if flat else pd.DataFrame(columns=COLUMNS)
+    table = table.take(positions).reset_index(drop=True)
+    table.insert(0, "__case", cases)
+    table.insert(0, "__row", rows)
+    for column in ("has_verdict", "has_status", "status", "status_numeric", "verdict_passed"):
+        table[column] = table[column].astype(bool)
+    table["verdict"] = table["verdict"].astype("category")
+    return table
+
+
+def fallback_filenames(events: pd.DataFrame) -> list[str | None]:
+    """Nom court tiré de ``filename_infere`` pour chaque évènement (None si absent)."""
+    if um.COL_FILE not in events.columns:
+        return [None] * len(events)
+    return [
+        os.path.basename(str(value).strip()) if pd.notna(value) and str(value).strip() else None
+        for value in events[um.COL_FILE]
+    ]
+
+
+def function_tests(events: pd.DataFrame, table: pd.DataFrame | None = None) -> pd.DataFrame:
+    """Une ligne par (évènement, fichier, fonction testée), dans l'ordre d'apparition.
+
+    Le fichier est celui du cas de test, à défaut ``filename_infere``, à défaut
+    ``"<fichier_inconnu>"``. Les cas sans nom de fonction sont écartés.
+    Colonnes : ``__row``, ``__filename``, ``__function``, ``n_cases``,
+    ``n_status`` (cas portant un ``status``) et ``n_passed`` (statuts réussis).
+    """
+    table = explode(events) if table is None else table
+    table = table[table["function"].notna()]
+    fallback = pd.Series(fallback_filenames(events), dtype=object).to_numpy()
+    filenames = table["case_filename"].to_numpy(dtype=object, na_value=None).copy()
+    missing = pd.isna(filenames)
+    filenames[missing] = fallback[table["__row"].to_numpy()[missing]]
+    filenames[pd.isna(filenames)] = "<fichier_inconnu>"
+
+    units = pd.DataFrame({
+        "__row": table["__row"].to_numpy(),
+        "__filename": filenames,
+        "__function": table["function"].to_numpy(dtype=object),
+        "has_status": table["has_status"].to_numpy(),
+        "status": table["status"].to_numpy(),
+    })
+    return (
+        units.groupby(["__row", "__filename", "__function"], sort=False)
+        .agg(n_cases=("status", "size"), n_status=("has_status", "sum"), n_passed=("status", "sum"))
+        .reset_index()
+    )
+
+
+def case_counts(table: pd.DataFrame, n_events: int, mask=None) -> np.ndarray:
+    """Nombre de lignes de ``table`` (restreintes à ``mask``) par évènement."""
+    rows = table["__row"].to_numpy() if mask is None else table.loc[mask, "__row"].to_numpy()
+    return np.bincount(rows, minlength=n_events)
@@ -16,66 +16,53 @@ sans cas de test exploitable est omis de la sortie.
 from __future__ import annotations
 
 import sys
-from typing import Any
 
 import pandas as pd
 
 import utils_Mirabelle as um
+import test_cases
 
 METRIC_NAME = "TestPassRate"
 REQUIRED_COLS = [um.COL_ACTOR, um.COL_VERB, um.COL_TESTS]
 
 
-def is_passed(case: dict[str, Any]) -> bool:
-    """Interprète de façon robuste les deux codages de réussite disponibles."""
+def case_counts(df: pd.DataFrame) -> pd.DataFrame:
+    """Par étudiant : ``total`` des cas observables et ``passed`` des cas réussis.
 
-    status = case.get("status")
-    if status is True:
-        return True
-    if isinstance(status, (int, float)) and not isinstance(status, bool) and pd.notna(status):
-        return status == 1
-    if isinstance(status, str) and status.strip().lower() in {"true", "1", "pass", "passed"}:
-        return True
+    Un cas sans statut ni verdict ne permet pas de déterminer un résultat et
+    n'entre donc pas au dénominateur. Un statut numérique fait seul foi ;
+    sinon, un statut réussi ou un verdict ``Passed*`` suffit.
+    """
 
-    verdict = case.get("verdict")
-    return isinstance(verdict, str) and verdict.lower().startswith("passed")
+    runs = df[(df[um.COL_VERB] == um.VERB_TEST) & df[um.COL_ACTOR].notna()]
+    cases = test_cases.explode(runs)
+    observable = cases["has_status"] | cases["has_verdict"]
+    passed = cases["status"] | (~cases["status_numeric"] & cases["verdict_passed"])
+    flags = pd.DataFrame({
+        "total": test_cases.case_counts(cases, len(runs), observable),
+        "passed": test_cases.case_counts(cases, len(runs), observable & passed),
+    })
+    return flags.groupby(runs[um.COL_ACTOR].to_numpy(), sort=True).sum()
 
 
-def calculate_test_pass_rate(actor_rows: pd.DataFrame) -> float | None:
-    """Calcule la proportion de cas réussis sur tous les ``Run.Test`` non vides."""
+def compute_metric_map(df: pd.DataFrame) -> dict[str, float]:
+    """Calcule la métrique par étudiant sur des traces déjà chargées."""
 
-    passed = 0
-    total = 0
-    run_tests = actor_rows[actor_rows[um.COL_VERB] == um.VERB_TEST]
+    if not um.check_columns(df, REQUIRED_COLS):
+        raise SystemExit(1)
 
-    for raw_tests in run_tests[um.COL_TESTS]:
-        for case in um.parse_tests(raw_tests):
-            if not isinstance(case, dict):
-                continue
-            # Un cas sans statut ni verdict ne permet pas de déterminer un
-            # résultat et n'entre donc pas au dénominateur.
-            if "status" not in case and "verdict" not in case:
-                continue
-            total += 1
-            passed += int(is_passed(case))
+    metric_map: dict[str, float] = {}
+    counts = case_counts(df)
+    for actor, total, passed in zip(counts.index, counts["total"], counts["passed"]):
+        if total:
+            metric_map[str(actor)] = round(int(passed) / int(total), 6)
 
-    if total == 0:
-        return None
-    return passed / total
+    return metric_map
 
 
 def main(read_path: str, write_path: str) -> None:
     df = um.load_csv(read_path)
-    if not um.check_columns(df, REQUIRED_COLS):
-        raise SystemExit(1)
-
-    metric_map: dict[str, float] = {}
-    for actor, actor_rows in df.dropna(subset=[um.COL_ACTOR]).groupby(um.COL_ACTOR, sort=True):
-        value = calculate_test_pass_rate(actor_rows)
-        if value is not None:
-            metric_map[str(actor)] = round(value, 6)
-
-    um.write_metric(METRIC_NAME, metric_map, write_path)
+    um.write_metric(METRIC_NAME, compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
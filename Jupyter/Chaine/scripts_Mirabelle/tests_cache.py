@@ -0,0 +1,159 @@
+"""Analyse mémorisée de la colonne ``tests`` des évènements Run.Test.
+
+``ast.literal_eval`` sur les listes de cas de test est le coût dominant d'un
+calcul Mirabelle, et les scripts analysaient les mêmes chaînes plusieurs fois
+(deux fois par ligne dans ``build_attempts``, puis de nouveau dans chaque
+script de taux ou de couverture). Le résultat de l'analyse est conservé :
+
+- en mémoire, par chaîne brute, pour toute la durée du processus : en mode
+  ``in_process``, tous les jobs partagent donc la même analyse ;
+- sur disque, dans ``cache/Mirabelle/tests_<version>.pkl``, indexé par
+  l'empreinte BLAKE2b de la chaîne brute. Une même chaîne donne toujours le
+  même résultat : le magasin n'a pas à être invalidé quand l'entrée change,
+  seules les chaînes nouvelles sont analysées puis ajoutées.
+
+Comme pour les tables de ``table_cache`` côté ProgSnap2, la taille du magasin
+est bornée : au-delà de ``max_bytes()``, les entrées les moins récemment
+utilisées sont supprimées après chaque écriture, sauf celles de l'analyse en
+cours. L'ordre d'utilisation n'est enregistré qu'à l'écriture du magasin.
+
+``STORE_VERSION`` fait partie du nom du fichier : elle doit changer avec le
+comportement de ``utils_Mirabelle.parse_tests``. Les magasins des autres
+versions, qui ne seraient plus relus, sont supprimés à l'écriture.
+"""
+
+import hashlib
+import logging
+import os
+import pathlib
+import pickle
+
+out = logging.getLogger()
+
+STORE_VERSION = "2026.10.18.A"
+STORE_DIR = os.path.join("cache", "Mirabelle")
+DIGEST_SIZE = 16
+DEFAULT_MAX_MB = 256
+
+# Chaîne brute -> liste des cas de test, ou None si la chaîne est illisible.
+memo = {}
+MISSING = object()
+_store = {}
+_store_state = None
+
+
+def store_path():
+    return os.path.join(STORE_DIR, "tests_%s.pkl" % STORE_VERSION)
+
+
+def max_bytes():
+    """Taille maximale du magasin (``MIRABELLE_TESTS_CACHE_MAX_MB``, 256 Mo par défaut)."""
+    return int(float(os.environ.get("MIRABELLE_TESTS_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+
+
+def digest(raw):
+    """Empreinte d'une chaîne ``tests`` brute, clé du magasin sur disque."""
+    return hashlib.blake2b(raw.encode("utf-8", "surrogatepass"), digest_size=DIGEST_SIZE).digest()
+
+
+def _load_store(path):
+    """Relit le magasin s'il a changé depuis la dernière lecture de ce processus."""
+    global _store, _store_state
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return _store
+    state = (stat.st_size, stat.st_mtime_ns)
+    if state != _store_state:
+        try:
+            with open(path, "rb") as file:
+                _store = pickle.load(file)
+        except (OSError, pickle.UnpicklingError, EOFError) as exc:
+            out.warning("Magasin des tests analysés illisible (%s) : %s", path, exc)
+            _store = {}
+        _store_state = state
+    return _store
+
+
+def _write_store(path, store):
+    global _store_state
+    try:
+        pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(tmp_path, "wb") as file:
+            pickle.dump(store, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+        stat = os.stat(path)
+        _store_state = (stat.st_size, stat.st_mtime_ns)
+    except OSError as exc:
+        out.warning("Magasin des tests analysés non écrit (%s) : %s", path, exc)
+
+
+def evict(path, store, keep=(), limit=None):
+    """Supprime les entrées les moins récemment utilisées si le magasin dépasse ``limit`` octets.
+
+    ``store`` est rangé du moins au plus récemment utilisé ; ``keep`` : clés à
+    conserver. Les magasins des autres versions sont supprimés.
+    """
+    for old_path in pathlib.Path(STORE_DIR).glob("tests_*.pkl"):
+        if old_path != pathlib.Path(path):
+            old_path.unlink(missing_ok=True)
+            out.info("Magasin des tests obsolète supprimé : %s", old_path)
+
+    limit = max_bytes() if limit is None else limit
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return
+    if size <= limit or not store:
+        return
+
+    # La taille d'une entrée est estimée par la moyenne du magasin.
+    target = int(len(store) * limit / size)
+    keep = set(keep)
+    evicted = 0
+    for key in list(store):
+        if len(store) <= target:
+            break
+        if key not in keep:
+            del store[key]
+            evicted += 1
+    if evicted:
+        _write_store(path, store)
+        out.info("Magasin des tests : %d entrée(s) supprimée(s) (%d octets avant, limite %d)",
+                 evicted, size, limit)
+
+
+def preload(raw_values, parse):
+    """Analyse une fois les chaînes distinctes de ``raw_values`` et les mémorise.
+
+    Les chaînes déjà présentes dans le magasin sur disque n'y sont pas
+    réanalysées ; les autres passent par ``parse`` (qui retourne la liste des
+    cas de test, ou None si la chaîne est illisible) et sont ajoutées au
+    magasin, qui est ensuite ramené sous ``max_bytes()`` (voir ``evict``).
+    Retourne le nombre de chaînes réellement analysées.
+    """
+    pending = {raw for raw in raw_values if isinstance(raw, str) and raw not in memo}
+    if not pending:
+        return 0
+
+    path = store_path()
+    store = _load_store(path)
+    parsed = 0
+    keys = []
+    for raw in pending:
+        key = digest(raw)
+        # Retirée puis réinsérée : l'entrée passe en fin, parmi les plus récemment utilisées.
+        cases = store.pop(key, MISSING)
+        if cases is MISSING:
+            cases = parse(raw)
+            parsed += 1
+        store[key] = cases
+        keys.append(key)
+        memo[raw] = cases
+
+    if parsed:
+        _write_store(path, store)
+        evict(path, store, keep=keys)
+    out.info("Tests analysés : %d chaîne(s) distincte(s), dont %d nouvelle(s)", len(pending), parsed)
+    return parsed
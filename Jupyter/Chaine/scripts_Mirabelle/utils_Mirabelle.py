@@ -19,9 +19,19 @@ import ast
 import csv
 import logging
 import pathlib
+import sys
+from typing import Sequence
 
+import numpy as np
 import pandas as pd
 
+import tests_cache
+
+# Modules communs aux trois corpus, à la racine du projet (columnar_store…).
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+import columnar_store  # noqa: E402
+import sessionization  # noqa: E402
+
 logging.basicConfig(
     format="%(asctime)s [%(levelname)-5.5s]  %(message)s",
     level=logging.INFO,
@@ -59,8 +69,25 @@ def parse_tests(raw) -> list[dict]:
 
     Une valeur réellement illisible est signalée dans les logs au lieu d'être
     silencieusement confondue avec un ``Run.Test`` sans cas de test.
+
+    Chaque chaîne n'est analysée qu'une fois (voir ``tests_cache`` et
+    ``load_csv``) : la liste retournée est partagée et ne doit pas être modifiée.
     """
-    if not isinstance(raw, str) or raw.strip().lower() in ("", "[]", "nan"):
+    if not isinstance(raw, str):
+        return []
+
+    cases = tests_cache.memo.get(raw, tests_cache.MISSING)
+    if cases is tests_cache.MISSING:
+        cases = tests_cache.memo[raw] = _parse_tests_text(raw)
+    if cases is None:
+        out.warning("Valeur 'tests' illisible (début) : %s", raw[:120])
+        return []
+    return cases
+
+
+def _parse_tests_text(raw: str) -> list[dict] | None:
+    """Analyse d'une chaîne ``tests`` ; None si elle est illisible."""
+    if raw.strip().lower() in ("", "[]", "nan"):
         return []
 
     candidates = [raw]
@@ -76,8 +103,7 @@ def parse_tests(raw) -> list[dict]:
         if isinstance(parsed, list):
             return [case for case in parsed if isinstance(case, dict)]
 
-    out.warning("Valeur 'tests' illisible (début) : %s", raw[:120])
-    return []
+    return None
 
 
 def add_activity_session_ids(
@@ -112,13 +138,8 @@ def add_activity_session_ids(
         [COL_ACTOR, helper_ts, helper_order], kind="mergesort"
     )
 
-    session_ids = pd.Series(index=result.index, dtype="Int64")
-    for _, actor_rows in result.groupby(COL_ACTOR, sort=False):
-        gaps = actor_rows[helper_ts].diff().dt.total_seconds().div(60.0)
-        starts = gaps.isna() | gaps.gt(float(gap_minutes))
-        session_ids.loc[actor_rows.index] = starts.cumsum().astype("int64").to_numpy()
-
-    result[output_col] = session_ids
+    session_ids = sessionization.session_ids([result[COL_ACTOR]], result[helper_ts], gap_minutes, local=True)
+    result[output_col] = pd.Series(session_ids, index=result.index, dtype="Int64")
     return result.drop(columns=[helper_ts, helper_order])
 
 
@@ -231,6 +252,43 @@ def build_attempts(actor_rows: pd.DataFrame) -> pd.DataFrame:
     return attempts
 
 
+def _changes(values: pd.Series) -> np.ndarray:
+    """Vrai en ``i`` (``i >= 1``) si la valeur diffère de celle en ``i - 1``.
+
+    Deux valeurs manquantes successives sont égales ; une valeur manquante et
+    une valeur présente sont différentes. Le résultat a ``len(values) - 1``
+    éléments.
+    """
+    array = values.to_numpy(dtype=object, na_value=None)
+    missing = pd.isna(array)
+    array[missing] = None
+    return (missing[1:] != missing[:-1]) | (~missing[1:] & ~missing[:-1] & (array[1:] != array[:-1]))
+
+
+def _segment_layout(attempts: pd.DataFrame) -> tuple[np.ndarray, np.ndarray]:
+    """Tentatives conservées et numéro de segment de chacune (voir get_segments_indexes)."""
+    n = len(attempts)
+    seg_cols = [c for c in (COL_FILE, COL_ACTIVITY_SESSION) if c in attempts.columns]
+
+    # La frontière de segment est traitée AVANT le test du code inchangé : le
+    # premier événement d'une nouvelle session/fichier n'est jamais avalé
+    # parce que son code ressemble au précédent.
+    boundary = np.zeros(n, dtype=bool)
+    if n:
+        boundary[0] = True
+    for col in seg_cols:
+        boundary[1:] |= _changes(attempts[col])
+
+    unchanged_code = np.zeros(n, dtype=bool)
+    if COL_CODESTATE in attempts.columns and n > 1:
+        codes = attempts[COL_CODESTATE]
+        present = codes.notna().to_numpy()
+        unchanged_code[1:] = present[1:] & present[:-1] & ~_changes(codes)
+
+    kept = np.flatnonzero(boundary | ~unchanged_code)
+    return kept, np.cumsum(boundary)[kept]
+
+
 def get_segments_indexes(attempts: pd.DataFrame) -> list[list[int]]:
     """
     Découpe la suite ordonnée de tentatives d'un étudiant en segments, à
@@ -244,69 +302,60 @@ def get_segments_indexes(attempts: pd.DataFrame) -> list[list[int]]:
     dans le CSV, la contrainte correspondante est simplement ignorée
     (dégradation gracieuse).
 
+    Les frontières et les codes inchangés sont calculés par comparaison de
+    chaque colonne avec elle-même décalée d'une ligne.
+
     Retourne une liste de listes d'indices positionnels dans `attempts`.
     """
-    n = len(attempts)
-    if n == 0:
+    kept, segment_ids = _segment_layout(attempts)
+    if not len(kept):
         return []
+    starts = np.flatnonzero(segment_ids[1:] != segment_ids[:-1]) + 1
+    return [segment.tolist() for segment in np.split(kept, starts)]
 
-    has_codestate = COL_CODESTATE in attempts.columns
-    seg_cols = [c for c in (COL_FILE, COL_ACTIVITY_SESSION) if c in attempts.columns]
 
-    segments = []
-    current_segment = [0]
-    for i in range(1, n):
-        # La frontière de segment doit être traitée AVANT le test du code
-        # inchangé : le premier événement d'une nouvelle session/fichier ne
-        # doit jamais être avalé parce que son code ressemble au précédent.
-        changed_segment = False
-        for col in seg_cols:
-            prev_val = attempts[col].iloc[i - 1]
-            curr_val = attempts[col].iloc[i]
-            if pd.isna(prev_val) and pd.isna(curr_val):
-                continue
-            if (pd.isna(prev_val) != pd.isna(curr_val)) or prev_val != curr_val:
-                changed_segment = True
-                break
-
-        if changed_segment:
-            if current_segment:
-                segments.append(current_segment)
-            current_segment = [i]
-            continue
-
-        if has_codestate:
-            prev_code = attempts[COL_CODESTATE].iloc[i - 1]
-            curr_code = attempts[COL_CODESTATE].iloc[i]
-            if pd.notna(prev_code) and pd.notna(curr_code) and prev_code == curr_code:
-                continue
+def attempt_pair_array(attempts: pd.DataFrame) -> np.ndarray:
+    """Paires de tentatives consécutives au sein de chaque segment, en tableau ``(k, 2)``."""
+    kept, segment_ids = _segment_layout(attempts)
+    if not len(kept):
+        return np.empty((0, 2), dtype=np.int64)
+    same_segment = segment_ids[1:] == segment_ids[:-1]
+    return np.column_stack((kept[:-1][same_segment], kept[1:][same_segment]))
 
-        current_segment.append(i)
 
-    if len(current_segment) > 0:
-        segments.append(current_segment)
-
-    return segments
+def segment_pair_array(segments: list[list[int]]) -> np.ndarray:
+    """Paires consécutives de segments déjà calculés (même résultat que attempt_pair_array)."""
+    pairs = [(segment[i - 1], segment[i]) for segment in segments for i in range(1, len(segment))]
+    return np.array(pairs, dtype=np.int64).reshape(-1, 2)
 
 
 def extract_attempt_pairs(attempts: pd.DataFrame) -> list[list[int]]:
     """Renvoie la liste des paires d'indices de tentatives consécutives
     au sein de chaque segment (cf. extract_compile_pair_indexes de
     scripts_Progsnap2/utils.py)."""
-    pairs = []
-    for segment in get_segments_indexes(attempts):
-        for i in range(1, len(segment)):
-            pairs.append([segment[i - 1], segment[i]])
-    return pairs
+    return attempt_pair_array(attempts).tolist()
+
 
+def read_input_csv(path: str) -> pd.DataFrame:
+    """Lecture texte du CSV Mirabelle, aussi utilisée par l'ingestion colonnaire."""
+    return pd.read_csv(path, on_bad_lines="skip", engine="python")
 
-def load_csv(path: str) -> pd.DataFrame:
+
+def load_csv(path: str, columns: Sequence[str] | None = None) -> pd.DataFrame:
     out.info("Chargement de %s …", path)
-    df = pd.read_csv(path, on_bad_lines="skip", engine="python")
+    df = columnar_store.read_input(path, read_input_csv, columns)
     out.info("  %d lignes, %d colonnes", len(df), len(df.columns))
+    if COL_TESTS in df.columns:
+        tests_cache.preload(df[COL_TESTS], _parse_tests_text)
     return df
 
 
+def build_tests_cache(path: str) -> str:
+    """Étape préalable du pipeline : remplit le magasin des tests analysés (``tests_cache``)."""
+    load_csv(path, [COL_TESTS])
+    return tests_cache.store_path()
+
+
 def check_columns(df: pd.DataFrame, required: list[str]) -> bool:
     missing = [c for c in required if c not in df.columns]
     if missing:
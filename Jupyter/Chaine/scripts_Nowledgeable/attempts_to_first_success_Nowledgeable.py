@@ -26,6 +26,11 @@ from typing import Any
 
 import pandas as pd
 
+from utils_Nowledgeable import load_csv
+# Modules communs à la racine du projet, que utils_Nowledgeable place dans sys.path.
+import partition
+import progress
+
 logging.basicConfig(format="%(asctime)s [%(levelname)-5.5s]  %(message)s", level=logging.INFO)
 out = logging.getLogger()
 
@@ -98,13 +103,6 @@ def calculate_metric(student_rows: pd.DataFrame) -> tuple[float, int] | None:
     return sum(values) / len(values), len(values)
 
 
-def load_csv(path: str) -> pd.DataFrame:
-    out.info("Chargement de %s …", path)
-    df = pd.read_csv(path, dtype={COL_STUDENT: "string"}, on_bad_lines="skip", engine="python")
-    out.info("  %d lignes, %d colonnes", len(df), len(df.columns))
-    return df
-
-
 def check_columns(df: pd.DataFrame) -> bool:
     missing = [c for c in REQUIRED_COLS if c not in df.columns]
     if missing:
@@ -123,25 +121,30 @@ def write_metric(metric_map: dict[str, float], path: str) -> None:
     out.info("Résultat écrit dans %s (%d étudiants)", path, len(metric_map))
 
 
-def main(read_path: str, write_path: str) -> None:
-    df = load_csv(read_path)
+def compute_metric_map(df: pd.DataFrame) -> dict[str, float]:
+    """Calcule la métrique par étudiant sur des soumissions déjà chargées."""
+
     if not check_columns(df):
         sys.exit(1)
     attempts = prepare_attempts(df)
     students = attempts[COL_STUDENT].dropna().unique().tolist()
     metric_map: dict[str, float] = {}
     dropped = 0
-    for sid in sorted(students):
-        result = calculate_metric(attempts[attempts[COL_STUDENT] == sid])
+    for sid, result in partition.map_groups(attempts, COL_STUDENT, calculate_metric):
         if result is None:
             out.warning("  %s : aucun exercice réussi — ignoré", sid)
             dropped += 1
             continue
         value, exercises = result
         metric_map[str(sid)] = round(value, 6)
-        out.info("  %s : %.3f tentative(s) (%d exercice(s) réussi(s))", sid, value, exercises)
+        progress.detail(out, "  %s : %.3f tentative(s) (%d exercice(s) réussi(s))", sid, value, exercises)
     out.info("%d étudiant(s) ignoré(s)", dropped)
-    write_metric(metric_map, write_path)
+    return metric_map
+
+
+def main(read_path: str, write_path: str) -> None:
+    df = load_csv(read_path)
+    write_metric(compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
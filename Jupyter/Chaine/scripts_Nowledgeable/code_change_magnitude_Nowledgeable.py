@@ -30,6 +30,11 @@ from typing import Any
 
 import pandas as pd
 
+from utils_Nowledgeable import load_csv
+# Modules communs à la racine du projet, que utils_Nowledgeable place dans sys.path.
+import partition
+import progress
+
 logging.basicConfig(format="%(asctime)s [%(levelname)-5.5s]  %(message)s", level=logging.INFO)
 out = logging.getLogger()
 COL_STUDENT = "studentId"
@@ -106,23 +111,28 @@ def write_metric(metric_map: dict[str, float], path: str) -> None:
             writer.writerow({"SubjectID": sid, METRIC_NAME: value})
 
 
-def main(read_path: str, write_path: str) -> None:
-    df = pd.read_csv(read_path, dtype={COL_STUDENT: "string"}, on_bad_lines="skip", engine="python")
+def compute_metric_map(df: pd.DataFrame) -> dict[str, float]:
+    """Calcule la métrique par étudiant sur des soumissions déjà chargées."""
+
     missing = [c for c in REQUIRED_COLS if c not in df.columns]
     if missing:
         out.error("Colonnes manquantes : %s", missing)
         sys.exit(1)
     attempts = prepare_attempts(df)
     metric_map: dict[str, float] = {}
-    for sid in sorted(attempts[COL_STUDENT].dropna().unique().tolist()):
-        result = calculate_metric(attempts[attempts[COL_STUDENT] == sid])
+    for sid, result in partition.map_groups(attempts, COL_STUDENT, calculate_metric):
         if result is None:
             out.warning("  %s : aucun changement de code observable — ignoré", sid)
             continue
         value, transitions = result
         metric_map[str(sid)] = round(value, 6)
-        out.info("  %s : %.4f (%d transition(s))", sid, value, transitions)
-    write_metric(metric_map, write_path)
+        progress.detail(out, "  %s : %.4f (%d transition(s))", sid, value, transitions)
+    return metric_map
+
+
+def main(read_path: str, write_path: str) -> None:
+    df = load_csv(read_path)
+    write_metric(compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
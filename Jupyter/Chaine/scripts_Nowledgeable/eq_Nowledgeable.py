@@ -42,6 +42,11 @@ from typing import Any
 
 import pandas as pd
 
+from utils_Nowledgeable import load_csv
+# Modules communs à la racine du projet, que utils_Nowledgeable place dans sys.path.
+import partition
+import progress
+
 
 logging.basicConfig(
     format="%(asctime)s [%(levelname)-5.5s]  %(message)s",
@@ -288,18 +293,6 @@ def calculate_eq(student_rows: pd.DataFrame) -> tuple[float, int] | None:
     return total_score / len(pairs), len(pairs)
 
 
-def load_csv(path: str) -> pd.DataFrame:
-    out.info("Chargement de %s …", path)
-    df = pd.read_csv(
-        path,
-        dtype={COL_STUDENT: "string"},
-        on_bad_lines="skip",
-        engine="python",
-    )
-    out.info("  %d lignes, %d colonnes", len(df), len(df.columns))
-    return df
-
-
 def check_columns(df: pd.DataFrame, required: list[str]) -> bool:
     missing = [column for column in required if column not in df.columns]
     if missing:
@@ -322,8 +315,9 @@ def write_metric(name: str, metric_map: dict[str, float], path: str) -> None:
     out.info("Résultat écrit dans %s (%d étudiants)", path, len(metric_map))
 
 
-def main(read_path: str, write_path: str) -> None:
-    df = load_csv(read_path)
+def compute_metric_map(df: pd.DataFrame) -> dict[str, float]:
+    """Calcule la métrique par étudiant sur des soumissions déjà chargées."""
+
     if not check_columns(df, REQUIRED_COLS):
         sys.exit(1)
 
@@ -334,10 +328,7 @@ def main(read_path: str, write_path: str) -> None:
     metric_map: dict[str, float] = {}
     dropped = 0
 
-    for student_id in sorted(students):
-        student_rows = attempts[attempts[COL_STUDENT] == student_id]
-        result = calculate_eq(student_rows)
-
+    for student_id, result in partition.map_groups(attempts, COL_STUDENT, calculate_eq):
         if result is None:
             out.warning(
                 "  %s : aucune paire avec feedback de compilation observable — ignoré",
@@ -348,10 +339,15 @@ def main(read_path: str, write_path: str) -> None:
 
         eq, pair_count = result
         metric_map[str(student_id)] = round(eq, 6)
-        out.info("  %s : EQ = %.4f (%d paire(s))", student_id, eq, pair_count)
+        progress.detail(out, "  %s : EQ = %.4f (%d paire(s))", student_id, eq, pair_count)
 
     out.info("%d étudiant(s) ignoré(s) (aucune paire observable)", dropped)
-    write_metric(METRIC_NAME, metric_map, write_path)
+    return metric_map
+
+
+def main(read_path: str, write_path: str) -> None:
+    df = load_csv(read_path)
+    write_metric(METRIC_NAME, compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
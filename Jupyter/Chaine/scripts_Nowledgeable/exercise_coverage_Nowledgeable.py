@@ -34,6 +34,11 @@ from typing import Any
 
 import pandas as pd
 
+from utils_Nowledgeable import load_csv
+# Modules communs à la racine du projet, que utils_Nowledgeable place dans sys.path.
+import partition
+import progress
+
 
 logging.basicConfig(
     format="%(asctime)s [%(levelname)-5.5s]  %(message)s",
@@ -141,18 +146,6 @@ def calculate_exercise_coverage(
     return treated_count, treated_by_score, treated_by_versions_only
 
 
-def load_csv(path: str) -> pd.DataFrame:
-    out.info("Chargement de %s …", path)
-    df = pd.read_csv(
-        path,
-        dtype={COL_STUDENT: "string"},
-        on_bad_lines="skip",
-        engine="python",
-    )
-    out.info("  %d lignes, %d colonnes", len(df), len(df.columns))
-    return df
-
-
 def check_columns(df: pd.DataFrame, required: list[str]) -> bool:
     missing = [column for column in required if column not in df.columns]
     if missing:
@@ -178,8 +171,8 @@ def write_metric(name: str, metric_map: dict[str, int], path: str) -> None:
     out.info("Résultat écrit dans %s (%d étudiants)", path, len(metric_map))
 
 
-def main(read_path: str, write_path: str) -> None:
-    df = load_csv(read_path)
+def compute_metric_map(df: pd.DataFrame) -> dict[str, int]:
+    """Calcule la métrique par étudiant sur des soumissions déjà chargées."""
 
     if not check_columns(df, REQUIRED_COLS):
         sys.exit(1)
@@ -193,14 +186,12 @@ def main(read_path: str, write_path: str) -> None:
 
     metric_map: dict[str, int] = {}
 
-    for student_id in sorted(students):
-        student_rows = attempts[attempts[COL_STUDENT] == student_id]
-        coverage, by_score, by_versions_only = calculate_exercise_coverage(
-            student_rows
-        )
-
+    for student_id, (coverage, by_score, by_versions_only) in partition.map_groups(
+        attempts, COL_STUDENT, calculate_exercise_coverage, keys=sorted(students)
+    ):
         metric_map[str(student_id)] = coverage
-        out.info(
+        progress.detail(
+            out,
             "  %s : %d exercice(s) traité(s) "
             "(%d avec score > 0, %d par versions distinctes uniquement)",
             student_id,
@@ -209,7 +200,12 @@ def main(read_path: str, write_path: str) -> None:
             by_versions_only,
         )
 
-    write_metric(METRIC_NAME, metric_map, write_path)
+    return metric_map
+
+
+def main(read_path: str, write_path: str) -> None:
+    df = load_csv(read_path)
+    write_metric(METRIC_NAME, compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
@@ -33,6 +33,11 @@ from typing import Any
 
 import pandas as pd
 
+from utils_Nowledgeable import load_csv
+# Modules communs à la racine du projet, que utils_Nowledgeable place dans sys.path.
+import partition
+import progress
+
 
 logging.basicConfig(
     format="%(asctime)s [%(levelname)-5.5s]  %(message)s",
@@ -169,18 +174,6 @@ def calculate_max_unchanged_attempts(student_rows: pd.DataFrame) -> int | None:
     return maximum if maximum > 0 else None
 
 
-def load_csv(path: str) -> pd.DataFrame:
-    out.info("Chargement de %s …", path)
-    df = pd.read_csv(
-        path,
-        dtype={COL_STUDENT: "string"},
-        on_bad_lines="skip",
-        engine="python",
-    )
-    out.info("  %d lignes, %d colonnes", len(df), len(df.columns))
-    return df
-
-
 def check_columns(df: pd.DataFrame, required: list[str]) -> bool:
     missing = [column for column in required if column not in df.columns]
     if missing:
@@ -203,8 +196,8 @@ def write_metric(name: str, metric_map: dict[str, int], path: str) -> None:
     out.info("Résultat écrit dans %s (%d étudiants)", path, len(metric_map))
 
 
-def main(read_path: str, write_path: str) -> None:
-    df = load_csv(read_path)
+def compute_metric_map(df: pd.DataFrame) -> dict[str, int]:
+    """Calcule la métrique par étudiant sur des soumissions déjà chargées."""
 
     if not check_columns(df, REQUIRED_COLS):
         sys.exit(1)
@@ -216,20 +209,22 @@ def main(read_path: str, write_path: str) -> None:
     metric_map: dict[str, int] = {}
     dropped = 0
 
-    for student_id in sorted(students):
-        student_rows = attempts[attempts[COL_STUDENT] == student_id]
-        maximum = calculate_max_unchanged_attempts(student_rows)
-
+    for student_id, maximum in partition.map_groups(attempts, COL_STUDENT, calculate_max_unchanged_attempts):
         if maximum is None:
             out.warning("  %s : aucun code exploitable — ignoré", student_id)
             dropped += 1
             continue
 
         metric_map[str(student_id)] = maximum
-        out.info("  %s : %d tentative(s) consécutive(s)", student_id, maximum)
+        progress.detail(out, "  %s : %d tentative(s) consécutive(s)", student_id, maximum)
 
     out.info("%d étudiant(s) ignoré(s) (aucun code exploitable)", dropped)
-    write_metric(METRIC_NAME, metric_map, write_path)
+    return metric_map
+
+
+def main(read_path: str, write_path: str) -> None:
+    df = load_csv(read_path)
+    write_metric(METRIC_NAME, compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
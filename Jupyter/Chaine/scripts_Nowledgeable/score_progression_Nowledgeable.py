@@ -29,6 +29,11 @@ import pathlib
 import sys
 import pandas as pd
 
+from utils_Nowledgeable import load_csv
+# Modules communs à la racine du projet, que utils_Nowledgeable place dans sys.path.
+import partition
+import progress
+
 
 logging.basicConfig(
     format="%(asctime)s [%(levelname)-5.5s]  %(message)s",
@@ -163,18 +168,6 @@ def calculate_score_progression(
     return score, len(exercise_progressions), used_attempts
 
 
-def load_csv(path: str) -> pd.DataFrame:
-    out.info("Chargement de %s …", path)
-    df = pd.read_csv(
-        path,
-        dtype={COL_STUDENT: "string"},
-        on_bad_lines="skip",
-        engine="python",
-    )
-    out.info("  %d lignes, %d colonnes", len(df), len(df.columns))
-    return df
-
-
 def check_columns(df: pd.DataFrame, required: list[str]) -> bool:
     missing = [column for column in required if column not in df.columns]
     if missing:
@@ -197,8 +190,8 @@ def write_metric(name: str, metric_map: dict[str, float], path: str) -> None:
     out.info("Résultat écrit dans %s (%d étudiants)", path, len(metric_map))
 
 
-def main(read_path: str, write_path: str) -> None:
-    df = load_csv(read_path)
+def compute_metric_map(df: pd.DataFrame) -> dict[str, float]:
+    """Calcule la métrique par étudiant sur des soumissions déjà chargées."""
 
     if not check_columns(df, REQUIRED_COLS):
         sys.exit(1)
@@ -210,10 +203,7 @@ def main(read_path: str, write_path: str) -> None:
     metric_map: dict[str, float] = {}
     dropped = 0
 
-    for student_id in sorted(students):
-        student_rows = attempts[attempts[COL_STUDENT] == student_id]
-        result = calculate_score_progression(student_rows)
-
+    for student_id, result in partition.map_groups(attempts, COL_STUDENT, calculate_score_progression):
         if result is None:
             out.warning(
                 "  %s : aucun exercice avec au moins deux tentatives — ignoré",
@@ -224,7 +214,8 @@ def main(read_path: str, write_path: str) -> None:
 
         score, exercise_count, attempt_count = result
         metric_map[str(student_id)] = round(score, 6)
-        out.info(
+        progress.detail(
+            out,
             "  %s : %+.4f (%d exercice(s), %d tentative(s))",
             student_id,
             score,
@@ -236,7 +227,12 @@ def main(read_path: str, write_path: str) -> None:
         "%d étudiant(s) ignoré(s) (progression non mesurable)",
         dropped,
     )
-    write_metric(METRIC_NAME, metric_map, write_path)
+    return metric_map
+
+
+def main(read_path: str, write_path: str) -> None:
+    df = load_csv(read_path)
+    write_metric(METRIC_NAME, compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
@@ -31,6 +31,13 @@ import sys
 
 import pandas as pd
 
+from utils_Nowledgeable import load_csv
+# Module commun à la racine du projet, que utils_Nowledgeable place dans sys.path.
+import progress
+
+# Module commun à la racine du projet, que utils_Nowledgeable place dans sys.path.
+import sessionization  # noqa: E402
+
 
 logging.basicConfig(
     format="%(asctime)s [%(levelname)-5.5s]  %(message)s",
@@ -130,38 +137,22 @@ def prepare_activities(df: pd.DataFrame) -> pd.DataFrame:
     ).reset_index(drop=True)
 
 
-def calculate_session_count(
-    student_rows: pd.DataFrame,
+def session_counts(
+    activities: pd.DataFrame,
     gap_minutes: float = DEFAULT_GAP_MINUTES,
-) -> int | None:
-    """Compte les groupes d'activités séparés par plus de ``gap_minutes``.
+) -> pd.Series:
+    """Compte, pour chaque étudiant, les groupes d'activités séparés par plus de ``gap_minutes``.
 
-    Une activité isolée constitue une session. ``None`` est retourné lorsqu'il
-    n'existe aucune activité horodatée exploitable pour l'étudiant.
+    ``activities`` est la table triée de ``prepare_activities`` : les sessions
+    de tous les étudiants sont découpées en une seule passe. Une activité
+    isolée constitue une session.
     """
     if gap_minutes < 0:
         raise ValueError("gap_minutes doit être positif ou nul")
 
-    timestamps = student_rows["__timestamp"].dropna().sort_values()
-    if timestamps.empty:
-        return None
-
-    gaps_seconds = timestamps.diff().dt.total_seconds().dropna()
-    threshold_seconds = gap_minutes * 60.0
-
-    return int(1 + (gaps_seconds > threshold_seconds).sum())
-
-
-def load_csv(path: str) -> pd.DataFrame:
-    out.info("Chargement de %s …", path)
-    df = pd.read_csv(
-        path,
-        dtype={COL_STUDENT: "string"},
-        on_bad_lines="skip",
-        engine="python",
-    )
-    out.info("  %d lignes, %d colonnes", len(df), len(df.columns))
-    return df
+    students = activities[COL_STUDENT]
+    starts = sessionization.session_starts([students], activities["__timestamp"], gap_minutes)
+    return pd.Series(starts, index=activities.index).groupby(students, sort=True).sum()
 
 
 def check_columns(df: pd.DataFrame, required: list[str]) -> bool:
@@ -189,48 +180,41 @@ def write_metric(name: str, metric_map: dict[str, int], path: str) -> None:
     out.info("Résultat écrit dans %s (%d étudiants)", path, len(metric_map))
 
 
-def main(read_path: str, write_path: str, gap_minutes: float) -> None:
-    df = load_csv(read_path)
+def compute_metric_map(
+    df: pd.DataFrame,
+    gap_minutes: float = DEFAULT_GAP_MINUTES,
+) -> dict[str, int]:
+    """Calcule la métrique par étudiant sur des soumissions déjà chargées."""
 
     if not check_columns(df, REQUIRED_COLS):
         sys.exit(1)
 
+    gap_minutes = float(gap_minutes)
     if gap_minutes < 0:
         out.error("Le seuil en minutes doit être positif ou nul")
         sys.exit(1)
 
     activities = prepare_activities(df)
-    students = activities[COL_STUDENT].dropna().unique().tolist()
-    out.info("%d étudiant(s) trouvé(s)", len(students))
+    counts = session_counts(activities, gap_minutes=gap_minutes)
+    activity_counts = activities.groupby(COL_STUDENT, sort=True).size()
+    out.info("%d étudiant(s) trouvé(s)", len(counts))
 
     metric_map: dict[str, int] = {}
-    dropped = 0
-
-    for student_id in sorted(students):
-        student_rows = activities[activities[COL_STUDENT] == student_id]
-        count = calculate_session_count(
-            student_rows,
-            gap_minutes=gap_minutes,
-        )
-
-        if count is None:
-            out.warning("  %s : aucune activité horodatée — ignoré", student_id)
-            dropped += 1
-            continue
-
-        metric_map[str(student_id)] = count
-        out.info(
+    for student_id, count in counts.items():
+        metric_map[str(student_id)] = int(count)
+        progress.detail(
+            out,
             "  %s : %d session(s) (%d activité(s))",
             student_id,
             count,
-            len(student_rows),
+            activity_counts[student_id],
         )
+    return metric_map
 
-    out.info(
-        "%d étudiant(s) ignoré(s) (aucune activité horodatée)",
-        dropped,
-    )
-    write_metric(METRIC_NAME, metric_map, write_path)
+
+def main(read_path: str, write_path: str, gap_minutes: float) -> None:
+    df = load_csv(read_path)
+    write_metric(METRIC_NAME, compute_metric_map(df, gap_minutes), write_path)
 
 
 if __name__ == "__main__":
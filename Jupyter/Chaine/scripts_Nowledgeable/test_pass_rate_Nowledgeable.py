@@ -23,6 +23,11 @@ from typing import Any
 
 import pandas as pd
 
+from utils_Nowledgeable import load_csv
+# Modules communs à la racine du projet, que utils_Nowledgeable place dans sys.path.
+import partition
+import progress
+
 
 logging.basicConfig(
     format="%(asctime)s [%(levelname)-5.5s]  %(message)s",
@@ -97,18 +102,6 @@ def calculate_test_pass_rate(student_rows: pd.DataFrame) -> tuple[float, int, in
     return passed_tests / total_tests, passed_tests, total_tests
 
 
-def load_csv(path: str) -> pd.DataFrame:
-    out.info("Chargement de %s …", path)
-    df = pd.read_csv(
-        path,
-        dtype={COL_STUDENT: "string"},
-        on_bad_lines="skip",
-        engine="python",
-    )
-    out.info("  %d lignes, %d colonnes", len(df), len(df.columns))
-    return df
-
-
 def check_columns(df: pd.DataFrame, required: list[str]) -> bool:
     missing = [column for column in required if column not in df.columns]
     if missing:
@@ -131,8 +124,8 @@ def write_metric(name: str, metric_map: dict[str, float], path: str) -> None:
     out.info("Résultat écrit dans %s (%d étudiants)", path, len(metric_map))
 
 
-def main(read_path: str, write_path: str) -> None:
-    df = load_csv(read_path)
+def compute_metric_map(df: pd.DataFrame) -> dict[str, float]:
+    """Calcule la métrique par étudiant sur des soumissions déjà chargées."""
 
     if not check_columns(df, REQUIRED_COLS):
         sys.exit(1)
@@ -143,10 +136,7 @@ def main(read_path: str, write_path: str) -> None:
     metric_map: dict[str, float] = {}
     dropped = 0
 
-    for student_id in sorted(students):
-        student_rows = df[df[COL_STUDENT] == student_id]
-        result = calculate_test_pass_rate(student_rows)
-
+    for student_id, result in partition.map_groups(df, COL_STUDENT, calculate_test_pass_rate):
         if result is None:
             out.warning("  %s : aucun cas de test détaillé — ignoré", student_id)
             dropped += 1
@@ -154,7 +144,8 @@ def main(read_path: str, write_path: str) -> None:
 
         rate, passed_tests, total_tests = result
         metric_map[str(student_id)] = round(rate, 6)
-        out.info(
+        progress.detail(
+            out,
             "  %s : %.1f %% (%d/%d tests)",
             student_id,
             rate * 100,
@@ -163,7 +154,12 @@ def main(read_path: str, write_path: str) -> None:
         )
 
     out.info("%d étudiant(s) ignoré(s) (aucun test détaillé)", dropped)
-    write_metric("TestPassRate", metric_map, write_path)
+    return metric_map
+
+
+def main(read_path: str, write_path: str) -> None:
+    df = load_csv(read_path)
+    write_metric("TestPassRate", compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
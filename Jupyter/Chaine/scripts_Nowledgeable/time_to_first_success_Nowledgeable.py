@@ -23,6 +23,11 @@ from typing import Any
 
 import pandas as pd
 
+from utils_Nowledgeable import load_csv
+# Modules communs à la racine du projet, que utils_Nowledgeable place dans sys.path.
+import partition
+import progress
+
 logging.basicConfig(format="%(asctime)s [%(levelname)-5.5s]  %(message)s", level=logging.INFO)
 out = logging.getLogger()
 
@@ -91,11 +96,6 @@ def calculate_metric(student_rows: pd.DataFrame) -> tuple[float, int] | None:
     return sum(durations) / len(durations), len(durations)
 
 
-def load_csv(path: str) -> pd.DataFrame:
-    out.info("Chargement de %s …", path)
-    return pd.read_csv(path, dtype={COL_STUDENT: "string"}, on_bad_lines="skip", engine="python")
-
-
 def write_metric(metric_map: dict[str, float], path: str) -> None:
     pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
     with open(path, "w", newline="", encoding="utf-8") as f:
@@ -105,23 +105,28 @@ def write_metric(metric_map: dict[str, float], path: str) -> None:
             writer.writerow({"SubjectID": sid, METRIC_NAME: value})
 
 
-def main(read_path: str, write_path: str) -> None:
-    df = load_csv(read_path)
+def compute_metric_map(df: pd.DataFrame) -> dict[str, float]:
+    """Calcule la métrique par étudiant sur des soumissions déjà chargées."""
+
     missing = [c for c in REQUIRED_COLS if c not in df.columns]
     if missing:
         out.error("Colonnes manquantes : %s", missing)
         sys.exit(1)
     attempts = prepare_attempts(df)
     metric_map: dict[str, float] = {}
-    for sid in sorted(attempts[COL_STUDENT].dropna().unique().tolist()):
-        result = calculate_metric(attempts[attempts[COL_STUDENT] == sid])
+    for sid, result in partition.map_groups(attempts, COL_STUDENT, calculate_metric):
         if result is None:
             out.warning("  %s : aucun temps jusqu'au succès mesurable — ignoré", sid)
             continue
         value, exercises = result
         metric_map[str(sid)] = round(value, 6)
-        out.info("  %s : %.3f min (%d exercice(s))", sid, value, exercises)
-    write_metric(metric_map, write_path)
+        progress.detail(out, "  %s : %.3f min (%d exercice(s))", sid, value, exercises)
+    return metric_map
+
+
+def main(read_path: str, write_path: str) -> None:
+    df = load_csv(read_path)
+    write_metric(compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
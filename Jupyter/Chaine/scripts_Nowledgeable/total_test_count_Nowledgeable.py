@@ -26,6 +26,11 @@ from typing import Any
 
 import pandas as pd
 
+from utils_Nowledgeable import load_csv
+# Modules communs à la racine du projet, que utils_Nowledgeable place dans sys.path.
+import partition
+import progress
+
 
 logging.basicConfig(
     format="%(asctime)s [%(levelname)-5.5s]  %(message)s",
@@ -74,18 +79,6 @@ def calculate_total_test_count(student_rows: pd.DataFrame) -> int:
     return total_tests
 
 
-def load_csv(path: str) -> pd.DataFrame:
-    out.info("Chargement de %s …", path)
-    df = pd.read_csv(
-        path,
-        dtype={COL_STUDENT: "string"},
-        on_bad_lines="skip",
-        engine="python",
-    )
-    out.info("  %d lignes, %d colonnes", len(df), len(df.columns))
-    return df
-
-
 def check_columns(df: pd.DataFrame, required: list[str]) -> bool:
     missing = [column for column in required if column not in df.columns]
     if missing:
@@ -111,8 +104,8 @@ def write_metric(name: str, metric_map: dict[str, int], path: str) -> None:
     out.info("Résultat écrit dans %s (%d étudiants)", path, len(metric_map))
 
 
-def main(read_path: str, write_path: str) -> None:
-    df = load_csv(read_path)
+def compute_metric_map(df: pd.DataFrame) -> dict[str, int]:
+    """Calcule la métrique par étudiant sur des soumissions déjà chargées."""
 
     if not check_columns(df, REQUIRED_COLS):
         sys.exit(1)
@@ -122,13 +115,16 @@ def main(read_path: str, write_path: str) -> None:
 
     metric_map: dict[str, int] = {}
 
-    for student_id in sorted(students):
-        student_rows = df[df[COL_STUDENT] == student_id]
-        total_tests = calculate_total_test_count(student_rows)
+    for student_id, total_tests in partition.map_groups(df, COL_STUDENT, calculate_total_test_count):
         metric_map[str(student_id)] = total_tests
-        out.info("  %s : %d test(s)", student_id, total_tests)
+        progress.detail(out, "  %s : %d test(s)", student_id, total_tests)
+
+    return metric_map
+
 
-    write_metric("TotalTestCount", metric_map, write_path)
+def main(read_path: str, write_path: str) -> None:
+    df = load_csv(read_path)
+    write_metric("TotalTestCount", compute_metric_map(df), write_path)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,46 @@
+"""Chargement partagé des soumissions Nowledgeable.
+
+Tous les scripts lisent l'entrée par ``load_csv`` : depuis la copie colonnaire
+produite par l'ingestion lorsqu'elle est à jour, sinon depuis le CSV. Le
+pipeline utilise la même fonction lorsqu'il charge l'entrée une seule fois pour
+tous les indicateurs (``run_metric_jobs(..., mode="in_process")``).
+"""
+
+from __future__ import annotations
+
+import logging
+import pathlib
+import sys
+from typing import Sequence
+
+import pandas as pd
+
+# Modules communs aux trois corpus, à la racine du projet (columnar_store…).
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+import columnar_store  # noqa: E402
+
+
+logging.basicConfig(
+    format="%(asctime)s [%(levelname)-5.5s]  %(message)s",
+    level=logging.INFO,
+)
+out = logging.getLogger()
+
+COL_STUDENT = "studentId"
+
+
+def read_input_csv(path: str) -> pd.DataFrame:
+    """Lecture texte du CSV Nowledgeable, aussi utilisée par l'ingestion colonnaire."""
+    return pd.read_csv(
+        path,
+        dtype={COL_STUDENT: "string"},
+        on_bad_lines="skip",
+        engine="python",
+    )
+
+
+def load_csv(path: str, columns: Sequence[str] | None = None) -> pd.DataFrame:
+    out.info("Chargement de %s …", path)
+    df = columnar_store.read_input(path, read_input_csv, columns)
+    out.info("  %d lignes, %d colonnes", len(df), len(df.columns))
+    return df
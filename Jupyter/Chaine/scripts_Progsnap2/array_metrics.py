@@ -0,0 +1,240 @@
+"""EQ et RED de tous les étudiants en un seul passage sur des tableaux NumPy.
+
+``fact_metrics`` applique encore une fonction Python à chaque session. Ici, la
+table des compilations (``data_filter.build_compile_facts``) est triée une fois
+par étudiant, session puis ``Order``, et toutes les étapes sont des opérations
+sur des tableaux entiers :
+
+- bornes de segment et compilations ignorées (``utils.get_segments_indexes``)
+  par comparaison de chaque colonne avec sa version décalée d'une ligne ;
+- paires de compilations consécutives d'un même segment ;
+- type d'erreur commun à une paire, par recherche des couples
+  (compilation, type) de la première compilation parmi ceux de la seconde ;
+- sommes par session avec ``np.bincount``, qui additionne dans l'ordre des
+  paires comme les boucles de ``eq.py`` et ``red.py``.
+
+Les valeurs obtenues sont identiques à celles des scripts protégés, y compris
+la moyenne par étudiant (``np.mean`` des sessions dans l'ordre des
+``SessionID``).
+
+Le prétraitement de WatWin (``watwin.time_perp`` puis les colonnes
+``TimeEst``, ``TimeMean`` et ``TimeStd``) est lui aussi calculé sur des
+tableaux : ``watwin_time_perp`` et ``add_watwin_time_columns``.
+"""
+
+import itertools
+import logging
+
+import numpy as np
+import pandas as pd
+
+out = logging.getLogger()
+
+SEGMENT_COLUMNS = ("SessionID", "ProblemID", "AssignmentID")
+# En deçà, ``np.mean`` additionne dans l'ordre, comme ``np.bincount`` ; au-delà,
+# il procède par blocs et la moyenne de l'étudiant est recalculée avec lui.
+SEQUENTIAL_MEAN_MAX = 7
+# Format lu par ``watwin.time_perp`` (``datetime.strptime``).
+WATWIN_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def _differs(column):
+    """Vrai où la valeur diffère de la précédente (comme ``!=`` : deux NaN diffèrent)."""
+    return column.ne(column.shift()).to_numpy(dtype=bool, na_value=True)
+
+
+def _sorted_compiles(compile_facts):
+    facts = compile_facts[compile_facts["SubjectID"].notna() & compile_facts["SessionID"].notna()]
+    sort_cols = ["SubjectID", "SessionID"] + (["Order"] if "Order" in facts else [])
+    return facts.sort_values(sort_cols, kind="stable").reset_index(drop=True)
+
+
+def _transitions(facts):
+    """Paires de compilations consécutives d'un même segment, dans l'ordre de la table.
+
+    Retourne les lignes des deux compilations de chaque paire, le segment et la
+    session de la paire, ainsi que l'étudiant de chaque session.
+    """
+    session_start = _differs(facts["SubjectID"]) | _differs(facts["SessionID"])
+    segment_start = session_start.copy()
+    for column in SEGMENT_COLUMNS:
+        if column in facts:
+            segment_start |= _differs(facts[column])
+    # Dans un segment, une compilation au code inchangé est ignorée.
+    kept = np.flatnonzero(segment_start | _differs(facts["CodeStateID"]))
+
+    is_pair = ~segment_start[kept]
+    second = kept[is_pair]
+    first = kept[np.flatnonzero(is_pair) - 1]
+    segments = np.cumsum(segment_start)[second]
+    sessions = np.cumsum(session_start)[second] - 1
+    session_subjects = np.cumsum(_differs(facts["SubjectID"]))[session_start] - 1
+    return first, second, segments, sessions, session_subjects
+
+
+def _shared_types(message_types, first, second):
+    """Vrai pour chaque paire dont les deux compilations ont un ``CompileMessageType`` commun."""
+    lengths = np.fromiter(map(len, message_types), dtype=np.int64, count=len(message_types))
+    codes, uniques = _factorize(list(itertools.chain.from_iterable(message_types)))
+    n_codes = max(len(uniques), 1)
+    offsets = np.cumsum(lengths) - lengths
+    known = np.repeat(np.arange(len(lengths), dtype=np.int64), lengths) * n_codes + codes
+
+    # Chaque type de la première compilation est cherché parmi ceux de la seconde.
+    counts = lengths[first]
+    pair_of_type = np.repeat(np.arange(len(first)), counts)
+    positions = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(offsets[first], counts)
+    found = np.isin(second[pair_of_type] * n_codes + codes[positions], known)
+    return np.bincount(pair_of_type[found], minlength=len(first)) > 0
+
+
+def _factorize(values):
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=False)
+    return codes.astype(np.int64), uniques
+
+
+def _subject_means(facts, session_values, session_subjects, valid):
+    """Moyenne des sessions calculables de chaque étudiant, comme ``calculate_metric_map``."""
+    subject_ids = facts.loc[_differs(facts["SubjectID"]), "SubjectID"].to_numpy()
+    subjects = session_subjects[valid]
+    values = session_values[valid]
+    counts = np.bincount(subjects, minlength=len(subject_ids))
+    means = np.bincount(subjects, weights=values, minlength=len(subject_ids)) / np.maximum(counts, 1)
+    bounds = np.r_[0, np.cumsum(counts)]
+    for subject in np.flatnonzero(counts > SEQUENTIAL_MEAN_MAX):
+        means[subject] = np.mean(values[bounds[subject]:bounds[subject + 1]])
+
+    out.info("Dropped %d subjects with no pairs of compile events" % int((counts == 0).sum()))
+    return {subject_ids[k]: means[k] for k in np.flatnonzero(counts)}
+
+
+def eq_metric_map(compile_facts):
+    """Error Quotient de chaque étudiant, d'après la table des compilations."""
+    out.info("Calculating error metric (numpy)...")
+    facts = _sorted_compiles(compile_facts)
+    first, second, _, sessions, session_subjects = _transitions(facts)
+    error_counts = facts["ErrorCount"].to_numpy()
+    shared = _shared_types(facts["CompileMessageTypes"].to_numpy(), first, second)
+
+    both_errors = (error_counts[first] > 0) & (error_counts[second] > 0)
+    deltas = np.where(both_errors, 8 + 3 * shared, 0) / 11
+    n_sessions = len(session_subjects)
+    pairs = np.bincount(sessions, minlength=n_sessions)
+    scores = np.bincount(sessions, weights=deltas, minlength=n_sessions)
+    valid = pairs > 0
+    return _subject_means(facts, scores / np.maximum(pairs, 1), session_subjects, valid)
+
+
+def red_metric_map(compile_facts):
+    """Repeated Error Density de chaque étudiant, d'après la table des compilations."""
+    out.info("Calculating error metric (numpy)...")
+    facts = _sorted_compiles(compile_facts)
+    first, second, segments, sessions, session_subjects = _transitions(facts)
+    shared = _shared_types(facts["CompileMessageTypes"].to_numpy(), first, second)
+
+    # Une série de r paires consécutives à erreur commune, dans un segment, vaut r² / (r + 1).
+    continues_run = np.zeros_like(shared)
+    continues_run[1:] = shared[:-1] & (segments[1:] == segments[:-1])
+    run_starts = np.flatnonzero(shared & ~continues_run)
+    run_lengths = np.bincount(np.cumsum(shared & ~continues_run)[shared] - 1, minlength=len(run_starts))
+    contributions = run_lengths ** 2 / (run_lengths + 1)
+
+    n_sessions = len(session_subjects)
+    divisors = np.bincount(sessions, minlength=n_sessions)
+    red = np.bincount(sessions[run_starts], weights=contributions, minlength=n_sessions)
+    valid = divisors > 0
+    return _subject_means(facts, red / np.maximum(divisors, 1), session_subjects, valid)
+
+
+def _has_errors(compiles, errors):
+    """Vrai pour chaque compilation dont l'``EventID`` est le ``ParentEventID`` d'une erreur du même étudiant."""
+    parents = errors.loc[errors["ParentEventID"].notna(), ["SubjectID", "ParentEventID"]].drop_duplicates()
+    event_ids = compiles["EventID"]
+    if event_ids.dtype != parents["ParentEventID"].dtype:
+        numeric = pd.api.types.is_numeric_dtype
+        common = float if numeric(event_ids) and numeric(parents["ParentEventID"]) else object
+        event_ids = event_ids.astype(common)
+        parents = parents.astype({"ParentEventID": common})
+    keys = pd.DataFrame({"SubjectID": compiles["SubjectID"], "ParentEventID": event_ids})
+    return keys.merge(parents, how="left", indicator=True)["_merge"].eq("both").to_numpy()
+
+
+def _elapsed_seconds(later, earlier):
+    """Écart de ``watwin.time_perp`` : les mois comptent 30 jours et l'année est ignorée."""
+    return ((((later.dt.month.to_numpy() - earlier.dt.month.to_numpy()) * 30
+              + (later.dt.day.to_numpy() - earlier.dt.day.to_numpy())) * 24
+             + (later.dt.hour.to_numpy() - earlier.dt.hour.to_numpy())) * 60
+            + (later.dt.minute.to_numpy() - earlier.dt.minute.to_numpy())) * 60 \
+        + (later.dt.second.to_numpy() - earlier.dt.second.to_numpy())
+
+
+def _group_std(groups, values, n_groups):
+    """``np.std`` des valeurs de chaque groupe (groupes contigus)."""
+    counts = np.bincount(groups, minlength=n_groups)
+    means = np.bincount(groups, weights=values, minlength=n_groups) / np.maximum(counts, 1)
+    squares = (values - means[groups]) ** 2
+    stds = np.sqrt(np.bincount(groups, weights=squares, minlength=n_groups) / np.maximum(counts, 1))
+    bounds = np.r_[0, np.cumsum(counts)]
+    for group in np.flatnonzero(counts > SEQUENTIAL_MEAN_MAX):
+        stds[group] = np.std(values[bounds[group]:bounds[group + 1]])
+    return stds
+
+
+def watwin_time_perp(main_table_df):
+    """Prétraitement WatWin de ``watwin.time_perp``, pour tous les étudiants à la fois.
+
+    Retourne la table ``SubjectID``/``CodeStateID``/``TimeEst`` (le dictionnaire
+    ``time_arr``) et les séries ``TimeMean`` et ``TimeStd`` indexées par
+    étudiant. Un étudiant absent des séries vaut 0, comme dans ``watwin.py``.
+    """
+    out.info("Performing Watwin pre-processing (numpy)...")
+    events = main_table_df[main_table_df["SubjectID"].notna()].sort_values(["SubjectID", "Order"], kind="stable")
+    compiles = events[events["EventType"] == "Compile"].reset_index(drop=True)
+    errors = events[events["EventType"] == "Compile.Error"]
+
+    # Paires de compilations consécutives d'un même étudiant, au code différent,
+    # dont la première est en erreur.
+    new_subject = _differs(compiles["SubjectID"])
+    second = np.flatnonzero(~new_subject & _differs(compiles["CodeStateID"]))
+    first = second - 1
+    first_has_errors = _has_errors(compiles, errors)[first]
+    first, second = first[first_has_errors], second[first_has_errors]
+
+    timestamps = pd.to_datetime(compiles["ServerTimestamp"], format=WATWIN_DATETIME_FORMAT, errors="coerce")
+    later, earlier = timestamps.iloc[second].reset_index(drop=True), timestamps.iloc[first].reset_index(drop=True)
+    if later.isna().any() or earlier.isna().any():
+        raise ValueError("ServerTimestamp illisible au format %s" % WATWIN_DATETIME_FORMAT)
+    time_diffs = _elapsed_seconds(later, earlier).astype(np.int64)
+
+    subject_codes = np.cumsum(new_subject) - 1
+    pair_subjects = subject_codes[first]
+    n_subjects = int(new_subject.sum())
+    counts = np.bincount(pair_subjects, minlength=n_subjects)
+    means = np.bincount(pair_subjects, weights=time_diffs, minlength=n_subjects) / np.maximum(counts, 1)
+
+    # ``time_arr[subj][CodeStateID]`` : la dernière paire d'un même code l'emporte,
+    # à la place de la première dans le dictionnaire (ordre repris par np.std).
+    pairs = pd.DataFrame({
+        "subject": pair_subjects,
+        "SubjectID": compiles["SubjectID"].to_numpy()[first],
+        "CodeStateID": compiles["CodeStateID"].to_numpy()[first],
+        "TimeEst": time_diffs,
+    })
+    time_table = pairs.groupby(["subject", "CodeStateID"], sort=False, dropna=False).last().reset_index()
+    stds = _group_std(time_table["subject"].to_numpy(), time_table["TimeEst"].to_numpy(dtype=float), n_subjects)
+
+    subject_ids = compiles.loc[new_subject, "SubjectID"].to_numpy()
+    with_pairs = counts > 0
+    time_mean = pd.Series(means[with_pairs], index=subject_ids[with_pairs])
+    time_std = pd.Series(stds[with_pairs], index=subject_ids[with_pairs])
+    time_table = time_table.loc[time_table["CodeStateID"].notna(), ["SubjectID", "CodeStateID", "TimeEst"]]
+    return time_table, time_mean, time_std
+
+
+def add_watwin_time_columns(table, time_table, time_mean, time_std):
+    """Ajoute ``TimeEst``, ``TimeMean`` et ``TimeStd`` à ``table`` par jointure."""
+    table = table.merge(time_table, on=["SubjectID", "CodeStateID"], how="left")
+    table["TimeEst"] = table["TimeEst"].fillna(-1).astype(np.int64)
+    table["TimeMean"] = table["SubjectID"].map(time_mean).fillna(0)
+    table["TimeStd"] = table["SubjectID"].map(time_std).fillna(0)
+    return table
@@ -39,6 +39,15 @@ def calculate_compile_ratio(session_table):
     return success / total
 
 
+def compute_metric_map(main_table_df):
+    checker = utils.check_attributes(main_table_df, ["SubjectID", "SessionID", "EventType", "Compile.Result"])
+    if not checker:
+        return None
+    metric_map = utils.calculate_metric_map(main_table_df, calculate_compile_ratio)
+    out.info(metric_map)
+    return metric_map
+
+
 if __name__ == "__main__":
     read_path = "./data"
     write_path = "./out/CompileSuccessRate.csv"
@@ -49,8 +58,6 @@ if __name__ == "__main__":
         write_path = sys.argv[2]
 
     main_table_df = data_filter.load_main_table(read_path)
-    checker = utils.check_attributes(main_table_df, ["SubjectID", "SessionID", "EventType", "Compile.Result"])
-    if checker:
-        metric_map = utils.calculate_metric_map(main_table_df, calculate_compile_ratio)
-        out.info(metric_map)
+    metric_map = compute_metric_map(main_table_df)
+    if metric_map is not None:
         utils.write_metric_map("CompileSuccessRate", metric_map, write_path)
@@ -8,7 +8,6 @@ l'étudiant. Le comportement historique est conservé.
 
 # compile_span_per_student.py
 import sys
-import pandas as pd
 import utils
 import data_filter
 import logging
@@ -21,7 +20,7 @@ def calculate_compile_span_minutes(session_table):
     if len(compiles) == 0:
         return None
 
-    ts = pd.to_datetime(compiles["ServerTimestamp"], errors="coerce").dropna()
+    ts = data_filter.server_timestamps(compiles).dropna()
     if ts.empty:
         return None
 
@@ -29,6 +28,13 @@ def calculate_compile_span_minutes(session_table):
     return float(max(span_min, 0.0))
 
 
+def compute_metric_map(main_table_df):
+    checker = utils.check_attributes(main_table_df, ["SubjectID", "EventType", "ServerTimestamp"])
+    if not checker:
+        return None
+    return utils.calculate_metric_map(main_table_df, calculate_compile_span_minutes)
+
+
 if __name__ == "__main__":
     read_path = "./data"
     write_path = "./out/CompileSpan.csv"
@@ -39,7 +45,6 @@ if __name__ == "__main__":
         write_path = sys.argv[2]
 
     main_table_df = data_filter.load_main_table(read_path)
-    checker = utils.check_attributes(main_table_df, ["SubjectID", "EventType", "ServerTimestamp"])
-    if checker:
-        metric_map = utils.calculate_metric_map(main_table_df, calculate_compile_span_minutes)
-        utils.write_metric_map("CompileSpanMinutes", metric_map, write_path)
\ No newline at end of file
+    metric_map = compute_metric_map(main_table_df)
+    if metric_map is not None:
+        utils.write_metric_map("CompileSpanMinutes", metric_map, write_path)
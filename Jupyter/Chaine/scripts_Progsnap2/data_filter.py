@@ -28,13 +28,23 @@ import utils
 import logging
 import re
 
+# Modules communs aux trois corpus, à la racine du projet (columnar_store…).
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+import columnar_store  # noqa: E402
+import progress  # noqa: E402
+import sessionization  # noqa: E402
+import table_cache  # noqa: E402
+
 GAP_TIME = 20.0  # minutes (1200 secondes)
 MIN_SESSIONS_Z = -2
 MIN_COMPILES = 4
 DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
+# ServerTimestamp interprété une seule fois, ajouté à la table filtrée (et à son cache).
+PARSED_TIMESTAMP = "ServerTimestamp.UTC"
 
-CACHE_VERSION = '2026.08.17.B'
-CACHE_TABLE_NAME = "MainTable_filtered_" + CACHE_VERSION + ".csv"
+CACHE_VERSION = '2026.10.18.A'
+CACHE_TABLE_PREFIX = "MainTable_filtered_"
+COMPILE_FACTS_PREFIX = "CompileFacts_"
 
 out = logging.getLogger()
 
@@ -52,8 +62,66 @@ def get_valid_filename(s):
     return re.sub(r'(?u)[^-\w.]', '', s)
 
 
+def filter_parameters():
+    """Paramètres qui déterminent la table filtrée, inclus dans la clé de cache."""
+    return {"version": CACHE_VERSION, "gap_time": GAP_TIME, "min_compiles": MIN_COMPILES,
+            "min_sessions_z": MIN_SESSIONS_Z}
+
+
+def _cache_stem(data_dir, prefix):
+    source_path = os.path.join(data_dir, "MainTable.csv")
+    if not os.path.exists(source_path):
+        source_path = str(columnar_store.columnar_path(source_path))
+    key = table_cache.variant_key(source_path, filter_parameters())
+    return "cache/" + get_valid_filename(data_dir) + "/" + prefix + CACHE_VERSION + "_" + key
+
+
 def get_cache_table_path(data_dir):
-    return "cache/" + get_valid_filename(data_dir) + "/" + CACHE_TABLE_NAME
+    """Table filtrée en cache pour le contenu actuel de MainTable.csv et les seuils actuels.
+
+    Retourne le fichier existant, ou à défaut le chemin où il serait écrit.
+    """
+    stem = _cache_stem(data_dir, CACHE_TABLE_PREFIX)
+    return table_cache.find_table(stem) or stem + table_cache.preferred_suffix()
+
+
+def get_compile_facts_path(data_dir):
+    return _cache_stem(data_dir, COMPILE_FACTS_PREFIX) + ".pkl"
+
+
+def cache_is_current(read_dir):
+    """Vrai si la table filtrée de MainTable.csv, avec les seuils actuels, est en cache."""
+    try:
+        return os.path.exists(get_cache_table_path(read_dir))
+    except FileNotFoundError:
+        return False
+
+
+def _facts_are_current(read_dir):
+    return cache_is_current(read_dir) and os.path.exists(get_compile_facts_path(read_dir))
+
+
+def parse_timestamps(values):
+    """Horodatages en datetime64 UTC (sans fuseau : considérés UTC) ; illisibles -> NaT."""
+    return pd.to_datetime(values, errors="coerce", utc=True)
+
+
+def add_parsed_timestamps(main_table_df):
+    """Ajoute ``PARSED_TIMESTAMP`` (``ServerTimestamp`` interprété) s'il manque."""
+    if "ServerTimestamp" in main_table_df and PARSED_TIMESTAMP not in main_table_df:
+        main_table_df = main_table_df.assign(**{PARSED_TIMESTAMP: parse_timestamps(main_table_df["ServerTimestamp"])})
+    return main_table_df
+
+
+def server_timestamps(table):
+    """``ServerTimestamp`` de ``table`` interprété, lu dans ``PARSED_TIMESTAMP`` s'il existe.
+
+    Les métriques ne calculent que des écarts et des extrema : les valeurs
+    sont les mêmes qu'avec ``pd.to_datetime`` sur chaque session.
+    """
+    if PARSED_TIMESTAMP in table:
+        return table[PARSED_TIMESTAMP]
+    return parse_timestamps(table["ServerTimestamp"])
 
 
 def assign_session_ids(main_table_df, gap_time=GAP_TIME):
@@ -70,30 +138,19 @@ def assign_session_ids(main_table_df, gap_time=GAP_TIME):
 
     main_table_df.sort_values(['SubjectID', 'Order'], inplace=True)
 
-    subject_id = None
-    session_id = 0
-    session_ids = []
-    timestamps = pd.to_datetime(main_table_df[timestamp_field], errors="raise")
-
-    subject_changes = 0
-    last_timestamp = None
-    for i, timestamp in enumerate(timestamps):
-        current_subject = main_table_df["SubjectID"].iloc[i]
-        if subject_id != current_subject:
-            session_id += 1
-            subject_id = current_subject
-            subject_changes += 1
-        elif last_timestamp is not None:
-            gap_minutes = (timestamp - last_timestamp).total_seconds() / 60.0
-            if gap_minutes > gap_time:
-                session_id += 1
-
-        # L'événement qui suit la pause appartient à la NOUVELLE session.
-        session_ids.append(session_id)
-        last_timestamp = timestamp
-        utils.print_progress_bar(i + 1, len(main_table_df))
-
+    if timestamp_field == "ServerTimestamp" and PARSED_TIMESTAMP in main_table_df:
+        timestamps = main_table_df[PARSED_TIMESTAMP]
+        unreadable = timestamps.isna() & main_table_df[timestamp_field].notna()
+        if unreadable.any():
+            raise ValueError("ServerTimestamp illisible : %r" % main_table_df.loc[unreadable, timestamp_field].iloc[0])
+    else:
+        timestamps = pd.to_datetime(main_table_df[timestamp_field], errors="raise")
+    subjects = [main_table_df["SubjectID"]]
+    # L'événement qui suit la pause appartient à la NOUVELLE session.
+    session_ids = sessionization.session_ids(subjects, timestamps, gap_time)
     main_table_df["SessionID"] = session_ids
+    subject_changes = int(sessionization.subject_starts(subjects).sum())
+    session_id = int(session_ids[-1]) if len(session_ids) else 0
 
     out.info("Subjects: " + str(subject_changes))
     out.info("Assigned %d unique sessionIDs" % session_id)
@@ -102,45 +159,49 @@ def assign_session_ids(main_table_df, gap_time=GAP_TIME):
     return main_table_df
 
 
+def _sessions_per_subject(main_table_df):
+    """Nombre de sessions distinctes de chaque étudiant, en un seul regroupement."""
+    return main_table_df.groupby("SubjectID", sort=False, dropna=False)["SessionID"].nunique()
+
+
 def filter_dataset(main_table_df, gap_time=GAP_TIME, min_compiles=MIN_COMPILES, min_sessions_z=MIN_SESSIONS_Z):
     main_table_df = assign_session_ids(main_table_df, gap_time)
-    n_students = len(set(main_table_df["SubjectID"]))
-    n_sessions = len(set(main_table_df["SessionID"]))
+    n_students = main_table_df["SubjectID"].nunique(dropna=False)
+    n_sessions = main_table_df["SessionID"].nunique(dropna=False)
 
     out.info("Filtering sessions...")
-    compile_sessions = main_table_df[main_table_df["EventType"] == "Compile"]["SessionID"]
-    compiles_count_map = {session_id: np.sum(compile_sessions == session_id)
-                          for session_id in set(main_table_df["SessionID"])}
-    out.debug("Compiles count map: %s" % compiles_count_map)
+    # Une session sans compilation compte 0 : toutes les sessions sont regroupées.
+    is_compile = main_table_df["EventType"] == "Compile"
+    compiles_count_map = is_compile.groupby(main_table_df["SessionID"], sort=False, dropna=False).sum()
+    if progress.enabled(out, logging.DEBUG):
+        out.debug("Compiles count map: %s", compiles_count_map.to_dict())
 
-    if not compiles_count_map:
+    if compiles_count_map.empty:
         out.warning("Aucune session disponible après attribution des SessionID")
         return main_table_df.iloc[0:0].copy()
-    mean_compiles = np.mean(list(compiles_count_map.values()))
-    sd_compiles = np.std(list(compiles_count_map.values()))
-    session_to_keep = [session_id for session_id in compiles_count_map.keys()
-                       # if (compiles_count_map[session_id] - mean_compiles) / sd_compiles >= min_compiles]
-                       if compiles_count_map[session_id] >= min_compiles]
+    mean_compiles = np.mean(compiles_count_map.to_numpy())
+    sd_compiles = np.std(compiles_count_map.to_numpy())
+    session_to_keep = compiles_count_map.index[compiles_count_map.to_numpy() >= min_compiles]
 
     main_table_df = main_table_df[main_table_df["SessionID"].isin(session_to_keep)]
     out.info("Dropping %d sessions with < %.02f compiles (M=%.02f and SD=%.02f), removing %s students" %
             (n_sessions - len(session_to_keep), min_compiles, mean_compiles, sd_compiles,
-             n_students - len(set(main_table_df["SubjectID"]))))
+             n_students - main_table_df["SubjectID"].nunique(dropna=False)))
 
     out.info("Filtering students...")
-    session_count_map = {subject_id: len(set(main_table_df[main_table_df["SubjectID"] == subject_id]["SessionID"]))
-                         for subject_id in set(main_table_df["SubjectID"])}
-    out.debug("Session count map: %s" % session_count_map)
-    if not session_count_map:
+    session_count_map = _sessions_per_subject(main_table_df)
+    if progress.enabled(out, logging.DEBUG):
+        out.debug("Session count map: %s", session_count_map.to_dict())
+    if session_count_map.empty:
         out.warning("Aucun étudiant ne possède de session avec au moins %d compilations", min_compiles)
         return main_table_df.iloc[0:0].copy()
-    mean_sessions = np.mean(list(session_count_map.values()))
-    sd_sessions = np.std(list(session_count_map.values()))
+    mean_sessions = np.mean(session_count_map.to_numpy())
+    sd_sessions = np.std(session_count_map.to_numpy())
     if sd_sessions == 0:
         sd_sessions = 1
 
-    students_to_keep = [subject_id for subject_id in session_count_map.keys()
-                        if (session_count_map[subject_id] - mean_sessions) / sd_sessions >= min_sessions_z]
+    z_scores = (session_count_map.to_numpy() - mean_sessions) / sd_sessions
+    students_to_keep = session_count_map.index[z_scores >= min_sessions_z]
 
     out.info("Dropping %d students with with z-score < %.02f for sessions (M=%.02f and SD=%.02f)" %
             (len(session_count_map) - len(students_to_keep), min_sessions_z, mean_sessions, sd_sessions))
@@ -184,10 +245,7 @@ def get_table_1(main_table_df):
     compile_errors = len(set(main_table_df[main_table_df["EventType"] == "Compile.Error"]["ParentEventID"]))
     perc_w_error = '{:.1%}'.format(compile_errors / compile_events) if compile_events else 'N/A'
 
-    sessions_per_student = np.mean([
-        len(set(main_table_df[main_table_df['SubjectID'] == subject_id]['SessionID']))
-        for subject_id in set(main_table_df['SubjectID'])
-    ])
+    sessions_per_student = np.mean(_sessions_per_subject(main_table_df).to_numpy())
 
     return [system, language, students_num, exercises_num, sets_num, compile_events, perc_w_error,
             sessions_per_student, len(main_table_df)]
@@ -226,18 +284,163 @@ def get_table_2(main_table_df):
     return dataset_name, GAP_TIME, MIN_SESSIONS_Z, students, compilation_event, perc_of_total, sessions
 
 
-def load_main_table(read_dir, filter=True, from_cache=True):
+def read_main_table_csv(path):
+    """Lecture texte de MainTable.csv, aussi utilisée par l'ingestion colonnaire."""
+    return pd.read_csv(path)
+
+
+def build_compile_facts(main_table_df):
+    """Table des compilations : une ligne par événement ``Compile``, erreurs comprises.
+
+    Chaque compilation garde ses colonnes et reçoit les erreurs dont
+    ``ParentEventID`` est son ``EventID`` dans le même étudiant et la même
+    session, comme le filtrage par session d'EQ, RED et WatWin :
+
+    - ``ErrorCount`` : nombre d'erreurs ;
+    - ``CompileMessageTypes`` : liste des ``CompileMessageType`` distincts, dans
+      l'ordre de leur première apparition ;
+    - ``FirstCompileMessageData`` et ``FirstSourceLocation`` : valeurs de la
+      première erreur (par ``Order``), si ces colonnes existent.
+
+    Les compilations sont triées par ``Order`` ; une jointure remplace le
+    parcours des erreurs pour chaque compilation.
+    """
+    keys = [column for column in ("SubjectID", "SessionID") if column in main_table_df]
+    events = main_table_df
+    if "Order" in events:
+        events = events.sort_values("Order", kind="stable")
+    compiles = events[events["EventType"] == "Compile"].reset_index(drop=True)
+    errors = events[(events["EventType"] == "Compile.Error") & events["ParentEventID"].notna()]
+    errors = errors.rename(columns={"ParentEventID": "__parent"})
+    group_keys = keys + ["__parent"]
+
+    grouped = errors.groupby(group_keys, sort=False, dropna=False)
+    error_facts = grouped.size().rename("ErrorCount").to_frame()
+    if "CompileMessageType" in errors:
+        distinct_types = errors.drop_duplicates(group_keys + ["CompileMessageType"])
+        error_facts["CompileMessageTypes"] = distinct_types.groupby(group_keys, sort=False, dropna=False)[
+            "CompileMessageType"].agg(list)
+    first_errors = errors.drop_duplicates(group_keys).set_index(group_keys)
+    for column in ("CompileMessageData", "SourceLocation"):
+        if column in first_errors:
+            error_facts["First" + column] = first_errors[column]
+    error_facts = error_facts.reset_index()
+
+    # Même comparaison que ``ParentEventID == EventID`` : 3 et 3.0 se correspondent.
+    if compiles["EventID"].dtype != error_facts["__parent"].dtype:
+        numeric = pd.api.types.is_numeric_dtype
+        common = float if numeric(compiles["EventID"]) and numeric(error_facts["__parent"]) else object
+        compiles["__parent"] = compiles["EventID"].astype(common)
+        error_facts["__parent"] = error_facts["__parent"].astype(common)
+    else:
+        compiles["__parent"] = compiles["EventID"]
+    facts = compiles.merge(error_facts, on=group_keys, how="left", sort=False).drop(columns="__parent")
+    facts["ErrorCount"] = facts["ErrorCount"].fillna(0).astype("int64")
+    if "CompileMessageTypes" in facts:
+        facts["CompileMessageTypes"] = [types if isinstance(types, list) else [] for types in facts["CompileMessageTypes"]]
+    return facts
+
+
+def load_compile_facts(read_dir, main_table_df=None):
+    """Table des compilations en cache si elle est à jour, sinon reconstruite.
+
+    ``main_table_df`` évite de relire la table filtrée quand l'appelant l'a déjà.
+    """
+    facts_path = get_compile_facts_path(read_dir)
+    if _facts_are_current(read_dir):
+        out.info("Loading compile facts from cached file: %s" % facts_path)
+        return table_cache.read_table(facts_path)
+    if main_table_df is None:
+        main_table_df = load_main_table(read_dir)
+    return build_compile_facts(main_table_df)
+
+
+def load_main_table(read_dir, filter=True, from_cache=True, columns=None, compile_facts=False):
+    """Table filtrée (ou brute si ``filter=False``), réduite à ``columns`` si fourni.
+
+    Sans cache filtré, ``MainTable.csv`` est lu depuis sa copie colonnaire
+    lorsqu'elle est à jour. La projection n'est appliquée qu'après le filtrage,
+    qui a besoin des colonnes de session et d'horodatage.
+
+    La table filtrée contient aussi ``PARSED_TIMESTAMP`` : ``ServerTimestamp``
+    interprété une fois (voir ``server_timestamps``), conservé par la
+    projection dès que ``ServerTimestamp`` est demandé.
+
+    Avec ``compile_facts=True``, retourne aussi la table des compilations
+    (``build_compile_facts``) : ``(table, compilations)``. Elle est relue depuis
+    le cache lorsqu'elle y est à jour, et construite avant la projection.
+    """
+    wanted = None if columns is None else set(columns)
+    if wanted is not None and "ServerTimestamp" in wanted:
+        wanted.add(PARSED_TIMESTAMP)
+    # La table des compilations a besoin de toutes les colonnes.
+    main_table_df = _load_main_table(read_dir, filter, from_cache, None if compile_facts else wanted)
+    facts = None
+    if compile_facts:
+        if filter and from_cache:
+            facts = load_compile_facts(read_dir, main_table_df)
+        else:
+            facts = build_compile_facts(main_table_df)
+    if wanted is not None:
+        main_table_df = main_table_df[[column for column in main_table_df.columns if column in wanted]]
+    return (main_table_df, facts) if compile_facts else main_table_df
+
+
+def _load_main_table(read_dir, filter, from_cache, wanted):
     table_path = get_cache_table_path(read_dir)
-    if filter and from_cache and os.path.exists(table_path):
+    if filter and from_cache and cache_is_current(read_dir):
         out.info("Loading from cached file: %s" % table_path)
-        return pd.read_csv(table_path)
+        return table_cache.read_table(table_path, wanted)
 
-    main_table_df = pd.read_csv(os.path.join(read_dir, "MainTable.csv"))
+    main_table_df = columnar_store.read_input(os.path.join(read_dir, "MainTable.csv"), read_main_table_csv)
     if filter:
-        main_table_df = filter_dataset(main_table_df)
+        # Interprété avant le filtrage, qui s'en sert pour créer les sessions.
+        main_table_df = add_parsed_timestamps(main_table_df)
+        main_table_df = filter_dataset(main_table_df, GAP_TIME, MIN_COMPILES, MIN_SESSIONS_Z)
     return main_table_df
 
 
+def write_cache(read_dir, main_table_df):
+    """Écrit ``main_table_df`` comme table filtrée de ``read_dir`` et retourne son chemin.
+
+    Les variantes les moins récemment utilisées sont ensuite supprimées si le
+    cache dépasse sa taille maximale. ``PARSED_TIMESTAMP`` est ajouté s'il
+    manque : toute table en cache a le même schéma, quel que soit l'appelant.
+    """
+    main_table_df = add_parsed_timestamps(main_table_df)
+    table_path = table_cache.write_table(main_table_df, _cache_stem(read_dir, CACHE_TABLE_PREFIX))
+    out.info("Filtered table cached: %s" % table_path)
+    table_cache.evict(keep=[table_path])
+    return table_path
+
+
+def build_cache(read_dir):
+    """Écrit la table filtrée en cache si elle est absente ou périmée ; retourne son chemin.
+
+    Le pipeline l'appelle une seule fois avant les scripts ProgSnap2, qui relisent
+    ensuite cette table au lieu de refiltrer chacun MainTable.csv. L'écriture
+    passe par un fichier temporaire : un script ne lit jamais une table partielle.
+    La table des compilations (``build_compile_facts``) est écrite à côté.
+    """
+    table_path = get_cache_table_path(read_dir)
+    if _facts_are_current(read_dir):
+        out.info("Filtered table already cached: %s" % table_path)
+        return table_path
+
+    if cache_is_current(read_dir):
+        main_table_df = table_cache.read_table(table_path)
+    else:
+        main_table_df = load_main_table(read_dir, from_cache=False)
+
+    # La table des compilations contient des listes : elle reste en pickle.
+    facts_path = table_cache.write_table(
+        build_compile_facts(main_table_df), _cache_stem(read_dir, COMPILE_FACTS_PREFIX), parquet=False)
+    out.info("Compile facts cached: %s" % facts_path)
+    if not cache_is_current(read_dir):
+        table_path = write_cache(read_dir, main_table_df)
+    return table_path
+
+
 if __name__ == "__main__":
     read_path = "./data"
     write_dir = "./out"
@@ -247,7 +450,7 @@ if __name__ == "__main__":
     if len(sys.argv) > 2:
         write_dir = sys.argv[2]
 
-    main_table = pd.read_csv(os.path.join(read_path, "MainTable.csv"))
+    main_table = columnar_store.read_input(os.path.join(read_path, "MainTable.csv"), read_main_table_csv)
 
     # subjects = list(set(main_table['SubjectID']))[0:60]
     # main_table = main_table[main_table['SubjectID'].isin(subjects)].copy()
@@ -255,6 +458,8 @@ if __name__ == "__main__":
     checker = utils.check_attributes(main_table, ["SubjectID", ["ProblemID", "AssignmentID"], "EventType",
                                                   "CodeStateID", ["ClientTimestamp", "ServerTimestamp"]])
     if checker:
+        # Interprété avant les sessions, comme dans _load_main_table.
+        main_table = add_parsed_timestamps(main_table)
         main_table = assign_session_ids(main_table)
         table_1 = get_table_1(main_table)
         out.info(table_1)
@@ -263,9 +468,7 @@ if __name__ == "__main__":
         table_2 = get_table_1(main_table)
         out.info(table_2)
 
-        table_path = get_cache_table_path(read_path)
-        pathlib.Path(table_path).parent.mkdir(parents=True, exist_ok=True)
-        main_table.to_csv(table_path, index=False)
+        write_cache(read_path, main_table)
 
         pathlib.Path(write_dir).mkdir(parents=True, exist_ok=True)
         with open(os.path.join(write_dir, 'stats.csv'), 'w', newline='') as csvfile:
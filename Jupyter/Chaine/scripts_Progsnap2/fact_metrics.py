@@ -0,0 +1,145 @@
+"""EQ, RED et WatWin calculés sur la table des compilations.
+
+Les fonctions de session de ``eq.py``, ``red.py`` et ``watwin.py`` cherchent
+les erreurs de chaque compilation par un filtrage de toutes les erreurs de la
+session (``ParentEventID == EventID``), soit un coût compilations × erreurs.
+Ici, chaque session est une tranche de la table de
+``data_filter.build_compile_facts`` : les erreurs y sont déjà regroupées sur
+la ligne de leur compilation, et chaque consultation est un accès direct.
+
+Les règles de calcul, l'ordre des paires et l'ordre des additions reprennent
+exactement ceux des scripts protégés, qui restent la référence : les scores
+sont identiques. ``protected_metrics`` choisit entre les deux moteurs.
+"""
+
+import logging
+
+import utils
+
+out = logging.getLogger()
+
+
+def _shared_errors(e1_types, e2_types):
+    return set(e1_types).intersection(set(e2_types))
+
+
+def calculate_eq(compile_facts):
+    compile_pairs = utils.extract_compile_pair_indexes(compile_facts)
+    if len(compile_pairs) == 0:
+        return None
+
+    error_counts = compile_facts["ErrorCount"].to_numpy()
+    message_types = compile_facts["CompileMessageTypes"].to_numpy()
+    score = 0
+    for e1, e2 in compile_pairs:
+        score_delta = 0
+        if error_counts[e1] > 0 and error_counts[e2] > 0:
+            # Erreurs aux deux compilations : +8, et +3 si un type d'erreur est commun.
+            score_delta += 8
+            if len(_shared_errors(message_types[e1], message_types[e2])) > 0:
+                score_delta += 3
+        score += score_delta / 11
+
+    return score / len(compile_pairs)
+
+
+def calculate_red(compile_facts):
+    message_types = compile_facts["CompileMessageTypes"].to_numpy()
+
+    red = 0
+    divisor = 0
+    # Comme red.py : une erreur n'est répétée qu'à l'intérieur d'un segment.
+    for segment in utils.get_segments_indexes(compile_facts):
+        repeated = 0
+        for i in range(1, len(segment)):
+            divisor += 1
+            if len(_shared_errors(message_types[segment[i - 1]], message_types[segment[i]])) > 0:
+                repeated = repeated + 1
+            else:
+                if repeated > 0:
+                    red += (repeated ** 2) / (repeated + 1)
+                repeated = 0
+
+        if repeated > 0:
+            red += (repeated ** 2) / (repeated + 1)
+
+    if divisor == 0:
+        return None
+
+    return red / divisor
+
+
+def add_time_columns(compile_facts, time_arr, mean_dict, std_dict):
+    """Ajoute ``TimeEst``, ``TimeMean`` et ``TimeStd`` (prétraitement WatWin) aux compilations.
+
+    Mêmes valeurs que les colonnes que ``watwin.py`` ajoute à toute la table,
+    calculées ici pour les seules compilations.
+    """
+    compile_facts = compile_facts.copy()
+    subjects = compile_facts["SubjectID"].tolist()
+    code_states = compile_facts["CodeStateID"].tolist()
+    compile_facts["TimeEst"] = [
+        time_arr[subject][code_state]
+        if subject in time_arr and code_state in time_arr[subject] else -1
+        for subject, code_state in zip(subjects, code_states)
+    ]
+    compile_facts["TimeMean"] = [mean_dict[subject] if subject in mean_dict else 0 for subject in subjects]
+    compile_facts["TimeStd"] = [std_dict[subject] if subject in std_dict else 0 for subject in subjects]
+    return compile_facts
+
+
+def _time_score(time_est, time_mean, time_std):
+    # if time < M - 1SD
+    if time_est < (time_mean - time_std):
+        return 1
+    # if time > M + 1SD
+    if time_est > (time_mean + time_std):
+        return 25
+    return 15
+
+
+def calculate_watwin(compile_facts):
+    if len(compile_facts) <= 1:
+        return None
+
+    segment_values = [
+        compile_facts[segment_id].to_numpy()
+        for segment_id in ["SessionID", "ProblemID", "AssignmentID"]
+        if segment_id in compile_facts
+    ]
+    code_states = compile_facts["CodeStateID"].to_numpy()
+    error_counts = compile_facts["ErrorCount"].to_numpy()
+    message_types = compile_facts["CompileMessageTypes"].to_numpy()
+    messages = compile_facts["FirstCompileMessageData"].to_numpy()
+    locations = compile_facts["FirstSourceLocation"].to_numpy()
+    time_est = compile_facts["TimeEst"].to_numpy()
+    time_mean = compile_facts["TimeMean"].to_numpy()
+    time_std = compile_facts["TimeStd"].to_numpy()
+
+    score = 0
+    pair_count = 0
+    for i in range(len(compile_facts) - 1):
+        # Only look at consecutive compiles within a single assignment/problem/session
+        if any(values[i] != values[i + 1] for values in segment_values):
+            continue
+
+        pair_count += 1
+
+        # Watson(2013) requires pair pruning, in which Remove identical pairs
+        if code_states[i] != code_states[i + 1] and error_counts[i] > 0:
+            if error_counts[i + 1] > 0:
+                if messages[i] == messages[i + 1]:
+                    score += 4
+                if len(_shared_errors(message_types[i], message_types[i + 1])) > 0:
+                    score += 4
+                try:
+                    if locations[i].split(':')[1] == locations[i + 1].split(':')[1]:
+                        score += 2
+                except:  # noqa: E722 -- même tolérance que watwin.py
+                    out.info("Improperly formatted source location in: [%s, %s]" % (locations[i], locations[i + 1]))
+            score += _time_score(time_est[i], time_mean[i], time_std[i])
+
+    if pair_count == 0:
+        return None
+
+    return (score / 35.) / (len(compile_facts) - 1.)
@@ -10,10 +10,10 @@ des fractions de ses sessions.
 import sys
 import logging
 
-import pandas as pd
-
 import utils
 import data_filter
+# Module commun à la racine du projet, que data_filter place dans sys.path.
+import sessionization
 
 out = logging.getLogger()
 
@@ -27,7 +27,7 @@ def calculate_frac_long(session_table, gap_minutes=5.0):
     if compiles.empty:
         return None
 
-    compiles["__t"] = pd.to_datetime(compiles["ServerTimestamp"], errors="coerce", utc=True)
+    compiles["__t"] = data_filter.server_timestamps(compiles)
     compiles = compiles.dropna(subset=["__t"])
     if len(compiles) < 2:
         return None
@@ -35,12 +35,22 @@ def calculate_frac_long(session_table, gap_minutes=5.0):
     sort_cols = ["__t", "Order"] if "Order" in compiles.columns else ["__t"]
     compiles = compiles.sort_values(sort_cols)
 
-    gaps = compiles["__t"].diff().dt.total_seconds().dropna()
-    if len(gaps) == 0:
-        return None
+    # Un début de sous-session, hors première compilation, suit une pause longue.
+    long_gaps = sessionization.session_starts([], compiles["__t"], gap_minutes)[1:]
+    return float(long_gaps.sum() / len(long_gaps))
+
 
-    threshold = gap_minutes * 60.0
-    return float((gaps > threshold).sum() / len(gaps))
+def compute_metric_map(main_table_df, gap_minutes=5.0):
+    gap_minutes = float(gap_minutes)
+    checker = utils.check_attributes(main_table_df, ["SubjectID", "SessionID", "EventType", "ServerTimestamp"])
+    if not checker:
+        return None
+    metric_map = utils.calculate_metric_map(
+        main_table_df,
+        lambda session: calculate_frac_long(session, gap_minutes=gap_minutes),
+    )
+    out.info(metric_map)
+    return metric_map
 
 
 if __name__ == "__main__":
@@ -56,11 +66,6 @@ if __name__ == "__main__":
         gap_minutes = float(sys.argv[3])
 
     main_table_df = data_filter.load_main_table(read_path)
-    checker = utils.check_attributes(main_table_df, ["SubjectID", "SessionID", "EventType", "ServerTimestamp"])
-    if checker:
-        metric_map = utils.calculate_metric_map(
-            main_table_df,
-            lambda session: calculate_frac_long(session, gap_minutes=gap_minutes),
-        )
-        out.info(metric_map)
+    metric_map = compute_metric_map(main_table_df, gap_minutes)
+    if metric_map is not None:
         utils.write_metric_map("FracLong", metric_map, write_path)
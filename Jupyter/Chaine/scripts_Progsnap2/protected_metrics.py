@@ -0,0 +1,136 @@
+"""Points d'entrée en mémoire pour les métriques protégées EQ, RED et WatWin.
+
+``eq.py``, ``red.py`` et ``watwin.py`` doivent rester strictement identiques
+aux versions de référence : leur calcul n'est accessible que par leur bloc
+``__main__``. Ce module reproduit ces blocs à l'identique, chargement et
+écriture exceptés, pour que le pipeline puisse les exécuter sur une table
+déjà chargée (``run_metric_jobs(..., mode="in_process")``). Les fonctions de
+calcul elles-mêmes sont importées des modules protégés, jamais recopiées.
+
+``PROGSNAP2_ENGINE=faits`` remplace ces fonctions par celles de
+``fact_metrics``, qui lisent la table des compilations de ``data_filter`` au
+lieu de rechercher les erreurs de chaque compilation ; les scores sont les
+mêmes. ``PROGSNAP2_ENGINE=numpy`` calcule EQ et RED de tous les étudiants à la
+fois (``array_metrics``) ; pour WatWin, il vectorise le prétraitement puis
+calcule les sessions comme ``faits``. Le moteur par défaut, ``historique``,
+reste celui des scripts protégés.
+
+Le pipeline lance aussi ce module à la place des scripts protégés
+(``MetricJob.runner``) : ``python protected_metrics.py eq.py <données> <sortie>``.
+"""
+
+import os
+import sys
+import logging
+
+import utils
+import data_filter
+import eq
+import red
+import watwin
+import fact_metrics
+import array_metrics
+
+out = logging.getLogger()
+
+ENGINES = ("historique", "faits", "numpy")
+
+
+def metric_engine():
+    """Moteur choisi par ``PROGSNAP2_ENGINE`` (``historique`` par défaut)."""
+    engine = os.environ.get("PROGSNAP2_ENGINE", "historique")
+    if engine not in ENGINES:
+        raise ValueError("PROGSNAP2_ENGINE doit valoir l'une des valeurs %s, pas %r" % (ENGINES, engine))
+    return engine
+
+
+def _compile_facts(main_table_df, compile_facts):
+    if compile_facts is None:
+        compile_facts = data_filter.build_compile_facts(main_table_df)
+    return compile_facts
+
+
+def eq_metric_map(main_table_df, compile_facts=None):
+    checker = utils.check_attributes(main_table_df, ["SubjectID", "Order", "EventType", "EventID", "ParentEventID",
+                                                     "CompileMessageType"])
+    if not checker:
+        return None
+    if metric_engine() == "numpy":
+        eq_map = array_metrics.eq_metric_map(_compile_facts(main_table_df, compile_facts))
+    elif metric_engine() == "faits":
+        eq_map = utils.calculate_metric_map(_compile_facts(main_table_df, compile_facts), fact_metrics.calculate_eq)
+    else:
+        eq_map = utils.calculate_metric_map(main_table_df, eq.calculate_eq)
+    out.info(eq_map)
+    return eq_map
+
+
+def red_metric_map(main_table_df, compile_facts=None):
+    checker = utils.check_attributes(main_table_df, ["SubjectID", "Order", "EventType", "EventID", "ParentEventID",
+                                                     "CompileMessageType"])
+    if not checker:
+        return None
+    if metric_engine() == "numpy":
+        red_map = array_metrics.red_metric_map(_compile_facts(main_table_df, compile_facts))
+    elif metric_engine() == "faits":
+        red_map = utils.calculate_metric_map(_compile_facts(main_table_df, compile_facts), fact_metrics.calculate_red)
+    else:
+        red_map = utils.calculate_metric_map(main_table_df, red.calculate_red)
+    out.info(red_map)
+    return red_map
+
+
+def watwin_metric_map(main_table_df, compile_facts=None):
+    checker = utils.check_attributes(main_table_df, ["SubjectID", "Order", "EventType", "EventID", "CodeStateID",
+                                                     "ParentEventID", "CompileMessageData", "CompileMessageType",
+                                                     "SourceLocation", ["ServerTimestamp", "ClientTimestamp"]])
+    if not checker:
+        sys.exit(1)
+
+    if metric_engine() == "numpy":
+        compile_facts = array_metrics.add_watwin_time_columns(
+            _compile_facts(main_table_df, compile_facts), *array_metrics.watwin_time_perp(main_table_df))
+        watwin_map = utils.calculate_metric_map(compile_facts, fact_metrics.calculate_watwin)
+        out.info(watwin_map)
+        return watwin_map
+
+    perp = watwin.time_perp(main_table_df)
+    time_arr = perp[0]
+    mean_dict = perp[1]
+    std_dict = perp[2]
+    if metric_engine() == "faits":
+        compile_facts = fact_metrics.add_time_columns(
+            _compile_facts(main_table_df, compile_facts), time_arr, mean_dict, std_dict)
+        watwin_map = utils.calculate_metric_map(compile_facts, fact_metrics.calculate_watwin)
+        out.info(watwin_map)
+        return watwin_map
+
+    main_table_df["TimeEst"] = [
+        time_arr[main_table_df["SubjectID"].iloc[i]][main_table_df["CodeStateID"].iloc[i]]
+        if main_table_df["SubjectID"].iloc[i] in time_arr.keys() and main_table_df["CodeStateID"].iloc[i] in
+           time_arr[main_table_df["SubjectID"].iloc[i]].keys() else -1 for i in range(len(main_table_df))]
+    main_table_df["TimeMean"] = [mean_dict[i] if i in mean_dict.keys() else 0 for i in main_table_df["SubjectID"]]
+    main_table_df["TimeStd"] = [std_dict[i] if i in std_dict.keys() else 0 for i in main_table_df["SubjectID"]]
+    watwin_map = utils.calculate_metric_map(main_table_df, watwin.calculate_watwin)
+    out.info(watwin_map)
+    return watwin_map
+
+
+PROTECTED_METRICS = {
+    "eq.py": ("ErrorQuotient", eq_metric_map),
+    "red.py": ("RED", red_metric_map),
+    "watwin.py": ("WatWin", watwin_metric_map),
+}
+
+
+if __name__ == "__main__":
+    script, read_path, write_path = sys.argv[1:4]
+    metric_name, metric_map_fn = PROTECTED_METRICS[script]
+
+    if metric_engine() != "historique":
+        main_table_df, compile_facts = data_filter.load_main_table(read_path, compile_facts=True)
+    else:
+        main_table_df, compile_facts = data_filter.load_main_table(read_path), None
+    metric_map = metric_map_fn(main_table_df, compile_facts)
+    if metric_map is not None:
+        utils.write_metric_map(metric_name, metric_map, write_path)
@@ -11,10 +11,10 @@ compilations sont séparées par plus de 5 minutes, puis
 import sys
 import logging
 
-import pandas as pd
-
 import utils
 import data_filter
+# Module commun à la racine du projet, que data_filter place dans sys.path.
+import sessionization
 
 out = logging.getLogger()
 
@@ -28,7 +28,7 @@ def calculate_session_count(session_table, gap_minutes=5.0):
     if compiles.empty:
         return None
 
-    compiles["__t"] = pd.to_datetime(compiles["ServerTimestamp"], errors="coerce", utc=True)
+    compiles["__t"] = data_filter.server_timestamps(compiles)
     compiles = compiles.dropna(subset=["__t"])
     if compiles.empty:
         return None
@@ -36,9 +36,20 @@ def calculate_session_count(session_table, gap_minutes=5.0):
     sort_cols = ["__t", "Order"] if "Order" in compiles.columns else ["__t"]
     compiles = compiles.sort_values(sort_cols)
 
-    gaps = compiles["__t"].diff().dt.total_seconds().dropna()
-    threshold = gap_minutes * 60.0
-    return int(1 + (gaps > threshold).sum())
+    return int(sessionization.session_starts([], compiles["__t"], gap_minutes).sum())
+
+
+def compute_metric_map(main_table_df, gap_minutes=5.0):
+    gap_minutes = float(gap_minutes)
+    checker = utils.check_attributes(main_table_df, ["SubjectID", "SessionID", "EventType", "ServerTimestamp"])
+    if not checker:
+        return None
+    metric_map = utils.calculate_metric_map(
+        main_table_df,
+        lambda session: calculate_session_count(session, gap_minutes=gap_minutes),
+    )
+    out.info(metric_map)
+    return metric_map
 
 
 if __name__ == "__main__":
@@ -54,11 +65,6 @@ if __name__ == "__main__":
         gap_minutes = float(sys.argv[3])
 
     main_table_df = data_filter.load_main_table(read_path)
-    checker = utils.check_attributes(main_table_df, ["SubjectID", "SessionID", "EventType", "ServerTimestamp"])
-    if checker:
-        metric_map = utils.calculate_metric_map(
-            main_table_df,
-            lambda session: calculate_session_count(session, gap_minutes=gap_minutes),
-        )
-        out.info(metric_map)
+    metric_map = compute_metric_map(main_table_df, gap_minutes)
+    if metric_map is not None:
         utils.write_metric_map("SessionCount", metric_map, write_path)
@@ -0,0 +1,277 @@
+"""Métriques de session ProgSnap2 non protégées, calculées ensemble en un passage.
+
+Chacun des scripts ``compile_count.py``, ``compile_span.py``,
+``compil_ratio.py``, ``first_compile_vs_global_first.py``,
+``last_compile_vs_global_last.py``, ``frac_long.py``, ``session_count.py``,
+``mean_test_score.py`` et ``time_to_score1.py`` relit la table filtrée, la
+découpe par session (``utils.calculate_metric_map``) puis réinterprète
+``ServerTimestamp`` session par session. Ce noyau trie la table une seule
+fois, interprète les horodatages une seule fois, et calcule la valeur de
+chaque session de toutes les métriques demandées par des agrégats sur des
+tableaux entiers (``np.bincount``, ``groupby``).
+
+Les règles de chaque script sont reprises à l'identique, ainsi que la moyenne
+par étudiant (``array_metrics._subject_means``) : les CSV sont les mêmes. Une
+seule différence : si une colonne manque, ``first_compile_vs_global_first.py``
+et ``last_compile_vs_global_last.py`` s'arrêtent en erreur, alors que le noyau
+ne produit simplement pas leur CSV, comme pour les autres scripts.
+
+Le pipeline l'exécute pour les jobs dont ``MetricJob.kernel`` vaut
+``session_metrics.py`` ; un seul sous-processus écrit alors tous leurs CSV :
+
+    python session_metrics.py <entrée> -- <script> <sortie.csv> [arguments] [-- <script> <sortie.csv> ...]
+"""
+
+import functools
+import logging
+import sys
+
+import numpy as np
+import pandas as pd
+
+import utils
+import data_filter
+import array_metrics
+# Module commun à la racine du projet, que data_filter place dans sys.path.
+import sessionization
+
+out = logging.getLogger()
+
+JOB_SEPARATOR = "--"
+MAX_MINUTES_IF_NEVER = 60.0
+SCORE_EPS = 1e-9
+
+
+class _SessionTable:
+    """Table filtrée triée par étudiant, session puis ``Order`` (``utils._session_bounds``).
+
+    Les colonnes dérivées (horodatages, masque des compilations…) sont
+    calculées à la première demande, puis partagées par toutes les métriques.
+    """
+
+    def __init__(self, main_table_df):
+        self.main_table = main_table_df
+        positions = main_table_df.assign(__position=np.arange(len(main_table_df)))
+        table, bounds, first_sessions = utils._session_bounds(positions)
+        self.positions = table["__position"].to_numpy()
+        self.table = table.drop(columns="__position").reset_index(drop=True)
+        self.n_sessions = len(bounds) - 1
+        self.sessions = np.repeat(np.arange(self.n_sessions), np.diff(bounds))
+        self.session_subjects = np.repeat(np.arange(len(first_sessions) - 1), np.diff(first_sessions))
+        self._compile_starts = {}
+
+    @functools.cached_property
+    def main_timestamps(self):
+        return data_filter.server_timestamps(self.main_table).reset_index(drop=True)
+
+    @functools.cached_property
+    def timestamps(self):
+        return self.main_timestamps.iloc[self.positions].reset_index(drop=True)
+
+    @functools.cached_property
+    def is_compile(self):
+        return (self.table["EventType"] == "Compile").to_numpy(dtype=bool)
+
+    @functools.cached_property
+    def dated_compiles(self):
+        return self.is_compile & self.timestamps.notna().to_numpy()
+
+    def per_session(self, values, mask, how):
+        """Agrégat ``how`` des ``values[mask]`` de chaque session (manquant si aucune ligne)."""
+        selected = values[mask]
+        return selected.groupby(self.sessions[mask]).agg(how).reindex(range(self.n_sessions))
+
+    def counts(self, mask):
+        return np.bincount(self.sessions[mask], minlength=self.n_sessions)
+
+    def global_compile_time(self, how):
+        """Première ou dernière compilation datée de toute la table, ou ``None``."""
+        is_compile = (self.main_table["EventType"] == "Compile").to_numpy(dtype=bool)
+        compile_times = self.main_timestamps[is_compile].dropna()
+        if compile_times.empty:
+            out.warning("Aucun événement 'Compile' avec timestamp valide dans le fichier.")
+            return None
+        return compile_times.agg(how)
+
+    def compile_session_starts(self, gap_minutes):
+        """Sessions et débuts de sous-session des compilations datées.
+
+        Les compilations sont triées par session, horodatage puis ``Order``,
+        comme dans ``frac_long.py`` et ``session_count.py``.
+        """
+        if gap_minutes in self._compile_starts:
+            return self._compile_starts[gap_minutes]
+        mask = self.dated_compiles
+        compiles = pd.DataFrame({"session": self.sessions[mask], "time": self.timestamps[mask].to_numpy()})
+        sort_cols = ["session", "time"]
+        if "Order" in self.table:
+            compiles["Order"] = self.table["Order"].to_numpy()[mask]
+            sort_cols.append("Order")
+        compiles = compiles.sort_values(sort_cols, kind="stable")
+        starts = sessionization.session_starts([compiles["session"]], compiles["time"], gap_minutes)
+        self._compile_starts[gap_minutes] = (compiles["session"].to_numpy(), starts)
+        return self._compile_starts[gap_minutes]
+
+
+def _minutes(delta):
+    return (delta.dt.total_seconds() / 60.0).to_numpy(dtype=float, na_value=np.nan)
+
+
+def _compile_count(sessions):
+    return sessions.counts(sessions.is_compile).astype(float)
+
+
+def _compile_span(sessions):
+    mask = sessions.dated_compiles
+    span = _minutes(sessions.per_session(sessions.timestamps, mask, "max")
+                    - sessions.per_session(sessions.timestamps, mask, "min"))
+    return np.maximum(span, 0.0)
+
+
+def _compile_ratio(sessions):
+    results = sessions.table["Compile.Result"]
+    with_result = sessions.is_compile & results.notna().to_numpy()
+    text = results.astype(str)
+    success = sessions.counts(with_result & (text == "Success").to_numpy())
+    error = sessions.counts(with_result & (text == "Error").to_numpy())
+    total = success + error
+    return np.where(total > 0, success / np.maximum(total, 1), np.nan)
+
+
+def _from_global_first(sessions):
+    global_first = sessions.global_compile_time("min")
+    if global_first is None:
+        return None
+    first = sessions.per_session(sessions.timestamps, sessions.dated_compiles, "min")
+    return np.maximum(_minutes(first - global_first), 0.0)
+
+
+def _to_global_last(sessions):
+    global_last = sessions.global_compile_time("max")
+    if global_last is None:
+        return None
+    last = sessions.per_session(sessions.timestamps, sessions.dated_compiles, "max")
+    return np.maximum(_minutes(global_last - last), 0.0)
+
+
+def _frac_long(sessions, gap_minutes=5.0):
+    compile_sessions, starts = sessions.compile_session_starts(float(gap_minutes))
+    counts = np.bincount(compile_sessions, minlength=sessions.n_sessions)
+    # Chaque session a un début de sous-session qui ne suit pas une pause.
+    long_gaps = np.bincount(compile_sessions, weights=starts, minlength=sessions.n_sessions) - 1
+    return np.where(counts >= 2, long_gaps / np.maximum(counts - 1, 1), np.nan)
+
+
+def _session_count(sessions, gap_minutes=5.0):
+    compile_sessions, starts = sessions.compile_session_starts(float(gap_minutes))
+    counts = np.bincount(compile_sessions, minlength=sessions.n_sessions)
+    sub_sessions = np.bincount(compile_sessions, weights=starts, minlength=sessions.n_sessions)
+    return np.where(counts > 0, sub_sessions, np.nan)
+
+
+def _mean_test_score(sessions):
+    table = sessions.table
+    is_run = table["EventType"].astype(str).str.startswith("Run", na=False).to_numpy(dtype=bool)
+    # Sans événement Run dans la session, les lignes ayant un Score.
+    has_run = sessions.counts(is_run) > 0
+    tests = np.where(has_run[sessions.sessions], is_run, table["Score"].notna().to_numpy())
+    scores = pd.to_numeric(table["Score"], errors="coerce").to_numpy(dtype=float, na_value=np.nan)
+    mask = tests & ~np.isnan(scores)
+
+    values = scores[mask]
+    counts = sessions.counts(mask)
+    means = np.bincount(sessions.sessions[mask], weights=values, minlength=sessions.n_sessions) / np.maximum(counts, 1)
+    bounds = np.r_[0, np.cumsum(counts)]
+    for session in np.flatnonzero(counts > array_metrics.SEQUENTIAL_MEAN_MAX):
+        means[session] = pd.Series(values[bounds[session]:bounds[session + 1]]).mean()
+    return np.where(counts > 0, means, np.nan)
+
+
+def _minutes_to_score1(sessions):
+    table = sessions.table
+    timestamps = sessions.timestamps
+    # Départ : première compilation datée, sinon premier événement daté.
+    start = sessions.per_session(timestamps, sessions.dated_compiles, "min")
+    start = start.fillna(sessions.per_session(timestamps, timestamps.notna().to_numpy(), "min"))
+
+    runs = (table["EventType"] == "Run.Program") & table["Score"].notna() & timestamps.notna()
+    reached = (runs & (table["Score"] >= (1.0 - SCORE_EPS))).to_numpy(dtype=bool)
+    first_success = sessions.per_session(timestamps, reached, "min")
+
+    minutes = np.maximum(_minutes(first_success - start), 0.0)
+    minutes = np.where(first_success.isna().to_numpy(), MAX_MINUTES_IF_NEVER, minutes)
+    return np.where(start.isna().to_numpy(), np.nan, minutes)
+
+
+# Script remplacé -> (nom de la métrique, attributs requis par le script, valeurs de session).
+KERNEL_METRICS = {
+    "compile_count.py": ("CompileCount", ["SubjectID", "SessionID", "EventType"], _compile_count),
+    "compile_span.py": ("CompileSpanMinutes", ["SubjectID", "EventType", "ServerTimestamp"], _compile_span),
+    "compil_ratio.py": ("CompileSuccessRate", ["SubjectID", "SessionID", "EventType", "Compile.Result"],
+                        _compile_ratio),
+    "first_compile_vs_global_first.py": ("MinutesFromGlobalFirstCompile",
+                                         ["SubjectID", "EventType", "ServerTimestamp"], _from_global_first),
+    "last_compile_vs_global_last.py": ("MinutesToGlobalLastCompile",
+                                       ["SubjectID", "EventType", "ServerTimestamp"], _to_global_last),
+    "frac_long.py": ("FracLong", ["SubjectID", "SessionID", "EventType", "ServerTimestamp"], _frac_long),
+    "session_count.py": ("SessionCount", ["SubjectID", "SessionID", "EventType", "ServerTimestamp"],
+                         _session_count),
+    "mean_test_score.py": ("MeanTestScore", ["SubjectID", "SessionID", "EventType", "Score"], _mean_test_score),
+    "time_to_score1.py": ("MinutesToScore1", ["SubjectID", "EventType", "ServerTimestamp", "Score"],
+                          _minutes_to_score1),
+}
+
+
+def compute_metric_maps(main_table_df, jobs):
+    """Dictionnaire ``SubjectID -> valeur`` de chaque job ``(script, arguments)``.
+
+    La valeur associée à un script est ``None`` lorsqu'il n'aurait produit
+    aucun CSV (colonne manquante, aucune compilation datée…).
+    """
+    sessions = None
+    metric_maps = {}
+    for script, extra_args in jobs:
+        metric, attributes, session_values = KERNEL_METRICS[script]
+        if not utils.check_attributes(main_table_df, attributes):
+            metric_maps[script] = None
+            continue
+        if sessions is None:
+            sessions = _SessionTable(main_table_df)
+
+        out.info("Calculating %s..." % metric)
+        values = session_values(sessions, *extra_args)
+        if values is None:
+            metric_maps[script] = None
+            continue
+        metric_maps[script] = array_metrics._subject_means(
+            sessions.table, values, sessions.session_subjects, ~np.isnan(values))
+    return metric_maps
+
+
+def parse_jobs(arguments):
+    """Découpe ``-- <script> <sortie.csv> [arguments]`` répété en triplets (script, sortie, arguments)."""
+    jobs = []
+    current = None
+    for argument in arguments:
+        if argument == JOB_SEPARATOR:
+            current = []
+            jobs.append(current)
+        elif current is None:
+            raise ValueError("Les jobs doivent être précédés de %r : %s" % (JOB_SEPARATOR, arguments))
+        else:
+            current.append(argument)
+    for job in jobs:
+        if len(job) < 2 or job[0] not in KERNEL_METRICS:
+            raise ValueError("Job invalide (attendu : <script> <sortie.csv> [arguments]) : %s" % job)
+    return [(job[0], job[1], job[2:]) for job in jobs]
+
+
+if __name__ == "__main__":
+    read_path = sys.argv[1]
+    kernel_jobs = parse_jobs(sys.argv[2:])
+
+    main_table_df = data_filter.load_main_table(read_path)
+    metric_maps = compute_metric_maps(main_table_df, [(script, extra_args) for script, _, extra_args in kernel_jobs])
+    for script, write_path, _ in kernel_jobs:
+        if metric_maps[script] is not None:
+            utils.write_metric_map(KERNEL_METRICS[script][0], metric_maps[script], write_path)
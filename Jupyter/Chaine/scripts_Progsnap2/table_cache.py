@@ -0,0 +1,183 @@
+"""Cache des tables dérivées de ``MainTable.csv`` (table filtrée, table des compilations).
+
+Une variante en cache est identifiée par une clé calculée sur l'empreinte
+SHA-256 du contenu de l'entrée et sur les paramètres qui l'ont produite
+(version du cache, seuils de filtrage…). Remplacer ``MainTable.csv`` ou
+changer un seuil donne donc une autre clé : une table périmée n'est jamais
+relue, et plusieurs variantes peuvent coexister.
+
+Les tables sont écrites dans un format binaire typé : Parquet si ``pyarrow``
+est disponible (avec lecture des seules colonnes demandées), sinon pickle.
+Chaque lecture rafraîchit la date de modification du fichier ; au-delà de
+``max_bytes()`` au total, les variantes les moins récemment utilisées sont
+supprimées.
+
+L'empreinte d'une entrée est mémorisée dans ``cache/fingerprints.json`` avec
+sa taille et sa date de modification : le fichier n'est relu en entier que
+s'il a changé.
+
+Ce module est importé par ``data_filter``, après l'ajout de la racine du
+projet au chemin d'import (``columnar_store``).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import pathlib
+
+import pandas as pd
+
+import columnar_store
+
+out = logging.getLogger()
+
+CACHE_ROOT = "cache"
+FINGERPRINTS_NAME = "fingerprints.json"
+TABLE_SUFFIXES = (".parquet", ".pkl")
+# Préfixes des fichiers de table ; le reste du nom (sans extension) identifie la variante.
+TABLE_PREFIXES = ("MainTable_filtered_", "CompileFacts_")
+DEFAULT_MAX_MB = 2048
+KEY_LENGTH = 16
+
+_fingerprints = {}
+
+
+def max_bytes():
+    """Taille totale maximale du cache (``PROGSNAP2_CACHE_MAX_MB``, 2048 Mo par défaut)."""
+    return int(float(os.environ.get("PROGSNAP2_CACHE_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024)
+
+
+def _stat_key(path):
+    stat = os.stat(path)
+    return [os.path.abspath(path), stat.st_size, stat.st_mtime_ns]
+
+
+def file_fingerprint(path):
+    """SHA-256 du contenu de ``path``, relu seulement si sa taille ou sa date ont changé."""
+    stat_key = _stat_key(path)
+    memo_key = tuple(stat_key)
+    if memo_key in _fingerprints:
+        return _fingerprints[memo_key]
+
+    memo_path = os.path.join(CACHE_ROOT, FINGERPRINTS_NAME)
+    try:
+        with open(memo_path, encoding="utf-8") as file:
+            memo = json.load(file)
+    except (OSError, ValueError):
+        memo = {}
+    entry = memo.get(stat_key[0])
+    if entry is not None and entry.get("stat") == stat_key:
+        digest = entry["sha256"]
+    else:
+        sha = hashlib.sha256()
+        with open(path, "rb") as file:
+            for block in iter(lambda: file.read(1 << 20), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+        memo[stat_key[0]] = {"stat": stat_key, "sha256": digest}
+        try:
+            pathlib.Path(CACHE_ROOT).mkdir(parents=True, exist_ok=True)
+            tmp_path = "%s.%d.tmp" % (memo_path, os.getpid())
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(memo, file, indent=2)
+            os.replace(tmp_path, memo_path)
+        except OSError as exc:
+            out.warning("Empreinte non mémorisée (%s) : %s" % (memo_path, exc))
+    _fingerprints[memo_key] = digest
+    return digest
+
+
+def variant_key(input_path, parameters):
+    """Clé d'une variante : empreinte de l'entrée et paramètres de calcul."""
+    parts = {"input": file_fingerprint(input_path), "parameters": parameters}
+    encoded = json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:KEY_LENGTH]
+
+
+def find_table(stem):
+    """Fichier existant de la table ``stem`` (chemin sans extension), ou ``None``."""
+    for suffix in TABLE_SUFFIXES:
+        if os.path.exists(stem + suffix):
+            return stem + suffix
+    return None
+
+
+def preferred_suffix():
+    return ".parquet" if columnar_store.has_engine() else ".pkl"
+
+
+def write_table(df, stem, parquet=True):
+    """Écrit ``df`` sous ``stem`` (Parquet si possible, sinon pickle) ; retourne son chemin.
+
+    Une table que Parquet ne sait pas représenter (colonne de types mélangés…)
+    est écrite en pickle. L'écriture passe par un fichier temporaire.
+    """
+    pathlib.Path(stem).parent.mkdir(parents=True, exist_ok=True)
+    if parquet and columnar_store.has_engine():
+        path = stem + ".parquet"
+        tmp_path = "%s.%d.tmp" % (path, os.getpid())
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            return path
+        except (ValueError, TypeError, NotImplementedError) as exc:
+            out.info("Table written as pickle, not Parquet (%s)" % exc)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    path = stem + ".pkl"
+    tmp_path = "%s.%d.tmp" % (path, os.getpid())
+    df.to_pickle(tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_table(path, columns=None):
+    """Relit une table en cache, réduite aux ``columns`` présentes si fourni."""
+    os.utime(path)
+    if path.endswith(".parquet"):
+        if columns is None:
+            return pd.read_parquet(path)
+        import pyarrow.parquet as pq
+
+        wanted = set(columns)
+        return pd.read_parquet(path, columns=[column for column in pq.read_schema(path).names if column in wanted])
+
+    df = pd.read_pickle(path)
+    if columns is not None:
+        wanted = set(columns)
+        df = df[[column for column in df.columns if column in wanted]]
+    return df
+
+
+def _variant(path):
+    name = path.name
+    prefix = next(prefix for prefix in TABLE_PREFIXES if name.startswith(prefix))
+    return str(path.parent / name[len(prefix):].rsplit(".", 1)[0])
+
+
+def evict(keep=(), limit=None):
+    """Supprime les variantes les moins récemment utilisées au-delà de ``limit`` octets.
+
+    ``keep`` : chemins de tables dont la variante ne doit pas être supprimée.
+    """
+    limit = max_bytes() if limit is None else limit
+    variants = {}
+    for path in pathlib.Path(CACHE_ROOT).glob("*/*"):
+        if path.is_file() and path.name.startswith(TABLE_PREFIXES) and not path.name.endswith(".tmp"):
+            stat = path.stat()
+            files, size, used = variants.get(_variant(path), ([], 0, 0))
+            variants[_variant(path)] = (files + [path], size + stat.st_size, max(used, stat.st_mtime_ns))
+
+    total = sum(size for _, size, _ in variants.values())
+    protected = {_variant(pathlib.Path(path)) for path in keep}
+    for variant, (files, size, _) in sorted(variants.items(), key=lambda item: item[1][2]):
+        if total <= limit:
+            break
+        if variant in protected:
+            continue
+        for path in files:
+            path.unlink(missing_ok=True)
+        total -= size
+        out.info("Evicted cached variant %s (%d bytes)" % (variant, size))
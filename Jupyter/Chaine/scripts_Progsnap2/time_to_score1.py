@@ -22,12 +22,12 @@ SCORE_EPS = 1e-9
 def calculate_minutes_to_score1(session_table, max_minutes_if_never=MAX_MINUTES_IF_NEVER):
     # Départ: 1re compile si possible, sinon 1er event daté
     compiles = session_table[session_table["EventType"] == "Compile"]
-    comp_ts = pd.to_datetime(compiles["ServerTimestamp"], errors="coerce").dropna() if len(compiles) else pd.Series([], dtype="datetime64[ns]")
+    comp_ts = data_filter.server_timestamps(compiles).dropna() if len(compiles) else pd.Series([], dtype="datetime64[ns]")
 
     if not comp_ts.empty:
         start_ts = comp_ts.min()
     else:
-        all_ts = pd.to_datetime(session_table["ServerTimestamp"], errors="coerce").dropna()
+        all_ts = data_filter.server_timestamps(session_table).dropna()
         if all_ts.empty:
             return None
         start_ts = all_ts.min()
@@ -40,7 +40,7 @@ def calculate_minutes_to_score1(session_table, max_minutes_if_never=MAX_MINUTES_
     if len(runs) == 0:
         return float(max_minutes_if_never)
 
-    runs["__ts"] = pd.to_datetime(runs["ServerTimestamp"], errors="coerce")
+    runs["__ts"] = data_filter.server_timestamps(runs)
     runs = runs.dropna(subset=["__ts"])
     if runs.empty:
         return float(max_minutes_if_never)
@@ -54,6 +54,16 @@ def calculate_minutes_to_score1(session_table, max_minutes_if_never=MAX_MINUTES_
     return float(max(delta_min, 0.0))
 
 
+def compute_metric_map(main_table_df):
+    checker = utils.check_attributes(main_table_df, ["SubjectID", "EventType", "ServerTimestamp", "Score"])
+    if not checker:
+        return None
+    return utils.calculate_metric_map(
+        main_table_df,
+        lambda session: calculate_minutes_to_score1(session, MAX_MINUTES_IF_NEVER),
+    )
+
+
 if __name__ == "__main__":
     read_path = "./data"
     write_path = "./out/TimeToScore1.csv"
@@ -64,10 +74,6 @@ if __name__ == "__main__":
         write_path = sys.argv[2]
 
     main_table_df = data_filter.load_main_table(read_path)
-    checker = utils.check_attributes(main_table_df, ["SubjectID", "EventType", "ServerTimestamp", "Score"])
-    if checker:
-        metric_map = utils.calculate_metric_map(
-            main_table_df,
-            lambda session: calculate_minutes_to_score1(session, MAX_MINUTES_IF_NEVER),
-        )
-        utils.write_metric_map("MinutesToScore1", metric_map, write_path)
\ No newline at end of file
+    metric_map = compute_metric_map(main_table_df)
+    if metric_map is not None:
+        utils.write_metric_map("MinutesToScore1", metric_map, write_path)
@@ -13,6 +13,11 @@ import logging
 import sys
 import os
 
+# Modules communs aux trois corpus, à la racine du projet.
+sys.path.append(str(pathlib.Path(__file__).resolve().parent.parent))
+import partition  # noqa: E402
+import progress  # noqa: E402
+
 out = logging.getLogger()
 VERSION = 'v2019.08.30'
 
@@ -39,6 +44,9 @@ setup_logging("out")
 
 
 # Print iterations progress
+_progress_throttle = progress.Throttle()
+
+
 def print_progress_bar(iteration, total, prefix ='', suffix ='', decimals = 1, length = 100, fill ='█'):
     """
     Call in a loop to create terminal progress bar
@@ -50,7 +58,12 @@ def print_progress_bar(iteration, total, prefix ='', suffix ='', decimals = 1, l
         decimals    - Optional  : positive number of decimals in percent complete (Int)
         length      - Optional  : character length of bar (Int)
         fill        - Optional  : bar fill character (Str)
+
+    Au plus ``progress.max_hz()`` affichages par seconde (l'avancement complet
+    est toujours affiché) ; aucun en mode silencieux (``METRICS_QUIET=1``).
     """
+    if not _progress_throttle.ready(final=iteration == total):
+        return
     percent = ("{0:." + str(decimals) + "f}").format(100 * (iteration / float(total)))
     filled_length = int(length * iteration // total)
     bar = fill * filled_length + '-' * (length - filled_length)
@@ -84,20 +97,59 @@ def write_metric_map(name, metric_map, path):
             writer.writerow({"SubjectID": subject_id, name: value})
 
 
-def calculate_metric_map(main_table, metric_fn):
+def _session_bounds(main_table):
+    """Trie la table une fois par étudiant, session puis ``Order``.
+
+    Retourne la table triée, les bornes de ses sessions (``bounds[j]:bounds[j + 1]``
+    pour la session ``j``) et l'indice de la première session de chaque
+    étudiant, suivi du nombre total de sessions.
+    """
+    table = main_table[main_table["SubjectID"].notna() & main_table["SessionID"].notna()]
+    sort_cols = ["SubjectID", "SessionID"] + (["Order"] if "Order" in table else [])
+    table = table.sort_values(sort_cols, kind="stable")
+
+    subjects = table["SubjectID"]
+    new_subject = subjects.ne(subjects.shift()).to_numpy(dtype=bool)
+    new_session = new_subject | table["SessionID"].ne(table["SessionID"].shift()).to_numpy(dtype=bool)
+    session_starts = np.flatnonzero(new_session)
+    bounds = np.append(session_starts, len(table))
+    first_sessions = np.append(np.flatnonzero(new_subject[session_starts]), len(session_starts))
+    return table, bounds, first_sessions
+
+
+def calculate_metric_map(main_table, metric_fn, max_workers=None):
+    """Moyenne par étudiant de ``metric_fn`` appliquée à chacune de ses sessions.
+
+    La table est triée et découpée une seule fois : ``metric_fn`` reçoit des
+    tranches contiguës, triées par ``Order``, au lieu d'un filtrage de toute la
+    table par étudiant puis par session. Avec ``max_workers > 1`` (par défaut
+    ``partition.workers()``, soit ``METRICS_WORKERS``), les étudiants sont
+    répartis par blocs entre des processus ``fork`` (``partition.map_items``) ;
+    sans ``fork`` (Windows, macOS), le calcul reste séquentiel.
+    """
     out.info("Calculating error metric...")
-    subject_ids = set(main_table["SubjectID"])
-    metric_map = {}
-    dropped = 0
-    for i, subject_id in enumerate(subject_ids):
-        print_progress_bar(i + 1, len(subject_ids))
-        subject_events = main_table[main_table["SubjectID"] == subject_id]
+    table, bounds, first_sessions = _session_bounds(main_table)
+    n_subjects = len(first_sessions) - 1
+    subject_column = table.columns.get_loc("SubjectID")
+
+    def subject_metrics(k):
+        """Identifiant et métriques de session de l'étudiant ``k`` (dans l'ordre de tri)."""
         metrics = []
-        for session_id in set(subject_events["SessionID"]):
-            metric = metric_fn(subject_events[subject_events["SessionID"] == session_id])
+        for j in range(first_sessions[k], first_sessions[k + 1]):
+            metric = metric_fn(table.iloc[bounds[j]:bounds[j + 1]])
             if metric is not None:
                 metrics.append(metric)
-        out.debug("Metrics %d: %s" % (i, metrics))
+        return table.iat[bounds[first_sessions[k]], subject_column], metrics
+
+    results = partition.map_items(
+        subject_metrics, range(n_subjects), max_workers,
+        on_chunk=lambda done: print_progress_bar(done, n_subjects))
+
+    metric_map = {}
+    # Un identifiant d'étudiant manquant ne correspond à aucune session.
+    dropped = int(main_table["SubjectID"].isna().any())
+    for i, (subject_id, metrics) in enumerate(results):
+        progress.detail(out, "Metrics %d: %s", i, metrics, level=logging.DEBUG)
         if len(metrics) == 0:
             dropped += 1
             continue
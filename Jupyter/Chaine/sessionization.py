@@ -0,0 +1,83 @@
+"""Découpage en sessions par inactivité, commun aux trois corpus.
+
+Une session regroupe des évènements consécutifs d'un même sujet. Une nouvelle
+session commence au premier évènement du sujet, ou lorsque l'écart avec
+l'évènement précédent est strictement supérieur à ``gap_minutes``. Un écart
+incalculable (horodatage manquant) ne démarre pas de session.
+
+Les lignes doivent déjà être triées par sujet, puis dans l'ordre voulu par
+l'appelant (horodatage, ``Order``…) : le calcul se réduit alors à une
+différence et à une somme cumulée sur des tableaux, sans boucle par sujet.
+Le « sujet » peut être formé de plusieurs colonnes (étudiant et session
+ProgSnap2, par exemple).
+
+Ce module est importé depuis les dossiers de scripts ; il ne dépend donc que
+de pandas et numpy.
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+
+def subject_starts(keys: Sequence[pd.Series | np.ndarray]) -> np.ndarray:
+    """Vrai sur la première ligne de chaque sujet (lignes triées par sujet).
+
+    Comme dans les anciennes boucles, deux identifiants manquants successifs
+    sont considérés comme deux sujets différents.
+    """
+
+    n = len(keys[0]) if keys else 0
+    starts = np.zeros(n, dtype=bool)
+    if n:
+        starts[0] = True
+    for key in keys:
+        values = pd.Series(key).reset_index(drop=True)
+        starts |= values.ne(values.shift()).to_numpy(dtype=bool, na_value=True)
+    return starts
+
+
+def session_starts(
+    keys: Sequence[pd.Series | np.ndarray],
+    timestamps: pd.Series | np.ndarray,
+    gap_minutes: float,
+) -> np.ndarray:
+    """Vrai sur la première ligne de chaque session.
+
+    ``keys`` peut être vide : toutes les lignes appartiennent alors au même
+    sujet.
+    """
+
+    times = pd.Series(timestamps).reset_index(drop=True)
+    gaps = times.diff().dt.total_seconds().to_numpy(dtype=float, na_value=np.nan) / 60.0
+    starts = gaps > float(gap_minutes)
+    if len(starts):
+        starts[0] = True
+    if keys:
+        starts |= subject_starts(keys)
+    return starts
+
+
+def session_ids(
+    keys: Sequence[pd.Series | np.ndarray],
+    timestamps: pd.Series | np.ndarray,
+    gap_minutes: float,
+    *,
+    local: bool = False,
+) -> np.ndarray:
+    """Identifiant de session de chaque ligne, à partir de 1.
+
+    Par défaut, les identifiants sont numérotés sur toute la table (ProgSnap2) ;
+    avec ``local=True``, la numérotation recommence à 1 pour chaque sujet
+    (sessions d'activité Mirabelle).
+    """
+
+    ids = np.cumsum(session_starts(keys, timestamps, gap_minutes), dtype=np.int64)
+    if local and len(ids):
+        first_rows = subject_starts(keys) if keys else np.eye(1, len(ids), dtype=bool)[0]
+        subject_first = np.maximum.accumulate(np.where(first_rows, np.arange(len(ids)), 0))
+        ids = ids - ids[subject_first] + 1
+    return ids
@@ -0,0 +1,489 @@
+"""Générateur de corpus synthétiques pour mesurer la montée en charge.
+
+Les trois corpus réels sont petits (quelques dizaines d'étudiants). Ce module
+produit des entrées de même format, à la taille voulue (de quelques milliers à
+un million d'étudiants, jusqu'à une centaine de millions d'évènements), pour
+``benchmark.py`` :
+
+- Mirabelle : ``_id.$oid``, ``actor``, ``verb``, ``timestamp.$date``,
+  ``tests`` (liste Python de cas de test), ``P_codeState``,
+  ``filename_infere``, ``session.id`` ;
+- Nowledgeable : les colonnes de ``session_13568_answers_corrige.csv``, dont
+  ``answerContent`` (code C++), ``recordedFeedback`` (JSON de tests ou
+  diagnostics du compilateur) et ``answerScore`` ;
+- ProgSnap2 : ``MainTable.csv`` avec les évènements ``Run.Program``,
+  ``Compile`` et ``Compile.Error`` reliés par ``ParentEventID``.
+
+Les traces suivent un même squelette plausible : nombre d'évènements par
+étudiant très dispersé (loi binomiale négative), exercices traités l'un après
+l'autre, réussite croissante avec les tentatives selon un niveau propre à
+chaque étudiant, relances à code inchangé, pauses de plus de cinq minutes qui
+séparent les sessions. Le contenu textuel (cas de test, feedback, code) est
+tiré de petites banques pré-rendues pour que la génération reste linéaire.
+
+Le fichier est écrit par blocs d'étudiants : la mémoire utilisée ne dépend que
+de ``chunk_subjects``. Avec une même graine, le résultat est identique.
+
+Exemple : ``python synthetic_corpus.py Mirabelle 10000 --output /tmp/mirabelle.csv``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+import sys
+from typing import Callable, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+# Moyenne d'évènements par étudiant observée sur les corpus d'exemple.
+DEFAULT_EVENTS_PER_SUBJECT = {"Mirabelle": 25.0, "Nowledgeable": 45.0, "Progsnap2": 20.0}
+DEFAULT_CHUNK_SUBJECTS = 10_000
+
+N_EXERCISES = 12
+LEVELS = 5  # niveaux de réussite, de 0 (tout échoue) à LEVELS - 1 (tout passe)
+VARIANTS = 8  # variantes de texte par exercice et par niveau
+LONG_PAUSE_PROBABILITY = 0.06
+UNCHANGED_RERUN_PROBABILITY = 0.25
+EPOCH_START = pd.Timestamp("2024-09-20 08:00:00")
+
+EXCEPTIONS = (
+    "ZeroDivisionError: division by zero",
+    "IndexError: list index out of range",
+    "TypeError: unsupported operand type(s) for +: 'int' and 'str'",
+    "NameError: name 'resultat' is not defined",
+    "RecursionError: maximum recursion depth exceeded",
+)
+CPP_ERRORS = (
+    "expected ‘;’ before ‘}}’ token",
+    "‘{token}’ was not declared in this scope",
+    "expected primary-expression before ‘)’ token",
+    "invalid operands of types ‘float’ and ‘const char [2]’ to binary ‘operator+’",
+    "return-statement with no value, in function returning ‘float’",
+)
+JAVA_ERRORS = (
+    "';' expected.",
+    "illegal start of expression.",
+    "cannot find symbol",
+    "incompatible types: possible lossy conversion from double to int",
+    "missing return statement",
+    "'.class' expected.",
+)
+
+
+# ---------------------------------------------------------------------------
+# Squelette commun aux trois corpus
+# ---------------------------------------------------------------------------
+def _skeleton(
+    rng: np.random.Generator,
+    first_subject: int,
+    n_subjects: int,
+    events_per_subject: float,
+) -> pd.DataFrame:
+    """Évènements d'un bloc d'étudiants, sans le contenu propre au corpus.
+
+    Une ligne par tentative : ``subject``, ``exercise``, ``attempt`` (rang dans
+    l'exercice), ``changed`` (code modifié), ``version`` (numéro du code dans
+    l'exercice), ``level`` (niveau de réussite), ``session`` et ``seconds``
+    (depuis ``EPOCH_START``).
+    """
+
+    # Binomiale négative : écart-type du même ordre que la moyenne, comme
+    # dans les corpus réels ; au moins deux évènements par étudiant.
+    dispersion = 1.5
+    mean = max(events_per_subject - 2.0, 0.1)
+    counts = rng.negative_binomial(dispersion, dispersion / (dispersion + mean), n_subjects) + 2
+    subject = np.repeat(np.arange(first_subject, first_subject + n_subjects), counts)
+    n_events = len(subject)
+    subject_start = np.repeat(np.cumsum(counts) - counts, counts)
+    position = np.arange(n_events) - subject_start
+
+    # Exercices traités l'un après l'autre, à partir d'un exercice propre à
+    # l'étudiant.
+    n_done = np.minimum(rng.poisson(3.0, n_subjects) + 1, N_EXERCISES)
+    block = position * np.repeat(n_done, counts) // np.repeat(counts, counts)
+    exercise = (np.repeat(rng.integers(0, N_EXERCISES, n_subjects), counts) + block) % N_EXERCISES
+    new_block = np.ones(n_events, dtype=bool)
+    new_block[1:] = (subject[1:] != subject[:-1]) | (block[1:] != block[:-1])
+    block_start = np.maximum.accumulate(np.where(new_block, np.arange(n_events), 0))
+    attempt = np.arange(n_events) - block_start
+
+    changed = new_block | (rng.random(n_events) >= UNCHANGED_RERUN_PROBABILITY)
+    changes = np.cumsum(changed)
+    version = changes - changes[block_start] + 1
+
+    # La réussite croît avec les tentatives, plus vite pour les étudiants
+    # à l'aise ; une relance à code inchangé garde le résultat précédent.
+    pace = np.repeat(rng.lognormal(1.0, 0.6, n_subjects), counts)
+    progress = 1.0 - np.exp(-(attempt + rng.random(n_events)) / pace)
+    level = np.clip((progress * LEVELS + rng.normal(0.0, 0.7, n_events)).astype(int), 0, LEVELS - 1)
+    last_change = np.maximum.accumulate(np.where(changed, np.arange(n_events), 0))
+    level = level[last_change]
+
+    long_pause = rng.random(n_events) < LONG_PAUSE_PROBABILITY
+    gaps = np.where(long_pause, rng.uniform(6 * 60, 90 * 60, n_events), rng.exponential(45.0, n_events) + 3.0)
+    first = position == 0
+    gaps[first] = rng.uniform(0, 8 * 3600, n_subjects)
+    long_pause[first] = False
+    seconds = np.cumsum(gaps) - np.repeat(np.cumsum(gaps)[subject_start[first]] - gaps[first], counts)
+    pauses = np.cumsum(long_pause)
+    session = pauses - pauses[subject_start]
+
+    return pd.DataFrame({
+        "subject": subject,
+        "exercise": exercise,
+        "attempt": attempt,
+        "changed": changed,
+        "version": version,
+        "level": level,
+        "session": session,
+        "seconds": np.round(seconds).astype(np.int64),
+    })
+
+
+def _variant(rng: np.random.Generator, n: int) -> np.ndarray:
+    return rng.integers(0, VARIANTS, n)
+
+
+def _iso(seconds: np.ndarray, suffix: str = "") -> pd.Series:
+    timestamps = EPOCH_START + pd.to_timedelta(seconds, unit="s")
+    return pd.Series(timestamps).dt.strftime("%Y-%m-%dT%H:%M:%S" + suffix)
+
+
+def _with_duplicates(rng: np.random.Generator, df: pd.DataFrame, rate: float) -> pd.DataFrame:
+    """Réinsère une fraction de lignes juste après leur original (doublons d'export)."""
+
+    if rate <= 0 or df.empty:
+        return df
+    repeats = np.where(rng.random(len(df)) < rate, 2, 1)
+    return df.loc[df.index.repeat(repeats)].reset_index(drop=True)
+
+
+# ---------------------------------------------------------------------------
+# Mirabelle
+# ---------------------------------------------------------------------------
+def _mirabelle_banks(rng: np.random.Generator) -> tuple[np.ndarray, np.ndarray]:
+    """Banque ``tests[exercice, niveau, variante]`` et code de base par exercice."""
+
+    tests = np.empty((N_EXERCISES, LEVELS, VARIANTS), dtype=object)
+    code = np.empty(N_EXERCISES, dtype=object)
+    for exercise in range(N_EXERCISES):
+        filename = f"/home/etudiant/tp{exercise + 1}.py"
+        functions = [f"fonction_{exercise}_{k}" for k in range(1 + exercise % 3)]
+        code[exercise] = "".join(f"def {name}(a, b):\n    return a + b\n\n" for name in functions)
+        for level in range(LEVELS):
+            for variant in range(VARIANTS):
+                cases = []
+                for name in functions:
+                    for j in range(int(rng.integers(1, 4))):
+                        passed = rng.random() < level / (LEVELS - 1)
+                        verdict = "PassedVerdict" if passed else (
+                            "FailedVerdict" if rng.random() < 0.7 else "ExceptionVerdict"
+                        )
+                        if verdict == "ExceptionVerdict":
+                            details = (
+                                "Traceback (most recent call last):\\n"
+                                f'  File "{filename}", line {int(rng.integers(2, 30))}, in {name}\\n'
+                                + EXCEPTIONS[int(rng.integers(len(EXCEPTIONS)))]
+                            )
+                        else:
+                            details = str(j + 2) if passed else str(int(rng.integers(-5, 50)))
+                        cases.append({
+                            "name": f"{name}(a, b)",
+                            "tested_line": f"{name}({j}, 2)",
+                            "expected_result": str(j + 2),
+                            "filename": filename,
+                            "verdict": verdict,
+                            "status": passed,
+                            "details": details,
+                        })
+                tests[exercise, level, variant] = repr(cases)
+    return tests, code
+
+
+def generate_mirabelle(
+    rng: np.random.Generator,
+    first_subject: int,
+    n_subjects: int,
+    events_per_subject: float,
+    first_row: int = 0,
+    banks: tuple[np.ndarray, np.ndarray] | None = None,
+) -> pd.DataFrame:
+    """Bloc d'évènements Mirabelle pour les étudiants ``first_subject…``."""
+
+    tests_bank, code_bank = banks if banks is not None else _mirabelle_banks(rng)
+    events = _skeleton(rng, first_subject, n_subjects, events_per_subject)
+    n = len(events)
+    draw = rng.random(n)
+    verb = np.where(draw < 0.82, "Run.Test", np.where(draw < 0.95, "Run.Program", "Session.Start"))
+    is_test = verb == "Run.Test"
+    exercise = events["exercise"].to_numpy()
+
+    last_change = np.maximum.accumulate(np.where(events["changed"].to_numpy(), np.arange(n), 0))
+    tests = tests_bank[exercise, events["level"].to_numpy(), _variant(rng, n)[last_change]]
+    code = pd.Series(code_bank[exercise]) + "# version " + events["version"].astype(str) + "\n"
+    df = pd.DataFrame({
+        "_id.$oid": [f"{row:024x}" for row in range(first_row, first_row + n)],
+        "actor": "etu" + events["subject"].astype(str),
+        "verb": verb,
+        "timestamp.$date": _iso(events["seconds"].to_numpy(), ".000Z"),
+        "tests": np.where(is_test, tests, ""),
+        "P_codeState": np.where(is_test, code, ""),
+        "filename_infere": "tp" + (events["exercise"] + 1).astype(str) + ".py",
+        "session.id": "s" + events["subject"].astype(str) + "-" + events["session"].astype(str),
+    })
+    return _with_duplicates(rng, df, 0.02)
+
+
+# ---------------------------------------------------------------------------
+# Nowledgeable
+# ---------------------------------------------------------------------------
+def _nowledgeable_banks(rng: np.random.Generator) -> dict[str, np.ndarray]:
+    """Banques de feedback (tests, erreurs de compilation), scores, code et titres."""
+
+    tests = np.empty((N_EXERCISES, LEVELS, VARIANTS), dtype=object)
+    scores = np.empty((N_EXERCISES, LEVELS, VARIANTS), dtype=float)
+    compile_errors = np.empty((N_EXERCISES, VARIANTS), dtype=object)
+    code = np.empty(N_EXERCISES, dtype=object)
+    titles = np.empty(N_EXERCISES, dtype=object)
+    for exercise in range(N_EXERCISES):
+        name = f"fonction_{exercise}"
+        titles[exercise] = f"Exercice {exercise + 1} - c++"
+        code[exercise] = f"float {name}(float number){{\n    if (number < 0){{\n        return -number;\n    }}\n    return number;\n}}\n"
+        n_tests = 3 + exercise % 3
+        for level in range(LEVELS):
+            for variant in range(VARIANTS):
+                right = [bool(rng.random() < level / (LEVELS - 1)) for _ in range(n_tests)]
+                cases = [
+                    {
+                        "name": f"Test {k + 1} de {name}",
+                        "isRight": int(ok),
+                        "message": "",
+                        "expected": f"{k + 1.5:.6f}",
+                        "submitted": f"{k + 1.5 if ok else -k - 1.5:.6f}",
+                    }
+                    for k, ok in enumerate(right)
+                ]
+                feedback = {"tests": cases, "status": 0, "stdout": "", "timing": round(float(rng.random()), 6)}
+                tests[exercise, level, variant] = json.dumps(feedback)
+                scores[exercise, level, variant] = sum(right) / n_tests
+        for variant in range(VARIANTS):
+            messages = [
+                f"main.cpp:{int(rng.integers(2, 20))}:{int(rng.integers(1, 30))}: error: "
+                + CPP_ERRORS[int(rng.integers(len(CPP_ERRORS)))].format(token=f"v{int(rng.integers(9))}")
+                for _ in range(int(rng.integers(1, 3)))
+            ]
+            stderr = f"main.cpp: In function ‘float {name}(float)’:\n" + "\n".join(messages) + "\n"
+            compile_errors[exercise, variant] = json.dumps({"status": 1, "stderr": stderr})
+    return {"tests": tests, "scores": scores, "compile_errors": compile_errors, "code": code, "titles": titles}
+
+
+def generate_nowledgeable(
+    rng: np.random.Generator,
+    first_subject: int,
+    n_subjects: int,
+    events_per_subject: float,
+    first_row: int = 0,
+    banks: dict[str, np.ndarray] | None = None,
+) -> pd.DataFrame:
+    """Bloc de soumissions Nowledgeable pour les étudiants ``first_subject…``."""
+
+    banks = banks if banks is not None else _nowledgeable_banks(rng)
+    events = _skeleton(rng, first_subject, n_subjects, events_per_subject)
+    n = len(events)
+    exercise = events["exercise"].to_numpy()
+    level = events["level"].to_numpy()
+    variant = _variant(rng, n)
+
+    # Les échecs de compilation se raréfient avec le niveau ; une relance à
+    # code inchangé reproduit le même résultat.
+    compile_error = rng.random(n) < 0.35 * (1.0 - level / (LEVELS - 1))
+    changed = events["changed"].to_numpy()
+    last_change = np.maximum.accumulate(np.where(changed, np.arange(n), 0))
+    compile_error = compile_error[last_change]
+    variant = variant[last_change]
+
+    score = np.where(compile_error, 0.0, banks["scores"][exercise, level, variant])
+    rows = np.arange(first_row, first_row + n)
+    df = pd.DataFrame({
+        "answerUuid": [f"00000000-0000-4000-8000-{row:012x}" for row in rows],
+        "studentId": events["subject"] + 1,
+        "exerciceId": 14000 + events["exercise"],
+        "exerciceType": "OneFileExercice",
+        "exerciceTitle": banks["titles"][exercise],
+        "answeredAt": 1_780_000_000 + events["seconds"],
+        "answerContent": pd.Series(banks["code"][exercise]) + "// version " + events["version"].astype(str),
+        "answerScore": score,
+        "answerIsRight": (score == 1.0).astype(int),
+        "assessmentUuid": [f"00000000-0000-4000-9000-{row:012x}" for row in rows],
+        "assessmentScore": score,
+        "assessmentIsManual": 0,
+        "assessmentStatus": 0,
+        "recordedFeedback": np.where(
+            compile_error,
+            banks["compile_errors"][exercise, variant],
+            banks["tests"][exercise, level, variant],
+        ),
+    })
+    return _with_duplicates(rng, df, 0.05)
+
+
+# ---------------------------------------------------------------------------
+# ProgSnap2
+# ---------------------------------------------------------------------------
+def generate_progsnap2(
+    rng: np.random.Generator,
+    first_subject: int,
+    n_subjects: int,
+    events_per_subject: float,
+    first_row: int = 0,
+    banks: None = None,
+) -> pd.DataFrame:
+    """Bloc ``MainTable`` ProgSnap2 pour les étudiants ``first_subject…``.
+
+    Chaque soumission donne un ``Run.Program``, un ``Compile`` dont il est le
+    parent et, si la compilation échoue, un à trois ``Compile.Error`` enfants
+    du ``Compile``. ``events_per_subject`` compte ces lignes. La colonne
+    ``SourceLocation`` du standard, absente de l'exemple, est remplie pour que
+    WatWin soit aussi mesuré.
+    """
+
+    submissions = _skeleton(rng, first_subject, n_subjects, max(events_per_subject / 2.6, 1.0))
+    n = len(submissions)
+    level = submissions["level"].to_numpy()
+    compile_error = rng.random(n) < 0.5 * (1.0 - level / (LEVELS - 1))
+    changed = submissions["changed"].to_numpy()
+    last_change = np.maximum.accumulate(np.where(changed, np.arange(n), 0))
+    compile_error = compile_error[last_change]
+    n_errors = np.where(compile_error, rng.integers(1, 4, n), 0)
+
+    # Ligne 0 : Run.Program, ligne 1 : Compile, lignes suivantes : erreurs.
+    per_submission = 2 + n_errors
+    source = np.repeat(np.arange(n), per_submission)
+    rank = np.arange(len(source)) - np.repeat(np.cumsum(per_submission) - per_submission, per_submission)
+    event_id = first_row + np.arange(len(source))
+    run_id = np.repeat(event_id[np.cumsum(per_submission) - per_submission], per_submission)
+
+    events = submissions.iloc[source].reset_index(drop=True)
+    is_run, is_compile, is_error = rank == 0, rank == 1, rank >= 2
+    score = np.where(compile_error, 0.0, np.round(level / (LEVELS - 1) * rng.uniform(0.8, 1.0, n), 6))[source]
+    messages = np.array(JAVA_ERRORS, dtype=object)[rng.integers(0, len(JAVA_ERRORS), len(source))]
+    lines = pd.Series(rng.integers(2, 20, len(source))).astype(str)
+    subject_id = events["subject"].map("{:064x}".format)
+    code_state = (
+        events["subject"].map("{:032x}".format)
+        + events["exercise"].map("{:08x}".format)
+        + events["version"].map("{:024x}".format)
+    )
+    return pd.DataFrame({
+        "SubjectID": subject_id,
+        "ToolInstances": "Java 8; CodeWorkout",
+        "ServerTimestamp": _iso(events["seconds"].to_numpy()),
+        "ServerTimezone": 0,
+        "CourseID": "CS 1",
+        "AssignmentID": 439 + events["exercise"].to_numpy() // 4,
+        "ProblemID": 1 + events["exercise"],
+        "CodeStateID": code_state,
+        "IsEventOrderingConsistent": True,
+        "EventType": np.where(is_run, "Run.Program", np.where(is_compile, "Compile", "Compile.Error")),
+        "Score": np.where(is_run, score, np.nan),
+        "Compile.Result": np.where(
+            is_compile, np.where(compile_error[source], "Error", "Success"), None
+        ),
+        "CompileMessageType": np.where(is_error, "SyntaxError", None),
+        "CompileMessageData": np.where(is_error, "line " + lines + ": error: " + messages, None),
+        "SourceLocation": np.where(is_error, "Text:" + lines, None),
+        "EventID": event_id,
+        "Order": event_id,
+        "ParentEventID": np.where(is_run, np.nan, np.where(is_compile, run_id, run_id + 1)).astype(float),
+    })
+
+
+# ---------------------------------------------------------------------------
+# Écriture
+# ---------------------------------------------------------------------------
+GENERATORS: dict[str, tuple[Callable[..., pd.DataFrame], Callable[[np.random.Generator], object]]] = {
+    "Mirabelle": (generate_mirabelle, _mirabelle_banks),
+    "Nowledgeable": (generate_nowledgeable, _nowledgeable_banks),
+    "Progsnap2": (generate_progsnap2, lambda rng: None),
+}
+
+
+def corpus_file(dataset: str, output: Path) -> Path:
+    """Fichier CSV écrit pour ``output`` (``MainTable.csv`` pour ProgSnap2)."""
+
+    return output / "MainTable.csv" if dataset == "Progsnap2" else output
+
+
+def write_corpus(
+    dataset: str,
+    output: Path,
+    n_subjects: int,
+    events_per_subject: float | None = None,
+    seed: int = 0,
+    chunk_subjects: int = DEFAULT_CHUNK_SUBJECTS,
+) -> dict[str, object]:
+    """Écrit un corpus synthétique et retourne son résumé.
+
+    ``output`` est le fichier CSV pour Mirabelle et Nowledgeable, le dossier du
+    ``MainTable.csv`` pour ProgSnap2 (comme ``DatasetSpec.input_path``).
+    """
+
+    if dataset not in GENERATORS:
+        raise KeyError(f"Corpus sans générateur : {dataset}. Choix : {', '.join(GENERATORS)}")
+    if n_subjects < 1 or chunk_subjects < 1:
+        raise ValueError("n_subjects et chunk_subjects doivent être supérieurs ou égaux à 1.")
+
+    generate, make_banks = GENERATORS[dataset]
+    if events_per_subject is None:
+        events_per_subject = DEFAULT_EVENTS_PER_SUBJECT[dataset]
+    rng = np.random.default_rng(seed)
+    banks = make_banks(rng)
+
+    path = corpus_file(dataset, output)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(path.name + ".tmp")
+    rows = 0
+    for first_subject in range(0, n_subjects, chunk_subjects):
+        block = generate(
+            rng, first_subject, min(chunk_subjects, n_subjects - first_subject),
+            events_per_subject, rows, banks,
+        )
+        block.to_csv(tmp_path, index=False, mode="w" if rows == 0 else "a", header=rows == 0)
+        rows += len(block)
+    tmp_path.replace(path)
+    return {
+        "dataset": dataset,
+        "subjects": n_subjects,
+        "events": rows,
+        "input_bytes": path.stat().st_size,
+        "path": str(path),
+        "seed": seed,
+    }
+
+
+def main(argv: Sequence[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Génère un corpus synthétique au format d'un corpus réel.")
+    parser.add_argument("dataset", choices=sorted(GENERATORS))
+    parser.add_argument("subjects", type=int, help="Nombre d'étudiants.")
+    parser.add_argument("--output", type=Path, required=True, help="CSV (dossier pour ProgSnap2) à écrire.")
+    parser.add_argument(
+        "--events-per-subject", type=float, default=None,
+        help="Nombre moyen d'évènements par étudiant (défaut : celui des corpus d'exemple).",
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-subjects", type=int, default=DEFAULT_CHUNK_SUBJECTS)
+    args = parser.parse_args(argv)
+
+    summary = write_corpus(
+        args.dataset, args.output, args.subjects, args.events_per_subject, args.seed, args.chunk_subjects,
+    )
+    print(", ".join(f"{key} = {value}" for key, value in summary.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())